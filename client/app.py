@@ -1,5 +1,13 @@
+import re
+import json
+import mimetypes
+import posixpath
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
 from PIL import Image
 from io import BytesIO
 
@@ -7,22 +15,186 @@ from io import BytesIO
 
 BACKEND_URL = "https://damg-big-data-assignment01.onrender.com"
 
+# Image previews: parallel downloads, thumbnail size in pixels and images shown per page
+PREVIEW_WORKERS = 8
+THUMBNAIL_SIZE = 320
+IMAGES_PER_PAGE = 12
+IMAGE_COLUMNS = 4
+# Cached backend results, documents and preview pages expire after an hour, and each cache
+# keeps at most CACHE_MAX_ENTRIES entries (least recently used go first)
+CACHE_TTL_SECONDS = 3600
+CACHE_MAX_ENTRIES = 64
+
+# PDF extraction method per option of the method selector ("auto" lets the server route each PDF)
+PDF_METHODS = {
+    "Extract Using Open-Source Tool": "open-source",
+    "Extract Using Enterprise Tool": "enterprise",
+    "Choose Automatically": "auto",
+}
+
+MARKDOWN_IMAGE = re.compile(r"!\[[^\]]*\]\(([^)\s]+)\)")
+
+
+@st.cache_resource
+def get_session():
+    """One pooled HTTP session for the client process, reused by every rerun and user session."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=PREVIEW_WORKERS, pool_maxsize=PREVIEW_WORKERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
 def pdf_to_markdown(file_bytes, file_name, method):
     files = {"file": (file_name, file_bytes, "application/pdf")}
     data = {"method": method}
-    resp = requests.post(f"{BACKEND_URL}/extract/pdf/", files=files, data=data)
+    resp = get_session().post(f"{BACKEND_URL}/extract/pdf/", files=files, data=data)
     resp.raise_for_status()
     return resp.json()
 
 
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
 def website_to_markdown(url, method):
     data = {"url": url, "method": method}
-    resp = requests.post(f"{BACKEND_URL}/extract/website/", data=data)
+    resp = get_session().post(f"{BACKEND_URL}/extract/website/", data=data)
     resp.raise_for_status()
     return resp.json()
 
 
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def fetch_markdown(md_url):
+    """Downloads a generated Markdown document."""
+    resp = get_session().get(md_url)
+    resp.raise_for_status()
+    return resp.text
+
+
+def markdown_image_urls(markdown):
+    """URLs of the images linked from a Markdown document, in order and without duplicates."""
+    return list(dict.fromkeys(MARKDOWN_IMAGE.findall(markdown)))
+
+
+def image_file_type(url):
+    """(extension, MIME type) of an image from its URL path; the server stores WebP, JPEG or PNG."""
+    ext = posixpath.splitext(urlparse(url).path)[1].lower() or ".png"
+    mime = "image/webp" if ext == ".webp" else mimetypes.guess_type(f"image{ext}")[0]
+    return ext, mime or "application/octet-stream"
+
+
+def download_image(session, url):
+    """Downloads one image and makes its thumbnail; returns (content, thumbnail PNG bytes) or None."""
+    try:
+        resp = session.get(url, timeout=30)
+        resp.raise_for_status()
+        img = Image.open(BytesIO(resp.content))
+        if img.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+            img = img.convert("RGB")
+        img.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        thumbnail = BytesIO()
+        img.save(thumbnail, format="PNG")
+        return resp.content, thumbnail.getvalue()
+    except Exception:
+        return None
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def load_image_page(urls):
+    """Downloads one page of images concurrently over the pooled session (cached per page)."""
+    session = get_session()
+    with ThreadPoolExecutor(max_workers=PREVIEW_WORKERS) as executor:
+        return list(executor.map(lambda url: download_image(session, url), urls))
+
+
+def stream_markdown(path, data, files=None):
+    """POSTs with mode=stream and yields (event, data) pairs from the Server-Sent Events response."""
+    with get_session().post(f"{BACKEND_URL}{path}", files=files, data={**data, "mode": "stream"}, stream=True) as resp:
+        resp.raise_for_status()
+        event = None
+        for line in resp.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                yield event, json.loads(line[len("data:"):])
+
+
+def render_markdown_stream(events):
+    """Renders Markdown chunks as they arrive and returns the final result (with markdown_url)."""
+    progress = st.progress(0.0, text="Waiting for the first page...")
+    preview = st.container()
+    chunks, fraction = 0, 0.0
+    for event, data in events:
+        if event == "chunk":
+            preview.markdown(data["markdown"])
+            chunks += 1
+            progress.progress(fraction, text=f"Received {chunks} section(s)")
+        elif event == "progress":
+            fraction = data.get("progress", fraction)
+            progress.progress(fraction, text=f"Working: {data.get('stage', '')}")
+        elif event == "error":
+            progress.empty()
+            raise RuntimeError(data.get("detail", "Extraction failed"))
+        elif event == "done":
+            progress.empty()
+            if not chunks and data.get("markdown_url"):
+                # Cached result: nothing was streamed, so show the stored document
+                preview.markdown(fetch_markdown(data["markdown_url"]))
+            return data
+    progress.empty()
+    raise RuntimeError("The stream ended before the extraction finished")
+
+
+def render_images(image_urls, key):
+    """Shows the images a page at a time as a grid of thumbnails; only the shown page is downloaded."""
+    st.subheader(f"📷 Extracted Images ({len(image_urls)})")
+    pages = (len(image_urls) + IMAGES_PER_PAGE - 1) // IMAGES_PER_PAGE
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1, key=f"{key}_image_page") if pages > 1 else 1
+    start = (page - 1) * IMAGES_PER_PAGE
+    page_urls = tuple(image_urls[start:start + IMAGES_PER_PAGE])
+
+    with st.spinner(f"Loading images {start + 1}-{start + len(page_urls)}..."):
+        images = load_image_page(page_urls)
+
+    columns = st.columns(IMAGE_COLUMNS)
+    for offset, (img_url, image) in enumerate(zip(page_urls, images)):
+        idx = start + offset + 1
+        with columns[offset % IMAGE_COLUMNS]:
+            if image is None:
+                st.warning(f"Image {idx} could not be loaded")
+                continue
+            content, thumbnail = image
+            ext, mime = image_file_type(img_url)
+            st.image(thumbnail, caption=f"Image {idx}")
+            st.download_button(
+                label=f"Download Image {idx}",
+                data=content,
+                file_name=f"image_{idx}{ext}",
+                mime=mime,
+                key=f"{key}_download_{idx}",
+            )
+
+
+def render_result(response_data, key):
+    """Shows an extraction result: the Markdown link and preview, then the images it links to."""
+    md_url = response_data["markdown_url"]
+    st.success("✅ Markdown generated successfully!")
+    st.write(f"📂 Markdown file uploaded to S3: [View Markdown]({md_url})")
+    route = response_data.get("route")
+    if route:
+        ranges = ", ".join(f"pages {r['pages'][0]}-{r['pages'][1]}: {r['engine']}" for r in route["ranges"])
+        engine = "both engines" if route["engine"] == "split" else f"the {route['engine']} engine"
+        st.info(f"🧭 Routed automatically to {engine} ({route['reason']}; {ranges})")
+
+    markdown = fetch_markdown(md_url)
+    with st.expander("Markdown preview"):
+        st.markdown(markdown)
+
+    # Preview and download images
+    image_urls = response_data.get("image_urls") or markdown_image_urls(markdown)
+    if image_urls:
+        render_images(image_urls, key)
+
+
 # Main App
 def main():
     st.set_page_config(
@@ -71,9 +243,10 @@ def main():
         # Extraction Method
         extraction_method = st.radio(
             "Extraction Method",
-            ["Extract Using Open-Source Tool", "Extract Using Enterprise Tool"],
+            list(PDF_METHODS),
             horizontal=True,
         )
+        stream_output = st.checkbox("Show Markdown while it is extracted", value=True)
 
         # Generate Markdown Button
         if st.button("Generate Markdown"):
@@ -82,29 +255,28 @@ def main():
                 return
 
             with st.spinner("⏳ Processing your file..."):
-                method_val = "open-source" if "Open-Source" in extraction_method else "enterprise"
+                method_val = PDF_METHODS[extraction_method]
                 try:
-                    response_data = pdf_to_markdown(uploaded_pdf.getvalue(), uploaded_pdf.name, method_val)
-                    md_url = response_data["markdown_url"]
-                    st.success("✅ Markdown generated successfully!")
-                    st.write(f"📂 Markdown file uploaded to S3: [View Markdown]({md_url})")
-
-                    # Preview and download images
-                    if "image_urls" in response_data:  # Assuming the API returns a list of image URLs
-                        st.subheader("📷 Extracted Images")
-                        for idx, img_url in enumerate(response_data["image_urls"], start=1):
-                            response = requests.get(img_url)
-                            img = Image.open(BytesIO(response.content))
-                            st.image(img, caption=f"Image {idx}", use_column_width=True)
-                            st.download_button(
-                                label=f"Download Image {idx}",
-                                data=response.content,
-                                file_name=f"image_{idx}.png",
-                                mime="image/png",
-                            )
+                    if stream_output:
+                        files = {"file": (uploaded_pdf.name, uploaded_pdf.getvalue(), "application/pdf")}
+                        response_data = render_markdown_stream(
+                            stream_markdown("/extract/pdf/", {"method": method_val}, files=files)
+                        )
+                    else:
+                        response_data = pdf_to_markdown(uploaded_pdf.getvalue(), uploaded_pdf.name, method_val)
+                    # Kept across reruns (e.g. paging through the images)
+                    st.session_state["pdf_result"] = {"source": uploaded_pdf.name, "data": response_data}
                 except Exception as e:
+                    st.session_state.pop("pdf_result", None)
                     st.error(f"❌ An error occurred: {e}")
 
+        result = st.session_state.get("pdf_result")
+        if result and uploaded_pdf and result["source"] == uploaded_pdf.name:
+            try:
+                render_result(result["data"], "pdf")
+            except Exception as e:
+                st.error(f"❌ An error occurred: {e}")
+
     elif choice == "Website URL to Markdown":
         st.subheader("Enter a Website URL to Generate Markdown")
 
@@ -117,6 +289,7 @@ def main():
             ["Extract Using Open-Source Tool", "Extract Using Enterprise Tool"],
             horizontal=True,
         )
+        stream_output = st.checkbox("Show Markdown while it is extracted", value=True)
 
         # Generate Markdown Button
         if st.button("Generate Markdown"):
@@ -127,27 +300,25 @@ def main():
             with st.spinner("⏳ Processing the website..."):
                 method_val = "open-source" if "Open-Source" in extraction_method else "enterprise"
                 try:
-                    response_data = website_to_markdown(url_input, method_val)
-                    md_url = response_data["markdown_url"]
-                    st.success("✅ Markdown generated successfully!")
-                    st.write(f"📂 Markdown file uploaded to S3: [View Markdown]({md_url})")
-
-                    # Preview and download images
-                    if "image_urls" in response_data:  # Assuming the API returns a list of image URLs
-                        st.subheader("📷 Extracted Images")
-                        for idx, img_url in enumerate(response_data["image_urls"], start=1):
-                            response = requests.get(img_url)
-                            img = Image.open(BytesIO(response.content))
-                            st.image(img, caption=f"Image {idx}", use_column_width=True)
-                            st.download_button(
-                                label=f"Download Image {idx}",
-                                data=response.content,
-                                file_name=f"image_{idx}.png",
-                                mime="image/png",
-                            )
+                    if stream_output:
+                        response_data = render_markdown_stream(
+                            stream_markdown("/extract/website/", {"url": url_input, "method": method_val})
+                        )
+                    else:
+                        response_data = website_to_markdown(url_input, method_val)
+                    # Kept across reruns (e.g. paging through the images)
+                    st.session_state["website_result"] = {"source": url_input, "data": response_data}
                 except Exception as e:
+                    st.session_state.pop("website_result", None)
                     st.error(f"❌ An error occurred: {e}")
 
+        result = st.session_state.get("website_result")
+        if result and result["source"] == url_input:
+            try:
+                render_result(result["data"], "website")
+            except Exception as e:
+                st.error(f"❌ An error occurred: {e}")
+
 
 if __name__ == "__main__":
     main()
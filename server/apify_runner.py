@@ -0,0 +1,142 @@
+import os
+import hmac
+import time
+import logging
+import threading
+
+
+################################################################################
+#                    EVENT-DRIVEN APIFY RUN COMPLETION                         #
+################################################################################
+
+APIFY_API_URL = os.getenv("APIFY_API_URL")  # override for a local fake Apify API
+APIFY_RUN_TIMEOUT = int(os.getenv("APIFY_RUN_TIMEOUT", "600"))
+# Longest single waitForFinish long-poll; the Apify API caps it at 60 seconds
+APIFY_WAIT_SECS = int(os.getenv("APIFY_WAIT_SECS", "60"))
+# Public URL of POST /webhooks/apify; when set, runs report completion through a webhook
+APIFY_WEBHOOK_URL = os.getenv("APIFY_WEBHOOK_URL")
+# Token the webhook URL carries; webhooks are not used (and the endpoint refuses posts) without it
+APIFY_WEBHOOK_SECRET = os.getenv("APIFY_WEBHOOK_SECRET", "")
+# Fallback polling backoff when neither a webhook nor long-polling makes progress
+APIFY_BACKOFF_MIN = float(os.getenv("APIFY_BACKOFF_MIN", "0.5"))
+APIFY_BACKOFF_MAX = float(os.getenv("APIFY_BACKOFF_MAX", "10"))
+
+TERMINAL_STATUSES = ("SUCCEEDED", "FAILED", "ABORTED", "TIMED-OUT")
+WEBHOOK_EVENT_TYPES = ["ACTOR.RUN.SUCCEEDED", "ACTOR.RUN.FAILED", "ACTOR.RUN.ABORTED", "ACTOR.RUN.TIMED_OUT"]
+
+
+class ApifyRunError(Exception):
+    """Raised when an Apify run fails, is aborted or does not finish in time."""
+
+    def __init__(self, message, run=None):
+        super().__init__(message)
+        self.run = run
+
+
+class WebhookRegistry:
+    """Wakes the threads waiting for runs when a run-finished webhook arrives. The payload is only
+    a signal: waiters re-fetch the run from the Apify API rather than trusting what was posted."""
+
+    def __init__(self):
+        self._events = {}
+        self._lock = threading.Lock()
+
+    def register(self, run_id):
+        with self._lock:
+            return self._events.setdefault(run_id, threading.Event())
+
+    def unregister(self, run_id):
+        with self._lock:
+            self._events.pop(run_id, None)
+
+    def notify(self, run_id):
+        """Called by the webhook endpoint with the run id from the payload.
+        Returns False when nobody is waiting for this run."""
+        with self._lock:
+            event = self._events.get(run_id)
+        if event is None:
+            return False
+        event.set()
+        return True
+
+
+webhook_registry = WebhookRegistry()
+
+
+def webhooks_enabled():
+    """Webhooks are used only when both the public URL and the secret token are configured."""
+    return bool(APIFY_WEBHOOK_URL and APIFY_WEBHOOK_SECRET)
+
+
+def valid_webhook_token(token):
+    """Whether a webhook request carries the configured secret (always False without one)."""
+    return bool(APIFY_WEBHOOK_SECRET) and hmac.compare_digest(token.encode(), APIFY_WEBHOOK_SECRET.encode())
+
+
+def run_webhooks():
+    """Ad-hoc webhook definitions to pass to `actor.start`, or None when webhooks are not configured."""
+    if not webhooks_enabled():
+        if APIFY_WEBHOOK_URL:
+            logging.warning("APIFY_WEBHOOK_URL is set without APIFY_WEBHOOK_SECRET; not registering webhooks")
+        return None
+    request_url = APIFY_WEBHOOK_URL + ("&" if "?" in APIFY_WEBHOOK_URL else "?") + f"token={APIFY_WEBHOOK_SECRET}"
+    return [{"event_types": WEBHOOK_EVENT_TYPES, "request_url": request_url}]
+
+
+def wait_for_run(client, run, timeout=APIFY_RUN_TIMEOUT, registry=webhook_registry):
+    """Blocks until `run` reaches a terminal status and returns the final run object.
+
+    Completion is detected by, in order of preference: a run-finished webhook (when
+    APIFY_WEBHOOK_URL and APIFY_WEBHOOK_SECRET are set), Apify's waitForFinish long-poll, and adaptive backoff polling
+    if the API answers long-polls immediately. The thread sleeps on an Event or an open
+    long-poll request instead of waking every few seconds, which cuts the requests made per run
+    but does not free it: the calling (job worker) thread stays blocked until the run finishes,
+    for up to `timeout` seconds, so JOB_WORKERS bounds the Apify runs waited on at once.
+    """
+    run_id = run["id"]
+    deadline = time.monotonic() + timeout
+    delay = APIFY_BACKOFF_MIN
+    use_webhook = webhooks_enabled()
+    event = registry.register(run_id) if use_webhook else None
+
+    try:
+        while run["status"] not in TERMINAL_STATUSES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise ApifyRunError(f"Apify run {run_id} timed out after {timeout}s", run)
+
+            started = time.monotonic()
+            if event is not None:
+                # Woken by a webhook or, as a safety net for a lost one, by the timeout; either
+                # way the run is read from the API, never from the webhook payload
+                event.wait(timeout=min(remaining, APIFY_WAIT_SECS))
+                event.clear()
+                run = client.run(run_id).get() or run
+            else:
+                wait_secs = max(1, int(min(remaining, APIFY_WAIT_SECS)))
+                run = client.run(run_id).wait_for_finish(wait_secs=wait_secs) or run
+
+            logging.info(f"Apify run {run_id} status: {run['status']}")
+            if run["status"] not in TERMINAL_STATUSES and event is None and time.monotonic() - started < 1:
+                # The API did not hold the long-poll; back off instead of hammering it
+                time.sleep(min(delay, max(0, deadline - time.monotonic())))
+                delay = min(delay * 2, APIFY_BACKOFF_MAX)
+    finally:
+        if use_webhook:
+            registry.unregister(run_id)
+
+    if run["status"] != "SUCCEEDED":
+        error_message = run.get("errorMessage") or run.get("statusMessage") or "No detailed error message provided."
+        raise ApifyRunError(f"Apify run {run_id} finished with status {run['status']}: {error_message}", run)
+    return run
+
+
+def start_and_wait(client, actor_id, run_input, timeout=APIFY_RUN_TIMEOUT):
+    """Starts an actor run and returns its final run object (which includes defaultDatasetId)."""
+    run = client.actor(actor_id).start(
+        run_input=run_input,
+        wait_for_finish=min(APIFY_WAIT_SECS, timeout),
+        webhooks=run_webhooks(),
+    )
+    logging.info(f"Apify actor started with Run ID: {run['id']}")
+    return wait_for_run(client, run, timeout=timeout)
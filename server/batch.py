@@ -0,0 +1,84 @@
+import os
+import math
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from jobs import report_progress
+
+
+################################################################################
+#                         BATCH PDF EXTRACTION                                 #
+################################################################################
+
+BATCH_MAX_IN_FLIGHT = int(os.getenv("BATCH_MAX_IN_FLIGHT", "8"))
+BATCH_MAX_IN_FLIGHT_LIMIT = int(os.getenv("BATCH_MAX_IN_FLIGHT_LIMIT", "32"))
+BATCH_MAX_DOCUMENTS = int(os.getenv("BATCH_MAX_DOCUMENTS", "5000"))
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of `values` (q in 0-100); 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(results, wall_seconds, max_in_flight):
+    """Throughput and latency report for a finished batch."""
+    latencies = [result["seconds"] for result in results]
+    succeeded = sum(1 for result in results if result["status"] == "succeeded")
+    return {
+        "count": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "max_in_flight": max_in_flight,
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_docs_per_sec": round(len(results) / wall_seconds, 3) if wall_seconds else 0.0,
+        "latency_seconds": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "max": round(max(latencies), 3) if latencies else 0.0,
+            "mean": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        },
+    }
+
+
+def run_batch(documents, process, max_in_flight=BATCH_MAX_IN_FLIGHT):
+    """Runs `process(document)` for every document with at most `max_in_flight` running at once.
+
+    `process` returns a dict (e.g. {"markdown_url": ...}); exceptions are recorded per document
+    instead of failing the batch. Returns the per-document manifest (in input order) and a summary.
+    """
+    max_in_flight = max(1, min(max_in_flight, BATCH_MAX_IN_FLIGHT_LIMIT, len(documents) or 1))
+    logging.info(f"Starting batch of {len(documents)} documents with {max_in_flight} in flight")
+    results = [None] * len(documents)
+    start = time.perf_counter()
+
+    def timed(document):
+        doc_start = time.perf_counter()
+        try:
+            return {"status": "succeeded", **process(document)}, time.perf_counter() - doc_start
+        except Exception as e:
+            error = getattr(e, "detail", None) or str(e)
+            logging.error(f"Batch document {document.get('name')} failed: {error}")
+            return {"status": "failed", "error": error}, time.perf_counter() - doc_start
+
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="batch") as executor:
+        futures = {executor.submit(timed, document): index for index, document in enumerate(documents)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            index = futures[future]
+            outcome, seconds = future.result()
+            document = documents[index]
+            results[index] = {
+                "name": document.get("name"),
+                "method": document.get("method"),
+                "seconds": round(seconds, 3),
+                **outcome,
+            }
+            report_progress(f"documents {done}/{len(documents)}", done / len(documents))
+
+    summary = summarize(results, time.perf_counter() - start, max_in_flight)
+    logging.info(f"Batch finished: {summary}")
+    return {"documents": results, "summary": summary}
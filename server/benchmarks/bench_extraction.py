@@ -0,0 +1,246 @@
+"""Benchmarks the four extraction paths end to end against local stubs and checks for regressions.
+
+Paths: open-source PDF (open_source_extract_pdf), enterprise PDF (enterprise_extract_pdf with a
+stub Adobe session), open-source website (extract_website_content + save_to_markdown against a
+local server of saved HTML) and enterprise website (enterprise_extract_website with a stub Apify
+client). S3 is replaced by an in-memory stub for every path. Each stub answers after a
+configurable latency, so the numbers reflect our code plus a fixed, repeatable service delay.
+
+The corpus is generated deterministically, every path runs in a fresh process (so peak RSS is
+per path) and each document is processed cold (the image dedup cache is cleared in between).
+Reports throughput, p50/p95 latency per document and peak RSS; with --baseline, exits with 1
+when a path is slower, or uses more memory, than the baseline by more than --threshold.
+
+Run from the server/ directory:
+    python -m benchmarks.bench_extraction --save-baseline bench_baseline.json
+    python -m benchmarks.bench_extraction --baseline bench_baseline.json --threshold 0.2
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import resource
+import tempfile
+import functools
+import multiprocessing
+from queue import Empty
+
+from batch import percentile
+from benchmarks.fixtures import make_pdf, write_html_site
+from benchmarks.stubs import (
+    StubApifyClient, StubPDFServices, install_s3_stub, make_adobe_result_zip, reset_s3_stub, serve_directory,
+)
+
+BENCH_REGRESSION_THRESHOLD = float(os.getenv("BENCH_REGRESSION_THRESHOLD", "0.2"))
+
+# Settings for the benchmark processes: no result, page or HTTP cache, no webhooks, no background warm-up
+BENCH_ENV = {
+    "RESULT_CACHE_ENABLED": "0",
+    "PAGE_CACHE_ENABLED": "0",
+    "HTTP_CACHE_ENABLED": "0",
+    "S3_BUCKET_NAME": "benchmark",
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "APIFY_WEBHOOK_URL": "",
+    "WARMUP_BACKENDS": "",
+}
+
+# Options that define the workload; a baseline only applies to runs with the same values
+WORKLOAD_OPTIONS = ("pdfs", "pages", "html_pages", "repeat", "s3_latency", "adobe_latency", "apify_latency", "http_latency")
+
+
+def open_source_pdf(main, corpus, options):
+    return [functools.partial(main.open_source_extract_pdf, pdf_path) for pdf_path, _ in corpus["pdfs"]]
+
+
+def enterprise_pdf(main, corpus, options):
+    services = StubPDFServices(latency=options["adobe_latency"])
+
+    def run(pdf_path, result_zip):
+        services.result_zip = result_zip
+        return main.enterprise_extract_pdf(pdf_path, services)
+
+    documents = []
+    for pdf_path, zip_path in corpus["pdfs"]:
+        with open(zip_path, "rb") as f:
+            documents.append(functools.partial(run, pdf_path, f.read()))
+    return documents
+
+
+def open_source_website(main, corpus, options):
+    _, base_url = serve_directory(corpus["site"], options["http_latency"])
+
+    def run(url):
+        text, image_urls, links, tables = main.extract_website_content(url)
+        return main.save_to_markdown(url, text, image_urls, links, tables)
+
+    return [functools.partial(run, f"{base_url}/{name}") for name in corpus["pages"]]
+
+
+def enterprise_website(main, corpus, options):
+    from html_extract import parse_website_content
+
+    # The actor's output for each saved page: its text, as Apify's website crawler returns it
+    pages = {}
+    for name in corpus["pages"]:
+        url = f"https://example.com/{name}"
+        with open(os.path.join(corpus["site"], name), "rb") as f:
+            text = parse_website_content(url, f.read())[0]
+        pages[url] = {"title": name, "url": url, "markdown": text}
+    main._apify_client = StubApifyClient(pages, latency=options["apify_latency"])
+    return [functools.partial(main.enterprise_extract_website, url) for url in pages]
+
+
+PATHS = {
+    "open-source-pdf": open_source_pdf,
+    "enterprise-pdf": enterprise_pdf,
+    "open-source-website": open_source_website,
+    "enterprise-website": enterprise_website,
+}
+
+
+def build_corpus(directory, options):
+    """Writes the PDFs (with the matching Adobe result ZIPs) and the saved HTML site."""
+    pdfs = []
+    for index in range(options["pdfs"]):
+        pdf_path = make_pdf(os.path.join(directory, f"doc{index}.pdf"), pages=options["pages"] + index)
+        zip_path = os.path.join(directory, f"doc{index}.adobe.zip")
+        with open(zip_path, "wb") as f:
+            f.write(make_adobe_result_zip(pdf_path))
+        pdfs.append((pdf_path, zip_path))
+    site = os.path.join(directory, "site")
+    pages = write_html_site(site, pages=options["html_pages"], paragraphs=400, tables=8, links=100, images=40)
+    return {"pdfs": pdfs, "site": site, "pages": pages}
+
+
+def run_path(name, corpus, options, queue):
+    """Runs one path in this (fresh) process and puts its summary on `queue`."""
+    os.environ.update(BENCH_ENV)
+    import main
+
+    logging.disable(logging.WARNING)
+    install_s3_stub(main.s3_uploader, options["s3_latency"])
+    documents = PATHS[name](main, corpus, options)
+
+    for document in documents[:options["warmup"]]:
+        document()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(options["repeat"]):
+        for document in documents:
+            reset_s3_stub(main.s3_uploader)
+            document_start = time.perf_counter()
+            document()
+            latencies.append(time.perf_counter() - document_start)
+    wall_seconds = time.perf_counter() - start
+
+    queue.put({
+        "documents": len(latencies),
+        "throughput_docs_per_sec": round(len(latencies) / wall_seconds, 3),
+        "p50_seconds": round(percentile(latencies, 50), 4),
+        "p95_seconds": round(percentile(latencies, 95), 4),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    })
+
+
+def measure(name, corpus, options):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=run_path, args=(name, corpus, options, queue))
+    proc.start()
+    deadline = time.monotonic() + options["timeout"]
+    try:
+        while time.monotonic() < deadline:
+            try:
+                return queue.get(timeout=1)
+            except Empty:
+                if not proc.is_alive() and queue.empty():
+                    raise RuntimeError(f"The {name} benchmark exited with code {proc.exitcode}")
+        raise TimeoutError(f"The {name} benchmark did not finish in {options['timeout']}s")
+    finally:
+        proc.join(timeout=5)
+        if proc.is_alive():
+            proc.terminate()
+
+
+def regressions(name, result, baseline, threshold):
+    """Messages for every figure that is worse than the baseline by more than `threshold`."""
+    found = []
+    if result["throughput_docs_per_sec"] < baseline["throughput_docs_per_sec"] * (1 - threshold):
+        found.append(f"{name}: throughput {result['throughput_docs_per_sec']} < baseline {baseline['throughput_docs_per_sec']} docs/s")
+    for key in ("p50_seconds", "p95_seconds", "peak_rss_mb"):
+        if result[key] > baseline[key] * (1 + threshold):
+            found.append(f"{name}: {key} {result[key]} > baseline {baseline[key]}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--paths", default=",".join(PATHS), help="comma-separated subset of: " + ", ".join(PATHS))
+    parser.add_argument("--pdfs", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--html-pages", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--s3-latency", type=float, default=0.01)
+    parser.add_argument("--adobe-latency", type=float, default=0.5)
+    parser.add_argument("--apify-latency", type=float, default=0.5)
+    parser.add_argument("--http-latency", type=float, default=0.02)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--baseline", help="JSON file from --save-baseline to compare against")
+    parser.add_argument("--save-baseline", help="write this run's results to a JSON file")
+    parser.add_argument("--threshold", type=float, default=BENCH_REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+    options = vars(args)
+
+    names = [name.strip() for name in args.paths.split(",") if name.strip()]
+    unknown = [name for name in names if name not in PATHS]
+    if unknown:
+        parser.error(f"unknown paths: {', '.join(unknown)}")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        changed = [key for key in WORKLOAD_OPTIONS if baseline["options"].get(key) != options[key]]
+        if changed:
+            print(f"FAIL: the baseline was recorded with different options: {', '.join(changed)}")
+            return 1
+
+    directory = tempfile.mkdtemp(prefix="bench-extraction-")
+    try:
+        corpus = build_corpus(directory, options)
+        print(f"Corpus: {args.pdfs} PDFs of {args.pages}+ pages, {args.html_pages} saved HTML pages; "
+              f"latency S3 {args.s3_latency}s, Adobe {args.adobe_latency}s, Apify {args.apify_latency}s, "
+              f"HTTP {args.http_latency}s")
+        print(f"{'path':>20}  {'docs/s':>8}  {'p50 s':>8}  {'p95 s':>8}  {'peak RSS MB':>11}")
+        results = {}
+        for name in names:
+            result = results[name] = measure(name, corpus, options)
+            print(f"{name:>20}  {result['throughput_docs_per_sec']:8.2f}  {result['p50_seconds']:8.3f}  "
+                  f"{result['p95_seconds']:8.3f}  {result['peak_rss_mb']:11.1f}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"options": {key: options[key] for key in WORKLOAD_OPTIONS}, "results": results}, f, indent=2)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if baseline is not None:
+        found = []
+        for name, result in results.items():
+            if name in baseline["results"]:
+                found += regressions(name, result, baseline["results"][name], args.threshold)
+        for message in found:
+            print(f"FAIL: {message}")
+        if found:
+            return 1
+        print(f"OK (within {args.threshold:.0%} of the baseline)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
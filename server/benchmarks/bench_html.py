@@ -0,0 +1,65 @@
+"""Compares HTML parser backends of parse_website_content with the legacy four-traversal parse.
+
+Run from the server/ directory:
+    python -m benchmarks.bench_html --paragraphs 5000
+"""
+import sys
+import time
+import argparse
+
+from bs4 import BeautifulSoup
+
+from benchmarks.fixtures import make_html
+from html_extract import HTML_PARSERS, parse_website_content, resolve_image_url, resolve_link_url
+from benchmarks.bench_tables import legacy_make_table
+
+
+def legacy_parse(url, html):
+    """The original extractor: html.parser plus one full-tree find_all per tag."""
+    soup = BeautifulSoup(html, 'html.parser')
+    text_content = '\n'.join([p.get_text(strip=True) for p in soup.find_all('p')])
+    image_urls = [resolve_image_url(url, img['src']) for img in soup.find_all('img') if 'src' in img.attrs]
+    link_urls = [resolve_link_url(url, link['href']) for link in soup.find_all('a', href=True)]
+    extracted_tables = []
+    for table in soup.find_all('table'):
+        table_data = [[col.get_text(strip=True) for col in row.find_all(['td', 'th'])] for row in table.find_all('tr')]
+        if table_data:
+            extracted_tables.append(legacy_make_table(table_data))
+    return text_content, image_urls, link_urls, extracted_tables
+
+
+def best_of(repeat, fn, *args):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--paragraphs", type=int, default=5000)
+    parser.add_argument("--tables", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    url = "https://example.com/page.html"
+    html = make_html(paragraphs=args.paragraphs, tables=args.tables)
+    print(f"Fixture: {len(html) / 1e6:.1f} MB of HTML")
+
+    baseline, expected = best_of(args.repeat, legacy_parse, url, html)
+    print(f"{'legacy html.parser':>20}: {baseline:.3f}s")
+    for backend in HTML_PARSERS:
+        try:
+            elapsed, result = best_of(args.repeat, parse_website_content, url, html, backend)
+        except Exception as e:
+            print(f"{backend:>20}: skipped ({e})")
+            continue
+        same = result[0] == expected[0] and result[1] == expected[1] and result[2] == expected[2]
+        print(f"{backend:>20}: {elapsed:.3f}s  ({baseline / elapsed:.1f}x, same text/images/links: {same})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
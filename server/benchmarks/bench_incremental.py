@@ -0,0 +1,110 @@
+"""Shows that re-extracting a revised PDF costs in proportion to its changed pages.
+
+Extracts a generated report once into an empty page cache, then extracts revisions of it in
+which a growing number of randomly chosen pages have new text. Each revision goes through
+incremental_pdf_markdown against the same page cache and is compared with a fresh full
+extraction of the revision, which it must match byte for byte. Image uploads go to a stub that
+answers at once with content-addressed URLs. Reports the pages extracted and the seconds taken
+per revision next to those of the full extraction; exits with 1 when a revision extracts other
+pages than its changed ones or its Markdown differs from the full extraction.
+
+Run from the server/ directory:
+    python -m benchmarks.bench_incremental --pages 200 --changed 0,1,5,20,50,100
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import hashlib
+import logging
+import argparse
+import tempfile
+from concurrent.futures import Future
+
+import fitz  # PyMuPDF
+
+from benchmarks.fixtures import make_pdf
+from page_cache import PageCache
+from pdf_engine import extract_pdf_markdown, incremental_pdf_markdown
+
+VERSION = "bench"
+
+
+def image_url(image_bytes, image_ext):
+    return f"https://bucket.s3.local/{hashlib.sha256(image_bytes).hexdigest()}.{image_ext}"
+
+
+def upload_images(images):
+    return [image_url(*image) for image in images]
+
+
+def submit_images(images):
+    futures = []
+    for image in images:
+        future = Future()
+        future.set_result(image_url(*image))
+        futures.append(future)
+    return futures
+
+
+def write_revision(base_path, path, changed, revision):
+    """Saves a copy of the PDF with new text on `changed` randomly chosen pages; returns their numbers."""
+    with fitz.open(base_path) as doc:
+        pages = sorted(random.Random(revision).sample(range(len(doc)), changed))
+        for page_num in pages:
+            doc[page_num].insert_text((72, 760), f"Revision {revision}: corrected figures on page {page_num + 1}")
+        doc.save(path)
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--changed", default="0,1,5,20,50,100", help="comma-separated changed page counts")
+    args = parser.parse_args()
+    changed_counts = [int(changed) for changed in args.changed.split(",")]
+    logging.disable(logging.WARNING)
+
+    directory = tempfile.mkdtemp(prefix="bench-incremental-")
+    failures = []
+    try:
+        base_path = make_pdf(os.path.join(directory, "report.pdf"), pages=args.pages)
+        cache = PageCache(os.path.join(directory, "pages.sqlite3"))
+        # The first extraction fills the page cache (and imports the PDF libraries)
+        incremental_pdf_markdown(base_path, submit_images, cache, VERSION, title="report.pdf")
+        print(f"{'changed':>8}  {'extracted':>9}  {'seconds':>8}  {'full s':>8}  {'vs full':>8}  {'matches full':>12}")
+
+        for revision, changed in enumerate(changed_counts, start=1):
+            path = os.path.join(directory, f"report-r{revision}.pdf")
+            pages = write_revision(base_path, path, changed, revision)
+            misses = cache.misses
+            start = time.perf_counter()
+            md = incremental_pdf_markdown(path, submit_images, cache, VERSION, title="report.pdf")
+            seconds = time.perf_counter() - start
+            extracted = cache.misses - misses
+
+            start = time.perf_counter()
+            full_md = extract_pdf_markdown(path, upload_images, title="report.pdf")
+            full_seconds = time.perf_counter() - start
+
+            matches = md == full_md
+            print(f"{len(pages):8}  {extracted:9}  {seconds:8.2f}  {full_seconds:8.2f}  {seconds / full_seconds:8.0%}  "
+                  f"{str(matches):>12}")
+            if extracted != len(pages):
+                failures.append(f"{len(pages)} changed pages, but {extracted} were extracted")
+            if not matches:
+                failures.append(f"the Markdown with {len(pages)} changed pages differs from a full extraction")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    for message in failures:
+        print(f"FAIL: {message}")
+    if failures:
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Shows that memory-bounded extraction keeps peak RSS flat as the page count grows.
+
+Generates "scanned" PDFs (one incompressible full-page image per page) of increasing length
+and extracts each in a fresh process, once with the in-memory engine (extract_pdf_markdown)
+and once in memory-bounded mode (spool_pdf_markdown). Image uploads go to a stub that keeps
+nothing. Reports each run's RSS growth over the process baseline and exits with 1 when the
+memory-bounded growth between the shortest and the longest PDF exceeds --tolerance-mb.
+
+Run from the server/ directory:
+    python -m benchmarks.bench_large_pdf --pages 100,200,400,800
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import multiprocessing
+from concurrent.futures import Future
+
+from benchmarks.fixtures import make_scan_pdf
+
+
+def done_future(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def upload_images(images):
+    return ["https://bucket.s3.local/image.png" for _ in images]
+
+
+def submit_images(images):
+    return [done_future("https://bucket.s3.local/image.png") for _ in images]
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(mode, pdf_path, queue):
+    """Extracts the PDF in this (fresh) process; puts (seconds, baseline MB, peak MB, Markdown bytes)."""
+    import fitz  # noqa: F401 (imported up front so the baseline includes the libraries)
+    import pdfplumber  # noqa: F401
+    from pdf_engine import extract_pdf_markdown, spool_pdf_markdown
+
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    if mode == "in-memory":
+        size = len(extract_pdf_markdown(pdf_path, upload_images, title="scan.pdf").encode("utf-8"))
+    else:
+        with spool_pdf_markdown(pdf_path, submit_images, title="scan.pdf") as md_file:
+            size = md_file.seek(0, os.SEEK_END)
+    queue.put((time.perf_counter() - start, baseline, peak_rss_mb(), size))
+
+
+def run(mode, pdf_path):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=measure, args=(mode, pdf_path, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", default="100,200,400,800", help="comma-separated page counts")
+    parser.add_argument("--image-size", type=int, default=300, help="side of each page image in pixels")
+    parser.add_argument("--tolerance-mb", type=float, default=30)
+    args = parser.parse_args()
+    page_counts = [int(pages) for pages in args.pages.split(",")]
+
+    growth = {"in-memory": [], "memory-bounded": []}
+    directory = tempfile.mkdtemp(prefix="bench-large-pdf-")
+    try:
+        print(f"{'pages':>6}  {'PDF MB':>7}  {'mode':>15}  {'seconds':>8}  {'RSS growth MB':>13}  {'Markdown KB':>11}")
+        for pages in page_counts:
+            pdf_path = make_scan_pdf(os.path.join(directory, f"scan{pages}.pdf"), pages=pages, image_size=args.image_size)
+            pdf_mb = os.path.getsize(pdf_path) / 1e6
+            for mode in growth:
+                seconds, baseline, peak, size = run(mode, pdf_path)
+                growth[mode].append(peak - baseline)
+                print(f"{pages:>6}  {pdf_mb:7.1f}  {mode:>15}  {seconds:8.2f}  {peak - baseline:13.1f}  {size / 1024:11.1f}")
+            os.remove(pdf_path)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    bounded = growth["memory-bounded"]
+    spread = max(bounded) - min(bounded)
+    print(f"\nMemory-bounded RSS growth varies by {spread:.1f} MB from {page_counts[0]} to {page_counts[-1]} pages "
+          f"(in-memory: {max(growth['in-memory']) - min(growth['in-memory']):.1f} MB)")
+    if spread > args.tolerance_mb:
+        print(f"FAIL: more than the {args.tolerance_mb:.0f} MB tolerance")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
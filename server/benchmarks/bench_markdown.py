@@ -0,0 +1,72 @@
+"""Micro-benchmarks the Markdown writer against `+=` string building on large synthetic tables.
+
+Run from the server/ directory:
+    python -m benchmarks.bench_markdown --rows 100000
+"""
+import io
+import sys
+import time
+import argparse
+
+from markdown_writer import MarkdownWriter
+
+
+def synthetic_table(rows, cols):
+    """Rows of mixed cells, including None values and pipes that must be escaped."""
+    return [[None if (r + c) % 7 == 0 else f"r{r}|c{c}" if c == 0 else r * c for c in range(cols)] for r in range(rows)]
+
+
+class Holder:
+    """Keeps the accumulator on an attribute, where CPython cannot append to the string in place."""
+    md = ""
+
+
+def concat_local(table):
+    """The original pattern (with the None crash patched out so it can run)."""
+    md = ""
+    for row in table:
+        md += "| " + " | ".join("" if cell is None else str(cell) for cell in row) + " |\n"
+    return md
+
+
+def concat_attribute(table):
+    holder = Holder()
+    for row in table:
+        holder.md += "| " + " | ".join("" if cell is None else str(cell) for cell in row) + " |\n"
+    return holder.md
+
+
+def writer_list(table):
+    writer = MarkdownWriter()
+    writer.table(table)
+    return writer.getvalue()
+
+
+def writer_stringio(table):
+    writer = MarkdownWriter(io.StringIO())
+    writer.table(table)
+    return writer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--cols", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    table = synthetic_table(args.rows, args.cols)
+    print(f"Table: {args.rows} rows x {args.cols} columns")
+    for name, fn in (("+= local", concat_local), ("+= attribute", concat_attribute),
+                     ("writer (list)", writer_list), ("writer (StringIO)", writer_stringio)):
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            md = fn(table)
+            timings.append(time.perf_counter() - start)
+        print(f"{name:>18}: {min(timings):.3f}s  ({len(md) / 1e6:.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
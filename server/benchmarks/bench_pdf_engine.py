@@ -0,0 +1,71 @@
+"""Compares the single-pass PDF engine with the legacy two-pass path.
+
+Run from the server/ directory:
+    python -m benchmarks.bench_pdf_engine --pages 300
+"""
+import os
+import sys
+import time
+import resource
+import argparse
+import multiprocessing
+
+from benchmarks.fixtures import temp_pdf
+
+
+def fake_upload(*args, **kwargs):
+    return "https://bucket.s3.local/object"
+
+
+def fake_upload_batch(images):
+    return [fake_upload() for _ in images]
+
+
+def run_two_pass(pdf_path):
+    import main
+    main.upload_file_to_s3 = fake_upload
+    return main.extract_images_to_md(pdf_path) + main.extract_text_tables_to_md(pdf_path)
+
+
+def run_single_pass(pdf_path):
+    from pdf_engine import extract_pdf_markdown
+    return extract_pdf_markdown(pdf_path, fake_upload_batch)
+
+
+def measure(target, pdf_path, queue):
+    """Runs one variant in a fresh process so peak RSS is not shared between variants."""
+    start = time.perf_counter()
+    md = target(pdf_path)
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((elapsed, peak_kb, len(md)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pdf_path = temp_pdf(pages=args.pages)
+    print(f"Corpus: {args.pages} pages, {os.path.getsize(pdf_path) / 1e6:.1f} MB")
+    ctx = multiprocessing.get_context("spawn")
+    try:
+        for name, target in (("two-pass", run_two_pass), ("single-pass", run_single_pass)):
+            timings, peaks = [], []
+            for _ in range(args.repeat):
+                queue = ctx.Queue()
+                proc = ctx.Process(target=measure, args=(target, pdf_path, queue))
+                proc.start()
+                elapsed, peak_kb, md_len = queue.get()
+                proc.join()
+                timings.append(elapsed)
+                peaks.append(peak_kb)
+            print(f"{name:>12}: best {min(timings):.3f}s  peak RSS {max(peaks) / 1024:.1f} MB  ({md_len} chars)")
+    finally:
+        os.remove(pdf_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
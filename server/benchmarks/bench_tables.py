@@ -0,0 +1,97 @@
+"""Compares the pandas DataFrame round-trip with html_table.Table on pages with hundreds of tables.
+
+Reports the one-off cost of importing pandas (measured in a fresh interpreter) and the
+per-page cost of building and rendering every table both ways. The HTML is parsed once up
+front so only the table handling is timed.
+
+Run from the server/ directory:
+    python -m benchmarks.bench_tables --tables 500
+"""
+import sys
+import time
+import argparse
+import subprocess
+
+from bs4 import BeautifulSoup
+
+from benchmarks.fixtures import make_tables_html
+from html_extract import make_cell, make_table
+
+
+def legacy_make_table(table_data):
+    """The original conversion: a DataFrame per table with the first row promoted to header."""
+    import pandas as pd
+    df = pd.DataFrame(table_data)
+    if len(df) > 1:
+        df.columns = df.iloc[0]
+        df = df[1:].reset_index(drop=True)
+    return df
+
+
+def import_seconds(module):
+    """Wall time of `import module` in a fresh interpreter, minus the interpreter start-up."""
+    def run(code):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        return time.perf_counter() - start
+    baseline = min(run("pass") for _ in range(3))
+    return max(0.0, min(run(f"import {module}") for _ in range(3)) - baseline)
+
+
+def collect_cells(html):
+    """Cells of every table as (text, colspan, rowspan), plus the plain text rows the old code saw."""
+    soup = BeautifulSoup(html, "lxml")
+    spanned, plain = [], []
+    for node in soup.find_all("table"):
+        rows = [row.find_all(["td", "th"]) for row in node.find_all("tr")]
+        spanned.append([
+            [make_cell(col.get_text(strip=True), col.get("colspan"), col.get("rowspan")) for col in row]
+            for row in rows
+        ])
+        plain.append([[col.get_text(strip=True) for col in row] for row in rows])
+    return spanned, plain
+
+
+def best_of(repeat, fn, *args):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def pandas_render(plain):
+    return "".join(legacy_make_table(rows).to_markdown(index=False) + "\n\n" for rows in plain)
+
+
+def table_render(spanned):
+    return "".join(make_table(rows).to_markdown() + "\n" for rows in spanned)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tables", type=int, default=500)
+    parser.add_argument("--rows", type=int, default=12)
+    parser.add_argument("--cols", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    html = make_tables_html(tables=args.tables, rows=args.rows, cols=args.cols)
+    spanned, plain = collect_cells(html)
+    print(f"Page: {len(spanned)} tables of {args.rows} rows x {args.cols} columns with colspan/rowspan")
+
+    print(f"{'import pandas':>24}: {import_seconds('pandas'):.3f}s (once per process)")
+    print(f"{'import html_table':>24}: {import_seconds('html_table'):.3f}s")
+
+    legacy, _ = best_of(args.repeat, pandas_render, plain)
+    current, markdown = best_of(args.repeat, table_render, spanned)
+    print(f"{'DataFrame + to_markdown':>24}: {legacy:.3f}s ({legacy / len(plain) * 1e3:.2f} ms/table, spans ignored)")
+    print(f"{'Table.to_markdown':>24}: {current:.3f}s ({current / len(spanned) * 1e3:.2f} ms/table, "
+          f"{legacy / current:.0f}x faster)")
+    print(f"\nFirst table:\n{markdown.split(chr(10) + chr(10))[0]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""Compares the full and read-only openpyxl loaders on Adobe-style table files.
+
+Reports per-table time and peak Python heap (tracemalloc) for a single large table, then
+wall time for a result ZIP of several tables converted serially and concurrently.
+
+Run from the server/ directory:
+    python -m benchmarks.bench_xlsx --rows 20000 --tables 8
+"""
+import io
+import sys
+import time
+import zipfile
+import argparse
+import tracemalloc
+
+import openpyxl
+
+from xlsx_tables import xlsx_table_markdown, tables_to_markdown
+
+
+def make_xlsx(rows, cols):
+    """Returns XLSX bytes with a header row and `rows` rows of mixed numeric/text cells."""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append([f"Column {c}" for c in range(cols)])
+    for r in range(rows):
+        sheet.append([r * c + 0.25 if c % 2 else f"Account {r}-{c}" for c in range(cols)])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def make_result_zip(data, tables):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as result_zip:
+        for index in range(tables):
+            result_zip.writestr(f"tables/fileoutpart{index}.xlsx", data)
+    return zipfile.ZipFile(io.BytesIO(buffer.getvalue()))
+
+
+def measure(fn):
+    """Returns (seconds, peak MB allocated, result). Time and memory come from separate runs
+    because tracemalloc slows allocation-heavy code several times over."""
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 1e6, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--cols", type=int, default=12)
+    parser.add_argument("--tables", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    data = make_xlsx(args.rows, args.cols)
+    print(f"Table: {args.rows} rows x {args.cols} columns ({len(data) / 1e6:.1f} MB xlsx)")
+
+    outputs = {}
+    for name, read_only in (("full", False), ("read-only", True)):
+        seconds, peak, outputs[name] = measure(lambda: xlsx_table_markdown("tables/t.xlsx", data, read_only=read_only))
+        print(f"{name:>10}: {seconds:.3f}s per table, peak heap {peak:.1f} MB")
+    if outputs["full"] != outputs["read-only"]:
+        print("Markdown differs between loaders", file=sys.stderr)
+        return 1
+
+    result_zip = make_result_zip(data, args.tables)
+    print(f"\nResult ZIP with {args.tables} tables")
+    for name, workers, read_only in (("full, serial", 1, False), ("read-only, serial", 1, True),
+                                     (f"read-only, {args.workers} workers", args.workers, True)):
+        start = time.perf_counter()
+        tables_to_markdown(result_zip, workers=workers, read_only=read_only)
+        print(f"{name:>22}: {time.perf_counter() - start:.3f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
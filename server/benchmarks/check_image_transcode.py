@@ -0,0 +1,87 @@
+"""Checks that transcode_image keeps the tones of images Pillow does not convert to 8-bit directly.
+
+Runs 16-bit grayscale (I;16 PNG), 32-bit grayscale (I) and CMYK gradients through the
+transcoder and compares the mean brightness of the decoded output with that of the input, scaled
+to 0-255. Also transcodes an image too wide for WebP at full resolution, which must come back
+unchanged instead of raising. Fails (exit code 1) when an output drifts by more than the
+tolerance, e.g. a 16-bit scan saturating to white, or the wide image is not kept as it was.
+
+Run from the server/ directory:
+    python -m benchmarks.check_image_transcode
+"""
+import io
+import sys
+import argparse
+
+from PIL import Image, ImageStat
+
+from image_transcode import transcode_image
+
+SIZE = 256
+
+
+def gradient(mode, high):
+    """A SIZE x SIZE horizontal gradient from 0 to `high` in `mode`."""
+    image = Image.new(mode, (SIZE, SIZE))
+    image.putdata([x * high // (SIZE - 1) for _ in range(SIZE) for x in range(SIZE)])
+    return image
+
+
+def cmyk_gradient():
+    """A CMYK gradient of black ink from none to full (white to black once converted)."""
+    black = gradient("L", 255)
+    empty = Image.new("L", (SIZE, SIZE))
+    return Image.merge("CMYK", (empty, empty, empty, black))
+
+
+def encoded(image, format):
+    buffer = io.BytesIO()
+    image.save(buffer, format=format)
+    return buffer.getvalue()
+
+
+def output_mean(data):
+    """Mean brightness (0-255) of a transcoded image."""
+    return ImageStat.Stat(Image.open(io.BytesIO(data)).convert("L")).mean[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tolerance", type=float, default=8, help="largest allowed drift of the mean, 0-255")
+    args = parser.parse_args()
+
+    cases = [
+        # name, encoded input, image ext, expected mean brightness
+        ("16-bit grayscale PNG", encoded(gradient("I;16", 65535), "PNG"), "png", 127.5),
+        ("32-bit grayscale TIFF", encoded(gradient("I", 65535), "TIFF"), "tiff", 127.5),
+        ("CMYK JPEG", encoded(cmyk_gradient(), "JPEG"), "jpg", 127.5),
+    ]
+    failures = []
+    print(f"{'input':<24}  {'output':>6}  {'expected':>8}  {'mean':>6}")
+    for name, data, ext, expected in cases:
+        image = transcode_image(data, ext, image_format="webp", thumbnail_size=0)
+        mean = output_mean(image.data)
+        print(f"{name:<24}  {image.ext:>6}  {expected:8.1f}  {mean:6.1f}")
+        if abs(mean - expected) > args.tolerance:
+            failures.append(f"{name}: mean brightness {mean:.1f}, expected {expected:.1f}")
+
+    wide = encoded(Image.new("RGB", (17000, 20), "gray"), "PNG")
+    try:
+        image = transcode_image(wide, "png", image_format="webp", max_dimension=0, thumbnail_size=0)
+        kept = image is not None and image.data == wide and image.ext == "png"
+        print(f"{'17000x20 PNG, no resize':<24}  {image.ext if image else 'None':>6}  {'kept':>8}  {str(kept):>6}")
+        if not kept:
+            failures.append("17000x20 PNG: not kept as it was")
+    except Exception as e:
+        failures.append(f"17000x20 PNG: {e!r}")
+
+    for message in failures:
+        print(f"FAIL: {message}")
+    if failures:
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Checks the server's cold-start import time against a budget using `python -X importtime`.
+
+Imports main in fresh interpreters, reports the best cumulative import time and the slowest
+top-level imports, and fails (exit code 1) when the time exceeds the budget or when any
+extraction backend is imported eagerly.
+
+Run from the server/ directory:
+    python -m benchmarks.check_import_time --budget-ms 500
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+from warmup import BACKEND_MODULES
+
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "500"))
+
+# Must stay out of sys.modules after `import main`; pandas is only needed by Table.to_dataframe()
+LAZY_MODULES = sorted({module.split(".")[0] for modules in BACKEND_MODULES.values() for module in modules} | {"pandas"})
+
+PROBE = (
+    "import sys, json, main; "
+    f"print(json.dumps([name for name in {LAZY_MODULES!r} if name in sys.modules]))"
+)
+
+
+def import_profile():
+    """Runs one cold import of main; returns (total_ms, {top-level module: ms}, eager backends)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    total_ms, top_level = 0.0, {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            _, cumulative, name = line.split("|")
+            cumulative_ms = int(cumulative) / 1000
+        except ValueError:
+            continue  # header line
+        if name.strip() == "main" and not name.startswith("  "):
+            total_ms = cumulative_ms
+        elif name.startswith("   ") and not name.startswith("    "):
+            # Direct imports of main (one level of indentation)
+            top_level[name.strip()] = cumulative_ms
+    return total_ms, top_level, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+
+    # The first run may also write .pyc files, so keep the fastest run
+    runs = [import_profile() for _ in range(args.runs)]
+    total_ms, top_level, eager = min(runs, key=lambda run: run[0])
+
+    print(f"import main: {total_ms:.0f} ms (best of {args.runs}, budget {args.budget_ms:.0f} ms)")
+    for name, ms in sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    failed = False
+    if eager:
+        print(f"FAIL: backends imported eagerly: {', '.join(eager)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"FAIL: import time {total_ms:.0f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
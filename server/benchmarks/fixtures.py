@@ -0,0 +1,121 @@
+import os
+import random
+import tempfile
+
+import fitz  # PyMuPDF
+
+
+################################################################################
+#                         SYNTHETIC BENCHMARK CORPUS                           #
+################################################################################
+
+def make_png(width=64, height=64, seed=0):
+    """Returns PNG bytes of a small generated image (different for every seed)."""
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, width, height), False)
+    pix.set_rect(pix.irect, ((seed * 37) % 256, (seed * 91) % 256, (seed * 53) % 256))
+    return pix.tobytes("png")
+
+
+def draw_table(page, top, rows=6, cols=4, cell_w=110, cell_h=18, left=50):
+    """Draws a ruled table with text in every cell."""
+    for r in range(rows + 1):
+        page.draw_line((left, top + r * cell_h), (left + cols * cell_w, top + r * cell_h))
+    for c in range(cols + 1):
+        page.draw_line((left + c * cell_w, top), (left + c * cell_w, top + rows * cell_h))
+    for r in range(rows):
+        for c in range(cols):
+            page.insert_text((left + c * cell_w + 4, top + r * cell_h + 13), f"r{r}c{c}", fontsize=9)
+
+
+def make_pdf(path, pages=50, table_every=5, image_every=3, logo=True):
+    """Writes a PDF with text on every page, a ruled table every `table_every` pages,
+    a unique figure every `image_every` pages and (optionally) the same logo on every page."""
+    doc = fitz.open()
+    logo_png = make_png(32, 32, seed=999)
+    for page_num in range(pages):
+        page = doc.new_page()
+        y = 72
+        for line in range(25):
+            page.insert_text((50, y), f"Page {page_num + 1} line {line + 1}: lorem ipsum dolor sit amet.", fontsize=10)
+            y += 14
+        if table_every and page_num % table_every == 0:
+            draw_table(page, top=y + 10)
+        if image_every and page_num % image_every == 0:
+            page.insert_image(fitz.Rect(300, 600, 400, 700), stream=make_png(seed=page_num))
+        if logo:
+            page.insert_image(fitz.Rect(500, 20, 540, 60), stream=logo_png)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def make_scan_pdf(path, pages=100, image_size=300, seed=0):
+    """Writes a PDF that looks like a scan: every page is one full-page image of noise (which
+    does not compress, so each page carries about image_size² * 3 bytes) plus a line of text."""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        pix = fitz.Pixmap(fitz.csRGB, image_size, image_size, rng.randbytes(image_size * image_size * 3), False)
+        page.insert_image(page.rect, pixmap=pix)
+        page.insert_text((50, 40), f"Scanned page {page_num + 1}", fontsize=10)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def temp_pdf(pages=50, **kwargs):
+    """Creates a synthetic PDF in the temp directory and returns its path."""
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    return make_pdf(path, pages=pages, **kwargs)
+
+
+def make_html(paragraphs=2000, tables=20, rows=10, links=1000, images=200):
+    """Returns a large synthetic HTML page with paragraphs, links, images and tables."""
+    parts = ["<html><head><title>Benchmark page</title></head><body>"]
+    for i in range(paragraphs):
+        parts.append(f"<div class='section'><p>Paragraph {i} with <b>bold</b> and <i>italic</i> text.</p>")
+        if i < links:
+            parts.append(f"<a href='/article/{i}.html'>link {i}</a>")
+        if i < images:
+            parts.append(f"<img src='//cdn.example.com/img/{i}.png' alt='img {i}'>")
+        if tables and i % max(1, paragraphs // tables) == 0:
+            parts.append("<table><tr>" + "".join(f"<th>col {c}</th>" for c in range(5)) + "</tr>")
+            for r in range(rows):
+                parts.append("<tr>" + "".join(f"<td>{r * c}</td>" for c in range(5)) + "</tr>")
+            parts.append("</table>")
+        parts.append("</div>")
+    parts.append("</body></html>")
+    return "".join(parts).encode("utf-8")
+
+
+def make_tables_html(tables=300, rows=12, cols=6, spans=True):
+    """Returns an HTML page made of many small tables; with `spans`, every table has a
+    colspan header cell and a rowspan label column like typical financial/spec tables."""
+    parts = ["<html><head><title>Table benchmark</title></head><body>"]
+    for t in range(tables):
+        parts.append(f"<h2>Table {t}</h2><table>")
+        if spans:
+            parts.append(f"<tr><th rowspan='2'>Item</th><th colspan='{cols - 1}'>Quarter {t}</th></tr>")
+            parts.append("<tr>" + "".join(f"<th>Q{c}</th>" for c in range(1, cols)) + "</tr>")
+        else:
+            parts.append("<tr>" + "".join(f"<th>col {c}</th>" for c in range(cols)) + "</tr>")
+        for r in range(rows):
+            label = f"<td rowspan='2'>Group {r // 2}</td>" if spans and r % 2 == 0 else "" if spans else f"<td>Row {r}</td>"
+            parts.append("<tr>" + label + "".join(f"<td>{t * r * c}</td>" for c in range(1, cols)) + "</tr>")
+        parts.append("</table>")
+    parts.append("</body></html>")
+    return "".join(parts).encode("utf-8")
+
+
+def write_html_site(directory, pages=20, **kwargs):
+    """Saves a site of `pages` linked HTML pages (page0.html ...) into `directory`; returns the file names."""
+    os.makedirs(directory, exist_ok=True)
+    names = [f"page{i}.html" for i in range(pages)]
+    for i, name in enumerate(names):
+        nav = "".join(f"<a href='{other}'>{other}</a>" for other in names if other != name)
+        html = make_html(**kwargs).replace(b"<body>", f"<body><h1>Page {i}</h1><nav>{nav}</nav>".encode(), 1)
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(html)
+    return names
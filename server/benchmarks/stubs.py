@@ -0,0 +1,203 @@
+import io
+import json
+import time
+import uuid
+import zipfile
+import threading
+import functools
+import http.server
+
+import fitz  # PyMuPDF
+
+
+################################################################################
+#                  LOCAL STAND-INS FOR S3, ADOBE AND APIFY                     #
+################################################################################
+# Each stub answers after a fixed latency instead of going over the network, so the
+# extraction code around it (upload pools, long-polling, ZIP handling) is measured as is.
+
+class StubS3Client:
+    """Replaces the boto3 S3 client used by S3Uploader; keeps object sizes in memory."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.objects = {}
+        self._lock = threading.Lock()
+
+    def _store(self, key, size):
+        time.sleep(self.latency)
+        with self._lock:
+            self.objects[key] = size
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None, Config=None):
+        self._store(key, len(fileobj.read()))
+
+    def upload_file(self, file_path, bucket, key, Config=None):
+        with open(file_path, "rb") as f:
+            self._store(key, len(f.read()))
+
+    def head_object(self, Bucket, Key):
+        from botocore.exceptions import ClientError
+
+        time.sleep(self.latency)
+        with self._lock:
+            if Key not in self.objects:
+                raise ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, "HeadObject")
+        return {"ContentLength": self.objects[Key]}
+
+    def reset(self):
+        with self._lock:
+            self.objects.clear()
+
+
+def install_s3_stub(uploader, latency=0.0):
+    """Points an S3Uploader at a StubS3Client and forgets the keys it has seen."""
+    uploader._client = StubS3Client(latency)
+    reset_s3_stub(uploader)
+    return uploader._client
+
+
+def reset_s3_stub(uploader):
+    """Empties the stub bucket and the uploader's dedup cache, so every document is uploaded cold."""
+    uploader._client.reset()
+    with uploader._known_lock:
+        uploader._known_keys.clear()
+
+
+def make_adobe_result_zip(pdf_path, table_every=5, rows=6, cols=4):
+    """Builds the ZIP Adobe's Extract API would return for the PDF: structuredData.json with one
+    text element per text block, the embedded images under figures/ and an XLSX per table."""
+    import openpyxl
+
+    elements, figures, tables = [], [], 0
+    with fitz.open(pdf_path) as doc:
+        for page in doc:
+            for block in page.get_text("blocks"):
+                elements.append({"Path": f"//Document/P[{len(elements) + 1}]", "Page": page.number, "Text": block[4].strip()})
+            for image in page.get_images(full=True):
+                extracted = doc.extract_image(image[0])
+                figures.append((extracted["image"], extracted["ext"]))
+            if table_every and page.number % table_every == 0:
+                tables += 1
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as result_zip:
+        result_zip.writestr("structuredData.json", json.dumps({"elements": elements}))
+        for index, (data, ext) in enumerate(figures):
+            result_zip.writestr(f"figures/fileoutpart{index}.{ext}", data)
+        for index in range(tables):
+            workbook = openpyxl.Workbook()
+            sheet = workbook.active
+            sheet.append([f"Column {c}" for c in range(cols)])
+            for r in range(rows):
+                sheet.append([f"r{r}c{c}" for c in range(cols)])
+            xlsx = io.BytesIO()
+            workbook.save(xlsx)
+            result_zip.writestr(f"tables/fileoutpart{index}.xlsx", xlsx.getvalue())
+    return buffer.getvalue()
+
+
+class _Result:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class StubPDFServices:
+    """Replaces the Adobe PDFServices session: answers every job with `result_zip` after `latency` seconds."""
+
+    def __init__(self, result_zip=None, latency=0.0):
+        self.result_zip = result_zip
+        self.latency = latency
+
+    def upload(self, input_stream, mime_type):
+        from adobe.pdfservices.operation.io.cloud_asset import CloudAsset
+
+        return CloudAsset(str(uuid.uuid4()), "stub://upload")
+
+    def submit(self, job):
+        return "stub://job"
+
+    def get_job_result(self, location, result_type):
+        time.sleep(self.latency)
+        return _Result(get_result=lambda: _Result(get_resource=lambda: location))
+
+    def get_content(self, asset):
+        return _Result(get_input_stream=lambda: self.result_zip)
+
+
+class _StubRun:
+    def __init__(self, client, run_id):
+        self.client = client
+        self.run_id = run_id
+
+    def get(self):
+        return self.client.run_state(self.run_id)
+
+    def wait_for_finish(self, wait_secs=None):
+        run = self.client.runs[self.run_id]
+        remaining = run["finishes_at"] - time.monotonic()
+        if remaining > 0:
+            time.sleep(min(remaining, wait_secs or remaining))
+        return self.get()
+
+
+class _StubDataset:
+    def __init__(self, items):
+        self.items = items
+
+    def iterate_items(self):
+        yield from self.items
+
+
+class StubApifyClient:
+    """Replaces ApifyClient: every actor run succeeds after `latency` seconds. `pages` maps URLs to
+    dataset items; a run's dataset is its start URL's item followed by the others, up to maxResults."""
+
+    def __init__(self, pages, latency=0.0):
+        self.pages = pages
+        self.latency = latency
+        self.runs = {}
+        self._lock = threading.Lock()
+
+    def actor(self, actor_id):
+        return self
+
+    def start(self, run_input=None, wait_for_finish=None, webhooks=None):
+        run_id = str(uuid.uuid4())
+        with self._lock:
+            self.runs[run_id] = {"finishes_at": time.monotonic() + self.latency, "input": run_input or {}}
+        return _StubRun(self, run_id).wait_for_finish(wait_for_finish)
+
+    def run(self, run_id):
+        return _StubRun(self, run_id)
+
+    def run_state(self, run_id):
+        finished = time.monotonic() >= self.runs[run_id]["finishes_at"]
+        return {"id": run_id, "status": "SUCCEEDED" if finished else "RUNNING", "defaultDatasetId": run_id}
+
+    def dataset(self, dataset_id):
+        run_input = self.runs[dataset_id]["input"]
+        urls = list(self.pages)
+        start = urls.index(run_input["startUrls"][0]) if run_input.get("startUrls", [None])[0] in self.pages else 0
+        ordered = urls[start:] + urls[:start]
+        return _StubDataset([self.pages[url] for url in ordered[:run_input.get("maxResults", len(ordered))]])
+
+
+class _SlowHandler(http.server.SimpleHTTPRequestHandler):
+    latency = 0.0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_directory(directory, latency=0.0):
+    """Serves saved HTML from `directory` on a local port, answering each GET after `latency`
+    seconds; returns (server, base URL). Call server.shutdown() when done."""
+    handler = type("Handler", (_SlowHandler,), {"latency": latency})
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(handler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
@@ -0,0 +1,174 @@
+import os
+import time
+import logging
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import count, in_caller_context, timed
+
+
+################################################################################
+#                    CONCURRENT OPEN-SOURCE WEBSITE CRAWLER                    #
+################################################################################
+
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "15"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+CRAWL_WORKERS = int(os.getenv("CRAWL_WORKERS", "8"))
+# Default and upper bound of the pages one crawl fetches
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "50"))
+CRAWL_MAX_DEPTH = int(os.getenv("CRAWL_MAX_DEPTH", "3"))
+CRAWL_HOST_RATE = float(os.getenv("CRAWL_HOST_RATE", "5"))  # requests per second per host
+USER_AGENT = os.getenv("HTTP_USER_AGENT", "DAMG-Content-Extractor/1.0")
+
+CRAWL_SCOPES = ("host", "domain", "any")
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def make_session(pool_size=HTTP_POOL_SIZE):
+    """Builds a requests.Session with a pooled, retrying HTTP adapter."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    retries = Retry(total=2, backoff_factor=0.5, status_forcelist=(429, 502, 503, 504), allowed_methods=("GET", "HEAD"))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+def get_session():
+    """Returns the process-wide pooled HTTP session."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = make_session()
+    return _session
+
+
+def fetch(url, session=None, timeout=HTTP_TIMEOUT):
+    """GETs `url` over the pooled session and returns the response (raises on HTTP errors)."""
+    response = (session or get_session()).get(url, timeout=timeout)
+    response.raise_for_status()
+    return response
+
+
+class HostRateLimiter:
+    """Spaces out requests to the same host to at most `rate` per second."""
+
+    def __init__(self, rate=CRAWL_HOST_RATE):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def normalize_url(url):
+    """Drops the fragment so `page#a` and `page#b` are crawled once."""
+    return urllib.parse.urldefrag(url)[0]
+
+
+def in_scope(url, seed_hosts, scope):
+    """Checks whether `url` may be crawled for the given seed hosts and scope."""
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ("http", "https"):
+        return False
+    if scope == "any":
+        return True
+    host = parts.hostname or ""
+    if scope == "host":
+        return host in seed_hosts
+    # "domain": the seed host or any of its subdomains
+    return any(host == seed or host.endswith("." + seed) for seed in seed_hosts)
+
+
+class Crawler:
+    """Breadth-first crawler that fetches each depth level concurrently.
+
+    `parse(url, html)` must return (text, image_urls, link_urls, tables), like
+    extract_website_content; its link_urls feed the next level.
+    """
+
+    def __init__(self, parse, session=None, workers=CRAWL_WORKERS, max_pages=CRAWL_MAX_PAGES, rate=CRAWL_HOST_RATE):
+        self.parse = parse
+        self.session = session or get_session()
+        self.workers = workers
+        self.max_pages = max(1, min(max_pages, CRAWL_MAX_PAGES))
+        self.rate_limiter = HostRateLimiter(rate)
+
+    def crawl(self, seeds, depth=0, scope="domain"):
+        """Returns a list of (url, parsed_content) in breadth-first discovery order.
+
+        Pages that fail to download are logged and skipped.
+        """
+        return list(self.iter_crawl(seeds, depth=depth, scope=scope))
+
+    def iter_crawl(self, seeds, depth=0, scope="domain"):
+        """Like crawl(), but yields each (url, parsed_content) as soon as it and every page
+        before it in discovery order have been fetched."""
+        depth = max(0, min(depth, CRAWL_MAX_DEPTH))
+        seeds = [normalize_url(seed) for seed in seeds]
+        seed_hosts = {urllib.parse.urlsplit(seed).hostname for seed in seeds}
+        seen = set(seeds)
+        level = list(dict.fromkeys(seeds))[:self.max_pages]
+        page_count = 0
+
+        # Fetch and parse timings go to the breakdown of the request running the crawl
+        fetch_and_parse = in_caller_context(self._fetch_and_parse)
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="crawl") as executor:
+            for current_depth in range(depth + 1):
+                if not level:
+                    break
+                logging.info(f"Crawling depth {current_depth}: {len(level)} pages")
+                next_level = []
+                for url, content in zip(level, executor.map(fetch_and_parse, level)):
+                    if content is None:
+                        continue
+                    yield url, content
+                    page_count += 1
+                    if current_depth == depth:
+                        continue
+                    for link in content[2]:
+                        link = normalize_url(link)
+                        if link in seen or not in_scope(link, seed_hosts, scope):
+                            continue
+                        if len(seen) >= self.max_pages:
+                            break
+                        seen.add(link)
+                        next_level.append(link)
+                level = next_level
+
+        logging.info(f"Crawled {page_count} pages from {len(seeds)} seed(s)")
+
+    def _fetch_and_parse(self, url):
+        import requests
+
+        self.rate_limiter.wait(url)
+        try:
+            with timed("http_fetch"):
+                response = fetch(url, self.session)
+        except requests.RequestException as e:
+            logging.warning(f"Skipping {url}: {e}")
+            return None
+        if "html" not in response.headers.get("Content-Type", "text/html"):
+            logging.info(f"Skipping non-HTML page {url}")
+            return None
+        count("input_bytes", len(response.content))
+        with timed("html_parse"):
+            return self.parse(url, response.content)
@@ -0,0 +1,128 @@
+import os
+import logging
+import urllib.parse
+import importlib.util
+
+from html_table import MAX_COLSPAN, MAX_ROWSPAN, Table, parse_span
+
+
+################################################################################
+#                    SINGLE-TRAVERSAL HTML CONTENT EXTRACTOR                   #
+################################################################################
+
+HTML_PARSERS = ("lxml", "html.parser", "selectolax")
+
+# Probed without importing, so BeautifulSoup and lxml load with the first page parsed
+_DEFAULT_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+HTML_PARSER = os.getenv("HTML_PARSER", _DEFAULT_PARSER)
+
+# Tags collected in the single document-order traversal
+CONTENT_TAGS = ("p", "img", "a", "table")
+
+
+def resolve_image_url(url, src):
+    if src.startswith('//'):
+        return 'https:' + src
+    if not src.startswith(('http:', 'https:')):
+        return urllib.parse.urljoin(url, src)
+    return src
+
+
+def resolve_link_url(url, href):
+    if not href.startswith(('http:', 'https:')):
+        return urllib.parse.urljoin(url, href)
+    return href
+
+
+def make_cell(text, colspan, rowspan):
+    return text, parse_span(colspan, MAX_COLSPAN), parse_span(rowspan, MAX_ROWSPAN)
+
+
+def make_table(table_data):
+    """Turns extracted rows of (text, colspan, rowspan) cells into a Table whose first row is the header."""
+    return Table.from_cells(table_data)
+
+
+def parse_website_content(url, html, parser=None):
+    """Extracts text, images, links, and tables from the HTML of `url` in one traversal.
+
+    `parser` selects the backend: "lxml" (default when installed), "html.parser" or
+    "selectolax" (optional dependency, lexbor engine).
+
+    Returns:
+    - Extracted text
+    - List of image URLs
+    - List of all hyperlinks
+    - List of tables (html_table.Table)
+    """
+    parser = parser or HTML_PARSER
+    if parser not in HTML_PARSERS:
+        raise ValueError(f"Unknown HTML parser '{parser}'. Choose one of {', '.join(HTML_PARSERS)}.")
+    if parser == "selectolax":
+        return _parse_with_selectolax(url, html)
+    return _parse_with_bs4(url, html, parser)
+
+
+def _parse_with_bs4(url, html, parser):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, parser)
+    paragraphs, image_urls, link_urls, extracted_tables = [], [], [], []
+
+    for node in soup.find_all(CONTENT_TAGS):
+        if node.name == 'p':
+            paragraphs.append(node.get_text(strip=True))
+        elif node.name == 'img':
+            if 'src' in node.attrs:
+                image_urls.append(resolve_image_url(url, node['src']))
+        elif node.name == 'a':
+            if node.get('href') is not None:
+                link_urls.append(resolve_link_url(url, node['href']))
+        else:
+            table_data = [
+                [
+                    make_cell(col.get_text(strip=True), col.get('colspan'), col.get('rowspan'))
+                    for col in row.find_all(['td', 'th'])
+                ]
+                for row in node.find_all('tr')
+            ]
+            if table_data:
+                extracted_tables.append(make_table(table_data))
+
+    return '\n'.join(paragraphs), image_urls, link_urls, extracted_tables
+
+
+def _parse_with_selectolax(url, html):
+    try:
+        from selectolax.lexbor import LexborHTMLParser
+    except ImportError:
+        logging.warning("selectolax is not installed, falling back to the lxml/html.parser backend")
+        return _parse_with_bs4(url, html, _DEFAULT_PARSER)
+
+    tree = LexborHTMLParser(html)
+    paragraphs, image_urls, link_urls, extracted_tables = [], [], [], []
+
+    for node in tree.css(", ".join(CONTENT_TAGS)):
+        if node.tag == 'p':
+            paragraphs.append(node.text(strip=True))
+        elif node.tag == 'img':
+            src = node.attributes.get('src')
+            if src is not None:
+                image_urls.append(resolve_image_url(url, src))
+        elif node.tag == 'a':
+            href = node.attributes.get('href')
+            if href is not None:
+                link_urls.append(resolve_link_url(url, href))
+        else:
+            table_data = [
+                [
+                    make_cell(col.text(strip=True), col.attributes.get('colspan'), col.attributes.get('rowspan'))
+                    for col in row.css('td, th')
+                ]
+                for row in node.css('tr')
+            ]
+            if table_data:
+                extracted_tables.append(make_table(table_data))
+
+    return '\n'.join(paragraphs), image_urls, link_urls, extracted_tables
@@ -0,0 +1,127 @@
+from markdown_writer import MarkdownWriter
+
+
+################################################################################
+#                    LIGHTWEIGHT COLUMNAR TABLE FOR HTML TABLES                #
+################################################################################
+
+# Upper bounds from the HTML spec, so a hostile span cannot allocate a huge grid
+MAX_COLSPAN = 1000
+MAX_ROWSPAN = 65534
+
+
+def parse_span(value, limit):
+    """Reads a colspan/rowspan attribute; missing, invalid or zero values count as 1."""
+    try:
+        span = int(str(value).strip().rstrip(";"))
+    except (TypeError, ValueError):
+        return 1
+    return min(max(span, 1), limit)
+
+
+def expand_spans(rows):
+    """Lays out rows of (text, colspan, rowspan) cells on a rectangular grid.
+
+    A spanning cell's text is repeated in every grid cell it covers, and short rows are
+    padded with empty strings, so every returned row has the same width.
+    """
+    grid = []
+    pending = {}  # column -> [text, rows still covered below]
+    for row in rows:
+        out = []
+        col = 0
+        cells = iter(row)
+        cell = next(cells, None)
+        while cell is not None or any(c >= col for c in pending):
+            if col in pending:
+                text, remaining = pending[col]
+                out.append(text)
+                if remaining == 1:
+                    del pending[col]
+                else:
+                    pending[col][1] = remaining - 1
+                col += 1
+                continue
+            if cell is None:
+                # Gap before a cell spanning down from an earlier row
+                out.append("")
+                col += 1
+                continue
+            text, colspan, rowspan = cell
+            for _ in range(colspan):
+                out.append(text)
+                if rowspan > 1:
+                    pending[col] = [text, rowspan - 1]
+                col += 1
+            cell = next(cells, None)
+        grid.append(out)
+
+    # Rowspans that run past the last <tr> are cut off, as browsers do
+    width = max((len(row) for row in grid), default=0)
+    for row in grid:
+        if len(row) < width:
+            row.extend([""] * (width - len(row)))
+    return grid
+
+
+class Table:
+    """A table stored as one list per column, with the first source row as header.
+
+    Replaces a pandas DataFrame per HTML table: building one is a few list operations,
+    and rendering needs neither pandas nor tabulate. Use to_dataframe() where pandas is
+    genuinely needed.
+    """
+
+    __slots__ = ("header", "columns")
+
+    def __init__(self, header, columns):
+        self.header = header
+        self.columns = columns
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Builds a table from rectangular rows. As with the DataFrame it replaces, a single
+        row becomes data under numbered column headers."""
+        if not rows:
+            return cls([], [])
+        if len(rows) == 1:
+            header, body = [str(i) for i in range(len(rows[0]))], rows
+        else:
+            header, body = rows[0], rows[1:]
+        return cls(list(header), [list(column) for column in zip(*body)] or [[] for _ in header])
+
+    @classmethod
+    def from_cells(cls, rows):
+        """Builds a table from rows of (text, colspan, rowspan) cells."""
+        return cls.from_rows(expand_spans(rows))
+
+    @property
+    def shape(self):
+        return (len(self.columns[0]) if self.columns else 0, len(self.header))
+
+    def __len__(self):
+        return self.shape[0]
+
+    def rows(self):
+        """Iterates over the body rows as tuples."""
+        return zip(*self.columns)
+
+    def to_markdown(self, writer=None):
+        """Renders the table as a Markdown pipe table.
+
+        With `writer` (a MarkdownWriter) the rows are written into it and None is returned;
+        otherwise the Markdown is returned as a string.
+        """
+        out = writer if writer is not None else MarkdownWriter()
+        if self.header:
+            out.table_row(self.header)
+            out.write("| " + " | ".join(["---"] * len(self.header)) + " |\n")
+            out.table(self.rows())
+        if writer is None:
+            return out.getvalue()
+        return None
+
+    def to_dataframe(self):
+        """Converts to a pandas DataFrame (pandas is imported only here)."""
+        import pandas as pd
+        return pd.DataFrame(list(self.rows()), columns=self.header)
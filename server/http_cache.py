@@ -0,0 +1,103 @@
+import os
+import json
+import logging
+import tempfile
+from collections import namedtuple
+
+from crawler import HTTP_TIMEOUT, get_session
+from result_cache import CacheStats, SQLiteCacheBackend
+
+
+################################################################################
+#                    CONDITIONAL-GET HTTP RESPONSE CACHE                       #
+################################################################################
+
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "1") == "1"
+HTTP_CACHE_PATH = os.getenv("HTTP_CACHE_PATH", os.path.join(tempfile.gettempdir(), "http_responses.sqlite3"))
+# Total size of the stored responses; least recently used pages are evicted above it
+HTTP_CACHE_MAX_MB = int(os.getenv("HTTP_CACHE_MAX_MB", "256"))
+
+# A fetched page. `not_modified` is True when the server answered a revalidation with 304; the
+# content is then the stored body and `markdown_url` the Markdown previously generated from it
+# by the same extractor version (None if there is none).
+CachedResponse = namedtuple(
+    "CachedResponse", ["url", "content", "etag", "last_modified", "markdown_url", "not_modified"],
+    defaults=[None, False],
+)
+
+
+def encode_response(value):
+    """Stores a response as its JSON metadata, a newline (never inside compact JSON) and the raw body."""
+    metadata = {key: item for key, item in value.items() if key != "body"}
+    return json.dumps(metadata).encode() + b"\n" + value["body"]
+
+
+def decode_response(data):
+    metadata, _, body = bytes(data).partition(b"\n")
+    return {**json.loads(metadata), "body": body}
+
+
+class HTTPCache(CacheStats):
+    """Stores page bodies with their ETag/Last-Modified validators in SQLite and revalidates them
+    with If-None-Match/If-Modified-Since, so an unchanged page is neither downloaded nor parsed again.
+
+    Only responses that carry a validator are stored (without one there is nothing to revalidate).
+    """
+
+    def __init__(self, path=HTTP_CACHE_PATH, max_bytes=HTTP_CACHE_MAX_MB * 1024 * 1024):
+        super().__init__(SQLiteCacheBackend(path, table="http_responses", encode=encode_response, decode=decode_response))
+        self.path = path
+        self.max_bytes = max_bytes
+
+    def get(self, url, version=None):
+        """Returns the stored CachedResponse for `url` (markdown_url only if made by `version`), or None."""
+        entry = self.backend.get(url)
+        if entry is None:
+            return None
+        value = entry[0]
+        markdown_url = value["markdown_url"] if value["version"] == version else None
+        return CachedResponse(url, value["body"], value["etag"], value["last_modified"], markdown_url)
+
+    def fetch(self, url, version=None, session=None, timeout=HTTP_TIMEOUT):
+        """GETs `url`, conditionally when a validated copy is stored. Returns a CachedResponse."""
+        cached = self.get(url, version)
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        response = (session or get_session()).get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and cached is not None:
+            self.record(hits=1)
+            logging.info(f"HTTP cache: {url} not modified")
+            return cached._replace(not_modified=True)
+        response.raise_for_status()
+        self.record(misses=1)
+
+        cache_control = response.headers.get("Cache-Control", "").lower()
+        return CachedResponse(
+            url, response.content,
+            None if "no-store" in cache_control else response.headers.get("ETag"),
+            None if "no-store" in cache_control else response.headers.get("Last-Modified"),
+        )
+
+    def store(self, response, version=None, markdown_url=None):
+        """Keeps a fetched page (and the Markdown made from it) for revalidation; returns whether it was stored.
+
+        A page that cannot be kept replaces nothing: any older copy of the URL is deleted, so its
+        validators are not sent again for content that has since changed.
+        """
+        if not (response.etag or response.last_modified) or len(response.content) > self.max_bytes:
+            self.backend.delete(response.url)
+            return False
+        self.backend.set(response.url, {
+            "etag": response.etag, "last_modified": response.last_modified,
+            "markdown_url": markdown_url, "version": version, "body": response.content,
+        })
+        self.record(evictions=self.backend.evict(max_bytes=self.max_bytes))
+        return True
+
+    def stats(self):
+        return {**super().stats(), "bytes": self.backend.total_bytes(), "max_bytes": self.max_bytes}
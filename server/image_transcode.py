@@ -0,0 +1,148 @@
+import io
+import os
+import logging
+from collections import namedtuple
+
+from metrics import count, timed
+
+
+################################################################################
+#                 IMAGE TRANSCODING BEFORE UPLOAD                              #
+################################################################################
+
+# "0" uploads images exactly as they were extracted
+IMAGE_TRANSCODE = os.getenv("IMAGE_TRANSCODE", "1") == "1"
+# Web format images are converted to: "webp" or "jpeg" (images with transparency stay PNG with jpeg)
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "webp").lower()
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+# Longer side in pixels above which images are downsampled (0 keeps the resolution)
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "2048"))
+# Images with a side shorter than this many pixels (rules, bullets, spacers) are dropped as decorative
+IMAGE_MIN_DIMENSION = int(os.getenv("IMAGE_MIN_DIMENSION", "16"))
+# Longer side of the thumbnail stored next to every image (0 makes none)
+IMAGE_THUMBNAIL_SIZE = int(os.getenv("IMAGE_THUMBNAIL_SIZE", "256"))
+
+# Formats browsers display as they are; other extracted formats (JPX, JBIG2, TIFF, PNM, ...) are
+# always converted, even when the conversion is larger
+WEB_FORMATS = {"png", "jpg", "jpeg", "gif", "webp"}
+
+# A transcoded image. `data`/`ext` is what gets uploaded (the original when that is smaller or
+# cannot be decoded); `thumbnail` is (bytes, ext) or None; `original_size` is the extracted size.
+TranscodedImage = namedtuple("TranscodedImage", ["data", "ext", "thumbnail", "original_size"])
+
+
+def output_format(has_alpha, image_format=None):
+    """Pillow format and file extension for an image, given IMAGE_FORMAT."""
+    image_format = image_format or IMAGE_FORMAT
+    if image_format == "webp":
+        return "WEBP", "webp"
+    return ("PNG", "png") if has_alpha else ("JPEG", "jpg")
+
+
+def to_display_mode(image):
+    """Converts the modes Pillow would convert badly: 16/32-bit grayscale (which `convert("L")`
+    clips to white) is scaled down to 8-bit L, and CMYK goes through its embedded ICC profile to sRGB."""
+    if image.mode.startswith("I;16") or image.mode == "I":
+        if image.mode != "I":
+            image = image.convert("I")
+        high = image.getextrema()[1]
+        # 16-bit samples span 0-65535; 32-bit ones are scaled by their own maximum
+        scale = 255 / max(high, 65535) if high > 255 else 1
+        return image.point(lambda value: value * scale).convert("L")
+    if image.mode == "CMYK" and image.info.get("icc_profile"):
+        from PIL import ImageCms
+
+        try:
+            profile = ImageCms.ImageCmsProfile(io.BytesIO(image.info["icc_profile"]))
+            return ImageCms.profileToProfile(image, profile, ImageCms.createProfile("sRGB"), outputMode="RGB")
+        except (ImageCms.PyCMSError, OSError) as e:
+            logging.debug(f"Converting a CMYK image without its ICC profile: {e}")
+    return image.convert("RGB") if image.mode == "CMYK" else image
+
+
+def encode(image, pillow_format, quality):
+    buffer = io.BytesIO()
+    if pillow_format == "JPEG":
+        image.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+    elif pillow_format == "WEBP":
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+    else:
+        image.save(buffer, format=pillow_format, optimize=True)
+    return buffer.getvalue()
+
+
+def transcode_image(data, ext, image_format=None, quality=None, max_dimension=None, min_dimension=None,
+                    thumbnail_size=None):
+    """Converts one extracted image to a web format, downsampling it above `max_dimension`;
+    returns a TranscodedImage, or None for a decorative image (a side below `min_dimension`).
+    An image Pillow cannot decode or convert (e.g. beyond WebP's 16383 pixel limit) is kept as it was."""
+    from PIL import Image
+
+    quality = IMAGE_QUALITY if quality is None else quality
+    max_dimension = IMAGE_MAX_DIMENSION if max_dimension is None else max_dimension
+    min_dimension = IMAGE_MIN_DIMENSION if min_dimension is None else min_dimension
+    thumbnail_size = IMAGE_THUMBNAIL_SIZE if thumbnail_size is None else thumbnail_size
+    ext = ext.lower()
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except Exception as e:
+        logging.debug(f"Keeping a .{ext} image Pillow cannot decode: {e}")
+        return TranscodedImage(data, ext, None, len(data))
+    if min(image.size) < min_dimension:
+        return None
+    try:
+        return convert_image(image, data, ext, image_format, quality, max_dimension, thumbnail_size)
+    except Exception as e:
+        logging.warning(f"Keeping a {image.size[0]}x{image.size[1]} .{ext} image that could not be transcoded: {e}")
+        return TranscodedImage(data, ext, None, len(data))
+
+
+def convert_image(image, data, ext, image_format, quality, max_dimension, thumbnail_size):
+    """The conversion, downsampling and thumbnail of a decoded image, for transcode_image."""
+    from PIL import Image
+
+    image = to_display_mode(image)
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+    pillow_format, out_ext = output_format(has_alpha, image_format)
+    # Palette, 1-bit and LAB images become RGB(A); grayscale stays single-channel
+    mode = "RGBA" if has_alpha else ("L" if image.mode == "L" else "RGB")
+    if image.mode != mode:
+        image = image.convert(mode)
+
+    resized = bool(max_dimension) and max(image.size) > max_dimension
+    if resized:
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    encoded = encode(image, pillow_format, quality)
+    if not resized and ext in WEB_FORMATS and len(encoded) >= len(data):
+        encoded, out_ext = data, ext  # already a web format and smaller as it was
+
+    thumbnail = None
+    if thumbnail_size:
+        thumb = image.copy()
+        thumb.thumbnail((thumbnail_size, thumbnail_size), Image.LANCZOS)
+        thumb_format, thumb_ext = output_format(False, image_format)
+        if has_alpha and thumb_format == "JPEG":
+            background = Image.new("RGB", thumb.size, "white")
+            background.paste(thumb, mask=thumb.getchannel("A"))
+            thumb = background
+        thumbnail = (encode(thumb, thumb_format, quality), thumb_ext)
+    return TranscodedImage(encoded, out_ext, thumbnail, len(data))
+
+
+def prepare_upload(data, suffix, enabled=None):
+    """`prepare` hook for S3Uploader.submit_content_addressed_batch: transcodes one image inside its
+    upload task. Returns (data, suffix, thumbnail) to upload, or None for a dropped decorative
+    image, and records the time spent, the bytes saved and the images dropped."""
+    enabled = IMAGE_TRANSCODE if enabled is None else enabled
+    if not enabled:
+        return data, suffix, None
+    with timed("image_transcode"):
+        image = transcode_image(data, suffix.lstrip("."))
+    if image is None:
+        count("image_bytes_saved", len(data))
+        count("images_dropped")
+        return None
+    count("image_bytes_saved", len(data) - len(image.data))
+    return image.data, f".{image.ext}", image.thumbnail
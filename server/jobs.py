@@ -0,0 +1,150 @@
+import os
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+################################################################################
+#                         BACKGROUND JOB QUEUE                                 #
+################################################################################
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "100"))
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# The job being executed by the current worker thread (if any)
+_current = threading.local()
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue already holds the maximum number of pending jobs."""
+
+
+class Job:
+    """State of a single extraction job."""
+
+    def __init__(self, kind, params=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params or {}
+        self.state = QUEUED
+        self.stage = QUEUED
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def done(self):
+        return self.state in (SUCCEEDED, FAILED)
+
+    def to_dict(self):
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "state": self.state,
+            "stage": self.stage,
+            "progress": round(self.progress, 3),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.result is not None:
+            data.update(self.result)
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+
+class JobQueue:
+    """Runs blocking extraction functions on a bounded pool of worker threads."""
+
+    def __init__(self, max_workers=JOB_WORKERS, max_pending=JOB_MAX_PENDING, ttl=JOB_TTL_SECONDS):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="extract-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, *args, params=None):
+        """Queues `fn(*args)` and returns the Job immediately.
+
+        `fn` must return a dict which becomes part of the job status (e.g. {"markdown_url": ...}).
+        """
+        with self._lock:
+            self._prune()
+            pending = sum(1 for job in self._jobs.values() if not job.done)
+            if pending >= self.max_pending:
+                raise QueueFullError(f"Job queue is full ({pending} pending jobs).")
+            job = Job(kind, params)
+            self._jobs[job.id] = job
+
+        self._executor.submit(self._run, job, fn, args)
+        logging.info(f"Queued {kind} job {job.id}")
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            counts = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job.state] += 1
+        return {"workers": self.max_workers, "max_pending": self.max_pending, "jobs": counts}
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self, job, fn, args):
+        job.state = RUNNING
+        job.stage = RUNNING
+        job.started_at = time.time()
+        _current.job = job
+        try:
+            job.result = fn(*args)
+            job.state = SUCCEEDED
+            job.stage = "done"
+            job.progress = 1.0
+            logging.info(f"Job {job.id} succeeded in {time.time() - job.started_at:.2f}s")
+        except Exception as e:
+            job.error = getattr(e, "detail", None) or str(e)
+            job.state = FAILED
+            job.stage = FAILED
+            logging.exception(f"Job {job.id} failed: {job.error}")
+        finally:
+            job.finished_at = time.time()
+            _current.job = None
+
+    def _prune(self):
+        """Drops finished jobs older than the TTL. Caller must hold the lock."""
+        cutoff = time.time() - self.ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.done and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+def report_progress(stage, progress=None):
+    """Records the current stage (and optionally a 0-1 progress value) of the running job.
+
+    Safe to call from any extraction function; it is a no-op outside of a job worker.
+    """
+    job = getattr(_current, "job", None)
+    if job is None:
+        return
+    job.stage = stage
+    if progress is not None:
+        job.progress = max(0.0, min(1.0, progress))
@@ -1,36 +1,51 @@
+from typing import List, Optional
+
 from fastapi import FastAPI, UploadFile, File, HTTPException, Form
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from contextlib import asynccontextmanager, contextmanager
+import io
 import os
+import hashlib
 import zipfile
 import logging
-import urllib.parse
-import pandas as pd
 import tempfile
-import requests
+import threading
 import json
-import fitz  # PyMuPDF
-import pdfplumber
-import boto3
-import shutil
 import time
 
-import openpyxl
 from dotenv import load_dotenv
 
-from bs4 import BeautifulSoup
-from adobe.pdfservices.operation.auth.service_principal_credentials import ServicePrincipalCredentials
-from adobe.pdfservices.operation.pdf_services import PDFServices
-from adobe.pdfservices.operation.pdf_services_media_type import PDFServicesMediaType
-from adobe.pdfservices.operation.pdfjobs.jobs.extract_pdf_job import ExtractPDFJob
-from adobe.pdfservices.operation.pdfjobs.params.extract_pdf.extract_element_type import ExtractElementType
-from adobe.pdfservices.operation.pdfjobs.params.extract_pdf.extract_pdf_params import ExtractPDFParams
-from adobe.pdfservices.operation.pdfjobs.result.extract_pdf_result import ExtractPDFResult
-from adobe.pdfservices.operation.pdfjobs.params.extract_pdf.extract_renditions_element_type import ExtractRenditionsElementType
-from apify_client import ApifyClient
+# Extraction backends (PyMuPDF, pdfplumber, openpyxl, BeautifulSoup, boto3, the Adobe SDK and
+# ApifyClient) are imported on first use or by the start-up warm-up, not here; see warmup.py
+
 
 
 
 load_dotenv()
 
+# Local modules read their settings from the environment at import time, so import them after .env is loaded
+from jobs import JobQueue, QueueFullError, report_progress
+from pdf_engine import (
+    MemoryCeilingExceeded, extract_pdf_markdown, incremental_pdf_markdown, shutdown_process_pool, spool_pdf_markdown,
+    stream_pdf_markdown, use_low_memory,
+)
+from pdf_router import describe_route, route_pages, route_pdf, write_page_range
+from s3_uploader import S3Uploader, new_object_key
+from crawler import Crawler, CRAWL_SCOPES, CRAWL_MAX_PAGES, fetch, get_session
+from html_extract import parse_website_content
+from apify_runner import ApifyRunError, APIFY_API_URL, APIFY_RUN_TIMEOUT, start_and_wait, valid_webhook_token, wait_for_run, webhook_registry
+from batch import BATCH_MAX_DOCUMENTS, BATCH_MAX_IN_FLIGHT, run_batch
+from markdown_writer import MarkdownWriter
+from xlsx_tables import table_file_names, tables_to_markdown
+from result_cache import ResultCache, SQLiteCacheBackend, RESULT_CACHE_ENABLED
+from http_cache import CachedResponse, HTTPCache, HTTP_CACHE_ENABLED
+from image_transcode import prepare_upload
+from page_cache import PageCache, PAGE_CACHE_ENABLED
+from metrics import PROMETHEUS_CONTENT_TYPE, collect, count, metrics, record_stage, timed
+from streaming import MarkdownStream, SSE_HEADERS, SSE_MEDIA_TYPE, sse_event
+from warmup import WARMUP_BACKENDS, WARMUP_BLOCKING, parse_backends, warm_up
+
 
 # # Fetch credentials from environment variables
 AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
@@ -43,7 +58,22 @@ APIFY_API_TOKEN = os.getenv("APIFY_API_TOKEN")
 
 
 
-client = ApifyClient(APIFY_API_TOKEN)
+APIFY_ACTOR_ID = os.getenv("APIFY_ACTOR_ID", "OutlPf9SFs5BPflRj")
+
+_apify_client = None
+_apify_client_lock = threading.Lock()
+
+
+def get_apify_client():
+    """Returns the shared ApifyClient (imported and created on first use)."""
+    global _apify_client
+    if _apify_client is None:
+        with _apify_client_lock:
+            if _apify_client is None:
+                from apify_client import ApifyClient
+                _apify_client = ApifyClient(APIFY_API_TOKEN, api_url=APIFY_API_URL)
+    return _apify_client
+
 # FastAPI app
 
 
@@ -51,27 +81,47 @@ client = ApifyClient(APIFY_API_TOKEN)
 #                         S3 UPLOAD FUNCTION                                   #
 ################################################################################
 
+s3_uploader = S3Uploader(
+    S3_BUCKET_NAME,
+    region=AWS_DEFAULT_REGION,
+    access_key_id=AWS_ACCESS_KEY_ID,
+    secret_access_key=AWS_SECRET_ACCESS_KEY,
+)
+
+
 def upload_file_to_s3(file_path):
     """Uploads a file to S3 and returns its URL."""
-    s3_client = boto3.client(
-        's3',
-        aws_access_key_id=AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-        region_name=AWS_DEFAULT_REGION
-    )
-
-    object_key = os.path.basename(file_path)
-    try:
-        s3_client.upload_file(file_path, S3_BUCKET_NAME, object_key)
-        return f"https://{S3_BUCKET_NAME}.s3.{AWS_DEFAULT_REGION}.amazonaws.com/{object_key}"
-    except Exception as e:
-        logging.error(f"Failed to upload {file_path} to S3: {e}")
-        return None
+    return s3_uploader.upload_file(file_path)
+
+
+def upload_markdown_to_s3(md_content):
+    """Uploads Markdown text straight from memory to S3 and returns its URL."""
+    data = md_content.encode("utf-8")
+    count("markdown_bytes", len(data))
+    with timed("s3_markdown"):
+        return s3_uploader.upload_bytes(data, new_object_key(".md"))
+
+
+def upload_markdown_file_to_s3(md_file):
+    """Streams a Markdown document from a binary file object to S3 and returns its URL."""
+    md_file.seek(0, os.SEEK_END)
+    size = md_file.tell()
+    md_file.seek(0)
+    count("markdown_bytes", size)
+    with timed("s3_markdown"):
+        md_s3_url = s3_uploader.upload_fileobj(md_file, new_object_key(".md"))
+    if md_s3_url:
+        count("s3_upload_bytes", size)
+    return md_s3_url
 
 
 def extract_images_to_md(pdf_path):
-    print("hello world!!!")
-    """Extract images from PDF, upload to S3, and return Markdown with image links."""
+    """Extract images from PDF, upload to S3, and return Markdown with image links.
+
+    Two-pass path, superseded by pdf_engine.extract_pdf_markdown; kept for benchmarking.
+    """
+    import fitz  # PyMuPDF
+
     doc = fitz.open(pdf_path)
     md_images = "\n## Extracted Images\n"
     for page_num in range(len(doc)):
@@ -101,151 +151,215 @@ def extract_images_to_md(pdf_path):
 
 
 def extract_text_tables_to_md(pdf_path):
-    """Extract text and tables from PDF using pdfplumber and return Markdown."""
-    md_text = "\n## Extracted Text\n"
-    md_tables = "\n## Extracted Tables\n"
+    """Extract text and tables from PDF using pdfplumber and return Markdown.
+
+    Two-pass path, superseded by pdf_engine.extract_pdf_markdown; kept for benchmarking.
+    """
+    import pdfplumber
+
+    md_text = MarkdownWriter()
+    md_tables = MarkdownWriter()
+    md_text.write("\n## Extracted Text\n")
+    md_tables.write("\n## Extracted Tables\n")
     
     with pdfplumber.open(pdf_path) as pdf:
         for page_num, page in enumerate(pdf.pages):
             page_text = page.extract_text() or ""
-            md_text += f"\n### Page {page_num+1}\n```\n{page_text}\n```\n"
+            md_text.write(f"\n### Page {page_num+1}\n```\n{page_text}\n```\n")
 
             # Extract tables
             tables = page.extract_tables()
             for table in tables:
-                md_tables += f"\n### Table (Page {page_num+1})\n"
-                for row in table:
-                    md_tables += "| " + " | ".join(row) + " |\n"
+                md_tables.write(f"\n### Table (Page {page_num+1})\n")
+                md_tables.table(table)
+
+            # Release the page's cached layout objects before moving on
+            page.close()
 
-    return md_text + md_tables
+    return md_text.getvalue() + md_tables.getvalue()
 
 
-def open_source_extract_pdf(pdf_path):
-    """Extract images, text, and tables, then format as Markdown."""
-    md = f"# Extracted Content from {os.path.basename(pdf_path)}\n"
-    md += extract_images_to_md(pdf_path)
-    md += extract_text_tables_to_md(pdf_path)
+def upload_image_bytes_to_s3(images):
+    """Uploads (image_bytes, image_ext) pairs from memory to S3 as one concurrent batch under
+    content-addressed keys, so repeated images share one object; returns the URLs in order.
+
+    Each image is transcoded in its own upload task (see image_transcode.prepare_upload), so
+    transcoding and uploading overlap. Dropped decorative images get s3_uploader.SKIPPED and
+    failed uploads None.
+    """
+    return [future.result() for future in submit_image_bytes_to_s3(images)]
+
+
+def submit_image_bytes_to_s3(images):
+    """Like upload_image_bytes_to_s3, but returns one Future per image instead of waiting."""
+    return s3_uploader.submit_content_addressed_batch(
+        [(data, f".{ext}") for data, ext in images], prepare=prepare_upload
+    )
+
+
+def open_source_extract_pdf(pdf_path, emit=None):
+    """Extract images, text, and tables in a single pass, then format as Markdown.
+
+    With `emit`, a Markdown preview of every page is passed to it as soon as the page is done.
+    With the page cache enabled, only pages not seen before (e.g. the changed pages of a revised
+    report) are extracted; the others are taken from the page cache.
+    Very large PDFs (see pdf_engine.PDF_LOW_MEMORY) are extracted in memory-bounded mode, with
+    the Markdown spooled to a temp file and streamed to S3.
+    """
+    if use_low_memory(pdf_path):
+        try:
+            md_file = spool_pdf_markdown(pdf_path, submit_image_bytes_to_s3, emit=emit)
+        except MemoryCeilingExceeded as e:
+            raise HTTPException(status_code=503, detail=f"{e}. Try again later.")
+        report_progress("upload", 0.9)
+        with md_file:
+            return upload_markdown_file_to_s3(md_file)
+
+    if page_cache is not None:
+        md = incremental_pdf_markdown(pdf_path, submit_image_bytes_to_s3, page_cache, EXTRACTOR_VERSION, emit=emit)
+    elif emit is None:
+        md = extract_pdf_markdown(pdf_path, upload_image_bytes_to_s3)
+    else:
+        md = stream_pdf_markdown(pdf_path, submit_image_bytes_to_s3, emit)
     
     # Save markdown to S3
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".md") as md_file:
-        md_file.write(md.encode())
-        md_file_path = md_file.name
+    report_progress("upload", 0.9)
+    return upload_markdown_to_s3(md)
 
-    md_s3_url = upload_file_to_s3(md_file_path)
-    os.remove(md_file_path)
 
-    return md_s3_url
+logging.basicConfig(level=logging.INFO)
 
+ADOBE_CLIENT_ID = os.getenv('PDF_SERVICES_CLIENT_ID')
+ADOBE_CLIENT_SECRET = os.getenv('PDF_SERVICES_CLIENT_SECRET')
 
-logging.basicConfig(level=logging.INFO)
+_pdf_services = None
+_pdf_services_lock = threading.Lock()
 
-def extract_pdf_elements(pdf_path):
-    #Extracts text, tables, and image renditions using Adobe PDF Services.
-    try:
-        # Load Adobe credentials
-        # with open(ADOBE_CREDENTIALS_PATH, "r") as f:
-        #     adobe_data = json.load(f)
-
-        # credentials = ServicePrincipalCredentials(
-        #     client_id=adobe_data["client_credentials"]["client_id"],
-        #     client_secret=adobe_data["client_credentials"]["client_secret"]
-        # )
-        credentials = ServicePrincipalCredentials(
-            client_id=os.getenv('PDF_SERVICES_CLIENT_ID'),
-            client_secret=os.getenv('PDF_SERVICES_CLIENT_SECRET')
-        )
-        pdf_services = PDFServices(credentials=credentials)
 
-        # Upload PDF to Adobe API
-        with open(pdf_path, "rb") as f:
-            input_stream = f.read()
-        input_asset = pdf_services.upload(input_stream=input_stream, mime_type=PDFServicesMediaType.PDF)
+def get_pdf_services():
+    """Returns the shared, authenticated PDFServices session (created on first use).
 
-        # Extract text, tables, and image renditions
-        extract_params = ExtractPDFParams(
-            elements_to_extract=[ExtractElementType.TEXT, ExtractElementType.TABLES],
-            elements_to_extract_renditions=[ExtractRenditionsElementType.FIGURES]  # Extract images as renditions
-        )
-        job = ExtractPDFJob(input_asset=input_asset, extract_pdf_params=extract_params)
-        location = pdf_services.submit(job)
-        pdf_services_response = pdf_services.get_job_result(location, ExtractPDFResult)
+    The SDK caches and refreshes its access token itself, so one session serves every request.
+    """
+    global _pdf_services
+    if _pdf_services is None:
+        with _pdf_services_lock:
+            if _pdf_services is None:
+                from adobe.pdfservices.operation.auth.service_principal_credentials import ServicePrincipalCredentials
+                from adobe.pdfservices.operation.pdf_services import PDFServices
+
+                credentials = ServicePrincipalCredentials(
+                    client_id=ADOBE_CLIENT_ID,
+                    client_secret=ADOBE_CLIENT_SECRET
+                )
+                _pdf_services = PDFServices(credentials=credentials)
+    return _pdf_services
 
-        # Download the extraction results (ZIP file)
-        result_asset = pdf_services_response.get_result().get_resource()
-        stream_asset = pdf_services.get_content(result_asset)
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".zip") as temp_zip:
-            temp_zip.write(stream_asset.get_input_stream())  #  FIXED: No `.read()` needed
-            temp_zip_path = temp_zip.name
+def extract_pdf_elements(pdf_path, pdf_services=None):
+    """Extracts text, tables, and image renditions using Adobe PDF Services.
 
-        # Extract ZIP contents
-        output_dir = tempfile.mkdtemp()
-        with zipfile.ZipFile(temp_zip_path, "r") as zip_ref:
-            zip_ref.extractall(output_dir)
+    Returns the parsed structuredData.json and the result ZIP opened in memory.
+    """
+    from adobe.pdfservices.operation.pdf_services_media_type import PDFServicesMediaType
+    from adobe.pdfservices.operation.pdfjobs.jobs.extract_pdf_job import ExtractPDFJob
+    from adobe.pdfservices.operation.pdfjobs.params.extract_pdf.extract_element_type import ExtractElementType
+    from adobe.pdfservices.operation.pdfjobs.params.extract_pdf.extract_pdf_params import ExtractPDFParams
+    from adobe.pdfservices.operation.pdfjobs.result.extract_pdf_result import ExtractPDFResult
+    from adobe.pdfservices.operation.pdfjobs.params.extract_pdf.extract_renditions_element_type import ExtractRenditionsElementType
+
+    try:
+        pdf_services = pdf_services or get_pdf_services()
+
+        with timed("adobe_submit"):
+            # Upload PDF to Adobe API
+            with open(pdf_path, "rb") as f:
+                input_stream = f.read()
+            input_asset = pdf_services.upload(input_stream=input_stream, mime_type=PDFServicesMediaType.PDF)
+
+            # Extract text, tables, and image renditions
+            extract_params = ExtractPDFParams(
+                elements_to_extract=[ExtractElementType.TEXT, ExtractElementType.TABLES],
+                elements_to_extract_renditions=[ExtractRenditionsElementType.FIGURES]  # Extract images as renditions
+            )
+            job = ExtractPDFJob(input_asset=input_asset, extract_pdf_params=extract_params)
+            location = pdf_services.submit(job)
+        with timed("adobe_wait"):
+            pdf_services_response = pdf_services.get_job_result(location, ExtractPDFResult)
+
+        # Download the extraction results (ZIP file) and open it in memory
+        with timed("adobe_download"):
+            result_asset = pdf_services_response.get_result().get_resource()
+            stream_asset = pdf_services.get_content(result_asset)
+            result_zip = zipfile.ZipFile(io.BytesIO(stream_asset.get_input_stream()))
 
         # Read structuredData.json
-        structured_data_path = os.path.join(output_dir, "structuredData.json")
-        if not os.path.exists(structured_data_path):
+        if "structuredData.json" not in result_zip.namelist():
             raise HTTPException(status_code=500, detail="structuredData.json not found in extracted ZIP.")
 
-        with open(structured_data_path, "r", encoding="utf-8") as json_file:
-            extracted_data = json.load(json_file)
+        extracted_data = json.loads(result_zip.read("structuredData.json").decode("utf-8"))
 
-        return extracted_data, output_dir
+        return extracted_data, result_zip
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Adobe PDF Services error: {str(e)}")
 
 
-import logging
+def enterprise_pdf_markdown(pdf_path, pdf_services=None):
+    """Extracts the PDF with Adobe PDF Services, uploads its figures and returns the Markdown string."""
+    report_progress("adobe_extract", 0.1)
+    extracted_data, result_zip = extract_pdf_elements(pdf_path, pdf_services)
 
-def enterprise_extract_pdf(pdf_path):
-    """Main function that extracts text, tables, uploads images, and returns Markdown URL."""
-    try:
-        logging.info("Starting PDF extraction process...")
-        extracted_data, output_dir = extract_pdf_elements(pdf_path)
-
-        logging.info("🔹 Extracting images...")
-        image_links = upload_images_to_s3(output_dir)
-        logging.info(f"Image links: {image_links}")
+    with result_zip:
+        # Start the figure uploads, then convert tables while they are in flight
+        logging.info("🔹 Uploading images...")
+        report_progress("images", 0.6)
+        image_uploads = submit_figure_uploads(result_zip)
 
         logging.info("🔹 Extracting tables from Excel files...")
-        table_markdown = extract_tables_from_xlsx(output_dir)
+        report_progress("tables", 0.75)
+        with timed("xlsx_tables"):
+            table_markdown = extract_tables_from_xlsx(result_zip)
         logging.info(f"Table Markdown content:\n{table_markdown}")
 
-        logging.info("🔹 Generating final Markdown file...")
+        with timed("s3_images"):
+            image_links = collect_figure_uploads(image_uploads)
+        logging.info(f"Image links: {image_links}")
+
+    logging.info("🔹 Generating final Markdown file...")
+    with timed("render"):
         md_content = generate_markdown(extracted_data, image_links, table_markdown)
 
-        # Debug: Ensure Markdown content is not empty
-        if not md_content.strip():
-            logging.error("Markdown content is EMPTY! Something went wrong.")
-            raise HTTPException(status_code=500, detail="Generated Markdown is empty!")
+    # Debug: Ensure Markdown content is not empty
+    if not md_content.strip():
+        logging.error("Markdown content is EMPTY! Something went wrong.")
+        raise HTTPException(status_code=500, detail="Generated Markdown is empty!")
+    return md_content
 
-        # Save Markdown to S3
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".md", mode="w", encoding="utf-8") as md_file:
-            md_file.write(md_content)
-            md_file_path = md_file.name
 
-        # Debug: Ensure Markdown file exists before upload
-        if not os.path.exists(md_file_path):
-            logging.error("Markdown file was NOT created!")
-            raise HTTPException(status_code=500, detail="Markdown file not found before upload!")
+def enterprise_extract_pdf(pdf_path, pdf_services=None, emit=None):
+    """Main function that extracts text, tables, uploads images, and returns Markdown URL.
+
+    Adobe returns the whole document at once, so `emit` (if given) receives it as one chunk.
+    """
+    try:
+        logging.info("Starting PDF extraction process...")
+        md_content = enterprise_pdf_markdown(pdf_path, pdf_services)
+        if emit is not None:
+            emit(md_content)
 
-        logging.info(f"🔹 Uploading Markdown file to S3: {md_file_path}")
-        md_s3_url = upload_file_to_s3(md_file_path)
+        # Save Markdown to S3
+        logging.info(f"🔹 Uploading Markdown to S3 ({len(md_content)} chars)")
+        report_progress("upload", 0.9)
+        md_s3_url = upload_markdown_to_s3(md_content)
 
         # Debug: Ensure S3 upload was successful
         if not md_s3_url:
             logging.error(" Failed to upload Markdown to S3!")
             raise HTTPException(status_code=500, detail="Markdown upload failed!")
 
-        os.remove(md_file_path)
         logging.info(f" Successfully uploaded Markdown file to S3: {md_s3_url}")
 
-        # Cleanup temporary files
-        shutil.rmtree(output_dir)
-        logging.info("Cleaned up temporary files.")
-
         return md_s3_url
 
     except Exception as e:
@@ -253,249 +367,270 @@ def enterprise_extract_pdf(pdf_path):
         raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
 
 
-def upload_images_to_s3(output_dir):
-    """Uploads extracted images from Adobe's `figures/` folder to S3 and returns their URLs."""
-    image_links = []
-    figures_dir = os.path.join(output_dir, "figures")  # Change from `renditions/` to `figures/`
+def extract_pdf_range_markdown(pdf_path, page_range, title):
+    """Markdown of one page range of a split route, extracted by the range's engine."""
+    label = f"pages {page_range.start + 1}-{page_range.stop}"
+    report_progress(f"{page_range.engine} {label}")
+    if page_range.engine == "open-source":
+        md = extract_pdf_markdown(pdf_path, upload_image_bytes_to_s3, title=f"{title} ({label})",
+                                  pages=(page_range.start, page_range.stop))
+    else:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_pdf:
+            range_path = temp_pdf.name
+        try:
+            md = enterprise_pdf_markdown(write_page_range(pdf_path, page_range.start, page_range.stop, range_path))
+        finally:
+            os.remove(range_path)
+    return f"*{label.capitalize()}, extracted with the {page_range.engine} engine*\n\n{md}"
+
+
+def auto_extract_pdf(pdf_path, emit=None):
+    """Routes the PDF (see pdf_router) and extracts it with the faster engine that is adequate for it,
+    or each page range with its own engine; returns (Markdown URL, route)."""
+    with timed("route"):
+        route = route_pdf(pdf_path, enterprise=bool(ADOBE_CLIENT_ID and ADOBE_CLIENT_SECRET))
+    count("routed_documents", route=route.engine)
+    for engine, pages in route_pages(route).items():
+        count("routed_pages", pages, engine=engine)
+
+    # Memory-bounded extraction covers whole documents only, so very large PDFs are not split
+    if route.engine == "open-source" or (route.engine == "split" and use_low_memory(pdf_path)):
+        return open_source_extract_pdf(pdf_path, emit=emit), route
+    if route.engine == "enterprise":
+        return enterprise_extract_pdf(pdf_path, emit=emit), route
+
+    title = os.path.basename(pdf_path)
+    parts = []
+    for page_range in route.ranges:
+        parts.append(extract_pdf_range_markdown(pdf_path, page_range, title))
+        if emit is not None:
+            emit(parts[-1])
+    report_progress("upload", 0.9)
+    return upload_markdown_to_s3("\n---\n\n".join(parts)), route
+
+
+def figure_names(result_zip):
+    """Names of the image renditions in Adobe's `figures/` folder of the result ZIP, in output order."""
+    return sorted(
+        (name for name in result_zip.namelist()
+         if name.startswith("figures/") and name.lower().endswith(('.png', '.jpg', '.jpeg'))),
+        key=lambda name: (len(name), name),  # fileoutpart2 before fileoutpart10
+    )
 
-    if os.path.exists(figures_dir):
-        images = [img for img in os.listdir(figures_dir) if img.lower().endswith(('.png', '.jpg', '.jpeg'))]
-        logging.info(f"Found {len(images)} images in figures/ folder.")
 
-        for img_file in images:
-            img_path = os.path.join(figures_dir, img_file)
-            logging.info(f"Uploading image: {img_path} to S3...")
+def submit_figure_uploads(result_zip):
+    """Starts uploading the `figures/` images straight from the ZIP; returns (name, Future) pairs."""
+    names = figure_names(result_zip)
+    if not names:
+        logging.warning("No figures/ folder found. No images extracted.")
+        return []
 
-            # Upload image to S3
-            s3_url = upload_file_to_s3(img_path)
-            if s3_url:
-                image_links.append(s3_url)
-                logging.info(f"Successfully uploaded {img_file} to S3: {s3_url}")
-            else:
-                logging.error(f"Failed to upload {img_file} to S3.")
+    logging.info(f"Found {len(names)} images in figures/ folder.")
+    figures = [(result_zip.read(name), os.path.splitext(name)[1].lower()) for name in names]
+    count("images", len(figures))
+    count("image_bytes", sum(len(data) for data, _ in figures))
+    # Each figure is transcoded in its upload task; decorative ones resolve to no URL and are
+    # left out of the Markdown
+    return list(zip(names, s3_uploader.submit_content_addressed_batch(figures, prepare=prepare_upload)))
 
-            # Ensure local file cleanup
-            try:
-                os.remove(img_path)
-                logging.info(f"Deleted local file: {img_path}")
-            except Exception as e:
-                logging.error(f"Error deleting {img_path}: {str(e)}")
 
-    else:
-        logging.warning("No figures/ folder found. No images extracted.")
+def collect_figure_uploads(image_uploads):
+    """Waits for the figure uploads and returns the URLs of the successful ones."""
+    image_links = []
+    for name, future in image_uploads:
+        s3_url = future.result()
+        if s3_url:
+            image_links.append(s3_url)
+            logging.info(f"Successfully uploaded {name} to S3: {s3_url}")
+        elif s3_url is None:
+            logging.error(f"Failed to upload {name} to S3.")
+        else:
+            logging.info(f"Left out {name}, a decorative figure.")
 
     logging.info(f"Total images uploaded to S3: {len(image_links)}")
     return image_links
 
 
-def extract_tables_from_xlsx(output_dir):
-    """Extracts table data from Excel files in the `tables/` folder and converts it to Markdown format."""
-    markdown_tables = ""
-    tables_dir = os.path.join(output_dir, "tables")
-
-    if os.path.exists(tables_dir):
-        excel_files = [file for file in os.listdir(tables_dir) if file.endswith(".xlsx")]
-        logging.info(f"Found {len(excel_files)} table files in tables/ folder.")
-
-        for file in excel_files:
-            file_path = os.path.join(tables_dir, file)
-            logging.info(f"Processing table file: {file_path}")
-
-            workbook = openpyxl.load_workbook(file_path)
-            sheet = workbook.active  # Assume data is in the first sheet
-
-            # Generate Markdown for the table
-            markdown_tables += f"## Table from {file}\n\n"
-            for i, row in enumerate(sheet.iter_rows(values_only=True)):
-                row_data = [str(cell) if cell is not None else "" for cell in row]
-                markdown_tables += "| " + " | ".join(row_data) + " |\n"
-                if i == 0:  # Add a separator after the header
-                    markdown_tables += "| " + " | ".join(["---"] * len(row_data)) + " |\n"
-            markdown_tables += "\n"
-
-    else:
-        logging.warning(" No tables/ folder found. No tables extracted.")
-
-    return markdown_tables
+def extract_tables_from_xlsx(result_zip):
+    """Extracts table data from the Excel files in the result ZIP's `tables/` folder and converts it to Markdown format."""
+    count("tables", len(table_file_names(result_zip)))
+    return tables_to_markdown(result_zip)
 
 
 
 
 def generate_markdown(extracted_data, image_links, table_markdown):
     """Generates Markdown content using extracted text, tables, and image links."""
-    md_content = "# Extracted PDF Data\n\n"
+    md_content = MarkdownWriter()
+    md_content.write("# Extracted PDF Data\n\n")
 
     # Extract text
     for element in extracted_data.get("elements", []):
         if "Text" in element:
-            md_content += f"## Extracted Text\n\n{element['Text']}\n\n"
+            md_content.write(f"## Extracted Text\n\n{element['Text']}\n\n")
 
     # Add tables from Excel files
-    md_content += table_markdown
+    md_content.write(table_markdown)
 
     # Add images to Markdown
     if image_links:
-        md_content += "## Extracted Images\n"
+        md_content.write("## Extracted Images\n")
         for idx, img_link in enumerate(image_links, start=1):
-            md_content += f"![Image {idx}]({img_link})\n"
-        md_content += "\n"
+            md_content.write(f"![Image {idx}]({img_link})\n")
+        md_content.write("\n")
 
-    return md_content
+    return md_content.getvalue()
 
 
 
 
 def open_source_extract_website(url: str):
     """Scrape text from a website using BeautifulSoup and upload Markdown to S3."""
-    response = requests.get(url)
-    response.raise_for_status()
-    soup = BeautifulSoup(response.content, 'html.parser')
-
-    paragraphs = soup.find_all('p')
-    text_content = '\n'.join([p.get_text(strip=True) for p in paragraphs])
+    text_content = extract_website_content(url)[0]
 
     md_content = f"# Extracted Content from {url}\n\n## Text Content\n\n{text_content}\n"
 
-    # Save Markdown file
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".md", mode="w", encoding="utf-8") as md_file:
-        md_file.write(md_content)
-        md_file_path = md_file.name
-
-    # Upload to S3
-    md_s3_url = upload_file_to_s3(md_file_path)
-    os.remove(md_file_path)
+    # Upload Markdown to S3
+    md_s3_url = upload_markdown_to_s3(md_content)
 
     return md_s3_url  # Return the S3 URL instead of the raw Markdown text
 
 
-def extract_website_content(url):
+def fetch_page(url):
+    """GETs a web page, revalidating the stored copy through the HTTP cache when it is enabled.
+    Returns an http_cache.CachedResponse."""
+    with timed("http_fetch"):
+        if http_cache is None:
+            return CachedResponse(url, fetch(url).content, None, None)
+        return http_cache.fetch(url, EXTRACTOR_VERSION)
+
+
+def extract_website_content(url, page=None):
     """
     Extracts text, images, links, and tables from a website.
     
     Parameters:
     - url (str): The URL of the website to scrape.
+    - page (CachedResponse): The already fetched page, if any.
 
     Returns:
     - Extracted text
     - List of image URLs
     - List of all hyperlinks
-    - List of tables in Markdown format
+    - List of tables (html_table.Table)
     """
-    response = requests.get(url)
-    response.raise_for_status()  
-    soup = BeautifulSoup(response.content, 'html.parser')
+    page = page or fetch_page(url)
+    count("input_bytes", len(page.content))
+    count("web_pages")
+    with timed("html_parse"):
+        return parse_website_content(url, page.content)
 
-    # Extract text
-    paragraphs = soup.find_all('p')
-    text_content = '\n'.join([p.get_text(strip=True) for p in paragraphs])
-
-    # Extract images
-    images = soup.find_all('img')
-    image_urls = []
-    for img in images:
-        if 'src' in img.attrs:
-            src = img['src']
-            if src.startswith('//'):
-                src = 'https:' + src
-            elif not src.startswith(('http:', 'https:')): 
-                src = urllib.parse.urljoin(url, src)
-            image_urls.append(src)
-
-    # Extract links
-    links = soup.find_all('a', href=True)
-    link_urls = []
-    for link in links:
-        href = link['href']
-        if not href.startswith(('http:', 'https:')):  
-            href = urllib.parse.urljoin(url, href)
-        link_urls.append(href)
-
-    # Extract tables
-    tables = soup.find_all('table')
-    extracted_tables = []
-    for table in tables:
-        rows = table.find_all('tr')
-        table_data = []
-        for row in rows:
-            cols = row.find_all(['td', 'th'])
-            table_data.append([col.get_text(strip=True) for col in cols])
-        if table_data:  
-            df = pd.DataFrame(table_data)
-            if len(df) > 1:
-                df.columns = df.iloc[0]  
-                df = df[1:].reset_index(drop=True)
-            extracted_tables.append(df)
-
-    return text_content, image_urls, link_urls, extracted_tables
-
-
-def save_to_markdown(url, text, image_urls, links, tables):
+
+def website_markdown(url, text, image_urls, links, tables):
+    """Renders the extracted content of one web page as a Markdown document."""
+    with io.StringIO() as md_file:
+        md_file.write(f"# Extracted Content from {url}\n\n")
+        write_page_sections(md_file, text, image_urls, links, tables, level=2)
+        return md_file.getvalue()
+
+
+def save_to_markdown(url, text, image_urls, links, tables, emit=None):
     """
     Saves the extracted website content into a Markdown file and uploads to S3.
     
     Returns:
     - S3 URL of the uploaded Markdown file
     """
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".md", mode="w", encoding="utf-8") as md_file:
-        md_file.write(f"# Extracted Content from {url}\n\n")
-
-        # Add text
-        md_file.write("## Text Content\n\n")
-        md_file.write(text + "\n\n")
-
-        # Add images
-        md_file.write("## Images\n\n")
-        for img_url in image_urls:
-            md_file.write(f"![Image]({img_url})\n\n")
-
-        # Add links
-        md_file.write("## Links\n\n")
-        for link in links:
-            md_file.write(f"- [{link}]({link})\n")
-
-        # Add tables
-        md_file.write("## Tables\n\n")
-        for i, table in enumerate(tables):
-            md_file.write(f"### Table {i + 1}\n\n")
-            md_file.write(table.to_markdown(index=False) + "\n\n")
-
-        md_file_path = md_file.name
+    md_content = website_markdown(url, text, image_urls, links, tables)
+    if emit is not None:
+        emit(md_content)
 
     # Upload to S3
-    md_s3_url = upload_file_to_s3(md_file_path)
-    os.remove(md_file_path)
+    md_s3_url = upload_markdown_to_s3(md_content)
 
     return md_s3_url  # Return the S3 URL
 
 
+def write_page_sections(md_file, text, image_urls, links, tables, level=2):
+    """Writes the text, image, link and table sections of one page at the given heading level."""
+    heading = "#" * level
 
+    # Add text
+    md_file.write(f"{heading} Text Content\n\n")
+    md_file.write(text + "\n\n")
 
+    # Add images
+    md_file.write(f"{heading} Images\n\n")
+    for img_url in image_urls:
+        md_file.write(f"![Image]({img_url})\n\n")
 
-def wait_for_apify_run(run_id, poll_interval=5):
-    """Waits indefinitely for an Apify run to complete before proceeding."""
-    while True:
-        run = client.run(run_id).get()
-        run_status = run["status"]
+    # Add links
+    md_file.write(f"{heading} Links\n\n")
+    for link in links:
+        md_file.write(f"- [{link}]({link})\n")
 
-        logging.info(f"Apify Run Status: {run_status}")
-        print("Output of run ",run.json())
-        if run_status == "SUCCEEDED":
-            return run  
-        # Run completed successfully
-        elif run_status in ["FAILED", "ABORTED"]:
-            # Get error details if available
-            run_info = client.run(run_id).get()
-            error_message = run_info.get("errorMessage", "No detailed error message provided.")
-            logging.error(f"Apify run failed! Status: {run_status}, Error: {error_message}")
-            raise HTTPException(status_code=500, detail=f"Apify run failed with status: {run_status}. Error: {error_message}")
+    # Add tables
+    md_file.write(f"{heading} Tables\n\n")
+    for i, table in enumerate(tables):
+        md_file.write(f"{heading}# Table {i + 1}\n\n")
+        md_file.write(table.to_markdown() + "\n")
 
-        time.sleep(poll_interval)  # Keep waiting indefinitely
 
+def crawl_to_markdown(seeds, depth=1, scope="domain", max_pages=CRAWL_MAX_PAGES, emit=None):
+    """Crawls from the seed URLs, combines every page into one Markdown document and uploads it to S3.
+
+    With `emit`, each page's section is passed to it as soon as the page has been parsed.
+    """
+    report_progress("crawl", 0.1)
+    md_writer = MarkdownWriter()
+    page_count = 0
+    crawl_start = time.perf_counter()
+    for page_url, (text, image_urls, links, tables) in Crawler(parse_website_content, max_pages=max_pages).iter_crawl(
+        seeds, depth=depth, scope=scope
+    ):
+        with io.StringIO() as md_file:
+            if page_count == 0:
+                md_file.write(f"# Extracted Content from {', '.join(seeds)}\n\n")
+            md_file.write(f"## {page_url}\n\n")
+            write_page_sections(md_file, text, image_urls, links, tables, level=3)
+            md_file.write("---\n\n")
+            section = md_file.getvalue()
+        md_writer.write(section)
+        if emit is not None:
+            emit(section)
+        page_count += 1
+    record_stage("crawl", time.perf_counter() - crawl_start)
+    count("web_pages", page_count)
+    if not page_count:
+        raise HTTPException(status_code=502, detail="None of the seed URLs could be fetched.")
+
+    report_progress("upload", 0.8)
+    return upload_markdown_to_s3(md_writer.getvalue()), page_count
+
+
+def parse_seed_urls(url):
+    """Splits the `url` form field into one or more seed URLs (whitespace or comma separated)."""
+    return [seed for seed in url.replace(",", " ").split() if seed]
+
+
+
+
+
+def wait_for_apify_run(run_id, timeout=APIFY_RUN_TIMEOUT):
+    """Waits for an Apify run to complete and returns the final run object."""
+    client = get_apify_client()
+    try:
+        return wait_for_run(client, client.run(run_id).get(), timeout=timeout)
+    except ApifyRunError as e:
+        logging.error(f"Apify run failed! {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 
+def enterprise_extract_website(url, emit=None):
+    """Extracts content from a website using Apify and uploads it as Markdown to S3.
 
-def enterprise_extract_website(url):
-    """Extracts content from a website using Apify and uploads it as Markdown to S3."""
+    With `emit`, the section of every dataset item is passed to it as the dataset is read.
+    """
     try:
         logging.info(f"Starting website extraction for: {url}")
 
@@ -508,81 +643,63 @@ def enterprise_extract_website(url):
             "waitForLoad": 5000,  # Allow JavaScript-heavy pages to load
         }
 
-        # Start the Apify Actor
-        run = client.actor("OutlPf9SFs5BPflRj").start(run_input=run_input)
-        run_id = run["id"]
-        logging.info(f"Apify actor started with Run ID: {run_id}")
-
-        # Manually wait for Apify to complete
-        timeout = 600  # Max wait time (seconds)
-        start_time = time.time()
-
-        while True:
-            # Get current status of the Apify run
-            run_status = client.run(run_id).get()["status"]
-            logging.info(f"Apify run status: {run_status}")
-
-            if run_status == "SUCCEEDED":
-                logging.info("Apify run completed successfully!")
-                break
-            elif run_status in ["FAILED", "ABORTED"]:
-                # Get Apify error message if available
-                run_info = client.run(run_id).get()
-                error_message = run_info.get("errorMessage", "No detailed error message provided.")
-                logging.error(f"Apify run failed! Error: {error_message}")
-                raise HTTPException(status_code=500, detail=f"Apify run failed: {error_message}")
-
-            # Check if timeout reached
-            if time.time() - start_time > timeout:
-                raise HTTPException(status_code=500, detail="Apify run timed out!")
+        # Start the Apify Actor and wait for it (long-poll / webhook, no fixed sleeps)
+        report_progress("apify_run", 0.1)
+        client = get_apify_client()
+        try:
+            with timed("apify_run"):
+                run = start_and_wait(client, APIFY_ACTOR_ID, run_input)
+        except ApifyRunError as e:
+            logging.error(f"Apify run failed! {e}")
+            raise HTTPException(status_code=500, detail=f"Apify run failed: {e}")
+        logging.info("Apify run completed successfully!")
+
+        # Retrieve extracted dataset (the final run object already carries its id)
+        report_progress("apify_dataset", 0.7)
+
+        # Prepare Markdown content while the (paginated) dataset is read
+        md_writer = MarkdownWriter()
+        item_count = 0
+        dataset_start = time.perf_counter()
+        for item in client.dataset(run["defaultDatasetId"]).iterate_items():
+            title = item.get("title", "No Title")
+            page_url = item.get("url", "#")
+            markdown_text = item.get("markdown") or item.get("textContent") or "No Content Available"
 
-            time.sleep(5)  # Wait 5 seconds before checking again
+            section = f"## {title}\n[Source Link]({page_url})\n\n{markdown_text}\n\n---\n\n"
+            if item_count == 0:
+                section = f"# Extracted Content from {url}\n\n" + section
+            md_writer.write(section)
+            if emit is not None:
+                emit(section)
+            item_count += 1
 
-        # Retrieve extracted dataset
-        dataset_id = client.run(run_id).get()["defaultDatasetId"]
-        dataset_items = list(client.dataset(dataset_id).iterate_items())
+        record_stage("apify_dataset", time.perf_counter() - dataset_start)
+        count("web_pages", item_count)
 
         # Debug: Print extracted dataset
-        logging.info(f"Extracted {len(dataset_items)} items from Apify.")
+        logging.info(f"Extracted {item_count} items from Apify.")
 
-        if not dataset_items:
+        if not item_count:
             logging.error("Apify returned an empty dataset!")
             raise HTTPException(status_code=500, detail="Extracted dataset is empty!")
-
-        # Prepare Markdown content
-        md_content = f"# Extracted Content from {url}\n\n"
-
-        for item in dataset_items:
-            title = item.get("title", "No Title")
-            page_url = item.get("url", "#")
-            markdown_text = item.get("markdown") or item.get("textContent") or "No Content Available"
-
-            md_content += f"## {title}\n"
-            md_content += f"[Source Link]({page_url})\n\n"
-            md_content += f"{markdown_text}\n\n---\n\n"
+        md_content = md_writer.getvalue()
 
         # Ensure Markdown is not empty
         if not md_content.strip():
             logging.error("Extracted Markdown is empty!")
             raise HTTPException(status_code=500, detail="Extracted Markdown is empty!")
 
-        # Save Markdown to a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".md", mode="w", encoding="utf-8") as md_file:
-            md_file.write(md_content)
-            md_file_path = md_file.name
-
-        # Upload the Markdown file to S3
-        logging.info(f"Uploading extracted Markdown to S3: {md_file_path}")
-        md_s3_url = upload_file_to_s3(md_file_path)
+        # Upload the Markdown to S3
+        logging.info(f"Uploading extracted Markdown to S3 ({len(md_content)} chars)")
+        report_progress("upload", 0.9)
+        md_s3_url = upload_markdown_to_s3(md_content)
 
         # Ensure S3 upload was successful
         if not md_s3_url:
             logging.error("Markdown upload to S3 failed!")
             raise HTTPException(status_code=500, detail="Markdown upload failed!")
 
-        # Cleanup local file
-        os.remove(md_file_path)
-
         logging.info(f"Successfully uploaded Markdown to S3: {md_s3_url}")
 
         return md_s3_url
@@ -591,47 +708,483 @@ def enterprise_extract_website(url):
         logging.exception(f"Error extracting website content: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error extracting website content: {str(e)}")
 
-app = FastAPI()
+################################################################################
+#                         EXTRACTION DISPATCH                                  #
+################################################################################
 
-# Route for extracting content from PDFs
-@app.post("/extract/pdf/")
-async def extract_pdf(file: UploadFile = File(...), method: str = Form(...)):
-    """Extract content from a PDF using Open-Source or Enterprise method."""
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_pdf:
-        temp_pdf.write(file.file.read())
-        temp_pdf_path = temp_pdf.name
+EXTRACTION_METHODS = ("open-source", "enterprise")
+# "auto" samples each PDF and picks the engine per document or page range (see pdf_router)
+PDF_EXTRACTION_METHODS = EXTRACTION_METHODS + ("auto",)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
+# Part of every result cache key; bump whenever an extractor's Markdown output changes
+EXTRACTOR_VERSION = "4"
+RESPONSE_MODES = ("sync", "async", "stream")
+
+
+def validate_method(method, methods=EXTRACTION_METHODS):
+    if method not in methods:
+        choices = ", ".join(f"'{choice}'" for choice in methods[:-1]) + f" or '{methods[-1]}'"
+        raise HTTPException(status_code=400, detail=f"Invalid extraction method. Choose {choices}.")
+
+
+def validate_mode(mode):
+    if mode not in RESPONSE_MODES:
+        raise HTTPException(status_code=400, detail="Invalid mode. Choose 'sync', 'async' or 'stream'.")
+
+
+@contextmanager
+def measured_extraction(kind, method):
+    """Collects the stage timings and counters of one extraction (see metrics.collect), records
+    its total time as the `<kind>_total` stage and counts it by outcome."""
+    with collect() as breakdown:
+        status = "failed"
+        try:
+            yield breakdown
+            status = "succeeded"
+        finally:
+            record_stage(f"{kind}_total", breakdown.seconds)
+            metrics.inc("extractions", kind=kind, method=method, status=status)
+
+
+def run_pdf_extraction(pdf_path, method, digest=None, timings=False, emit=None):
+    """Runs the selected PDF extraction method and removes the uploaded temp PDF afterwards.
+
+    When `digest` (SHA-256 of the PDF) is given, a successful result is stored in the result cache,
+    unless one of its uploads failed (it would be served without those images until it expired).
+    With `timings`, the result includes the per-stage timing breakdown of this extraction.
+    `emit` receives Markdown chunks as they are produced (mode=stream).
+    """
+    try:
+        with measured_extraction("pdf", method) as breakdown:
+            count("input_bytes", os.path.getsize(pdf_path))
+            route = None
+            if method == "auto":
+                md_s3_url, route = auto_extract_pdf(pdf_path, emit=emit)
+            elif method == "open-source":
+                md_s3_url = open_source_extract_pdf(pdf_path, emit=emit)
+            else:
+                md_s3_url = enterprise_extract_pdf(pdf_path, emit=emit)
+            result = {"markdown_url": md_s3_url}
+            if route is not None:
+                result["route"] = describe_route(route)
+            if breakdown.counters.get("s3_upload_failures"):
+                logging.warning(f"Not caching the result: {breakdown.counters['s3_upload_failures']} uploads failed")
+            elif digest and result_cache and md_s3_url:
+                result_cache.set(digest, method, EXTRACTOR_VERSION, result)
+        if breakdown.counters.get("image_bytes"):
+            logging.info(
+                f"Image transcoding saved {breakdown.counters.get('image_bytes_saved', 0)} of "
+                f"{breakdown.counters['image_bytes']} image bytes "
+                f"({breakdown.counters.get('images_dropped', 0)} decorative images dropped)"
+            )
+        if route is not None:
+            # Per-route latency, to compare against always using one engine
+            metrics.observe(f"pdf_auto_{route.engine.replace('-', '_')}_total", breakdown.seconds)
+            logging.info(f"Auto-routed extraction ({route.engine}, pages {route_pages(route)}) took {breakdown.seconds:.2f}s")
+        if timings:
+            return {**result, "timings": breakdown.to_dict()}
+        return result
+    finally:
+        if os.path.exists(pdf_path):
+            os.remove(pdf_path)
+
+
+def run_website_extraction(url, method, depth=0, scope="domain", max_pages=CRAWL_MAX_PAGES, timings=False, emit=None):
+    """Runs the selected website extraction method.
+
+    For open-source with depth > 0 or several seed URLs, the site is crawled into one document.
+    With `timings`, the result includes the per-stage timing breakdown of this extraction.
+    `emit` receives Markdown chunks as they are produced (mode=stream).
+    """
+    with measured_extraction("website", method) as breakdown:
+        result = extract_website_markdown(url, method, depth, scope, max_pages, emit)
+    if timings:
+        return {**result, "timings": breakdown.to_dict()}
+    return result
+
+
+def extract_website_markdown(url, method, depth, scope, max_pages, emit):
+    seeds = parse_seed_urls(url)
+    if method == "open-source" and (depth > 0 or len(seeds) > 1):
+        md_s3_url, page_count = crawl_to_markdown(seeds, depth=depth, scope=scope, max_pages=max_pages, emit=emit)
+        logging.info(f"Markdown S3 URL: {md_s3_url}")
+        return {"markdown_url": md_s3_url, "pages": page_count}
     if method == "open-source":
-        md_s3_url = open_source_extract_pdf(temp_pdf_path)
-    elif method == "enterprise":
-        md_s3_url = enterprise_extract_pdf(temp_pdf_path)
+        report_progress("fetch", 0.1)
+        page = fetch_page(url)
+        if page.not_modified and page.markdown_url:
+            # Unchanged since its last extraction (HTTP 304): no parsing, same Markdown
+            logging.info(f"{url} not modified, reusing {page.markdown_url}")
+            return {"markdown_url": page.markdown_url, "cached": True}
+        extracted_text, image_urls, extracted_links, extracted_tables = extract_website_content(url, page)
+        logging.info(f"Extracted Text: {extracted_text[:100]}")  # Log first 100 chars
+        report_progress("upload", 0.8)
+        md_s3_url = save_to_markdown(url, extracted_text, image_urls, extracted_links, extracted_tables, emit=emit)
+        if http_cache is not None and md_s3_url:
+            http_cache.store(page, EXTRACTOR_VERSION, md_s3_url)
     else:
-        raise HTTPException(status_code=400, detail="Invalid extraction method. Choose 'open-source' or 'enterprise'.")
-
+        md_s3_url = enterprise_extract_website(url, emit=emit)
+    logging.info(f"Markdown S3 URL: {md_s3_url}")
     return {"markdown_url": md_s3_url}
 
 
+def cached_or_extract_pdf(pdf_path, method, digest):
+    """Returns the cached result for the PDF if there is one (removing the temp file), else extracts it."""
+    cached = result_cache.get(digest, method, EXTRACTOR_VERSION) if result_cache else None
+    if cached:
+        os.remove(pdf_path)
+        return {**cached, "cached": True}
+    return run_pdf_extraction(pdf_path, method, digest)
+
+
+def hash_file(file_path):
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(UPLOAD_CHUNK_SIZE):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def process_batch_document(document):
+    """Extracts one batch document: an uploaded temp PDF ("path") or an S3 object ("s3_key")."""
+    if "s3_key" in document:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_pdf:
+            temp_pdf_path = temp_pdf.name
+        try:
+            s3_uploader.download_file(document["s3_key"], temp_pdf_path)
+        except Exception:
+            os.remove(temp_pdf_path)
+            raise
+        return cached_or_extract_pdf(temp_pdf_path, document["method"], hash_file(temp_pdf_path))
+    return cached_or_extract_pdf(document["path"], document["method"], document["digest"])
+
+
+def parse_batch_manifest(manifest, default_method):
+    """Parses a JSON manifest: a list of S3 keys or of {"s3_key", "method"} objects. Keys are always
+    read from the configured bucket."""
+    try:
+        entries = json.loads(manifest)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Manifest is not valid JSON: {e}")
+    if not isinstance(entries, list):
+        raise HTTPException(status_code=400, detail="Manifest must be a JSON list.")
+
+    documents = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"s3_key": entry}
+        if not isinstance(entry, dict) or not entry.get("s3_key"):
+            raise HTTPException(status_code=400, detail=f"Invalid manifest entry: {entry}")
+        if "bucket" in entry:
+            raise HTTPException(status_code=400, detail="Manifest entries cannot name a bucket.")
+        document = {"name": entry["s3_key"], "s3_key": entry["s3_key"], "method": entry.get("method", default_method)}
+        validate_method(document["method"], PDF_EXTRACTION_METHODS)
+        documents.append(document)
+    return documents
+
+
+def remove_uploads(documents):
+    """Deletes the spooled upload of every batch document that still has one."""
+    for document in documents:
+        if "path" in document and os.path.exists(document["path"]):
+            os.remove(document["path"])
+
+
+def run_pdf_batch(documents, max_in_flight):
+    try:
+        return run_batch(documents, process_batch_document, max_in_flight)
+    finally:
+        # Uploaded files of documents that never ran (e.g. cancelled at shutdown)
+        remove_uploads(documents)
+
+
+def submit_job(kind, fn, *args, params=None):
+    """Queues an extraction job and returns the 202 response body."""
+    try:
+        job = job_queue.submit(kind, fn, *args, params=params)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"job_id": job.id, "state": job.state, "status_url": f"/jobs/{job.id}"}
+
+
+def stream_job(kind, fn, *args, params=None):
+    """Queues an extraction job whose Markdown is streamed back as Server-Sent Events.
+
+    `fn` must accept an `emit` keyword. The response carries `chunk` events with Markdown as it
+    is produced, `progress` events while the job is busy, and a final `done` event with the
+    result (after the Markdown upload to S3) or an `error` event.
+    """
+    stream = MarkdownStream()
+    try:
+        job = job_queue.submit(kind, stream.run, fn, *args, params=params)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return StreamingResponse(stream.events(job), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
+
+def stream_result(result):
+    """An SSE response that only carries an already known result (e.g. a cache hit)."""
+    return StreamingResponse(iter([sse_event("done", result)]), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
+
+job_queue = JobQueue()
+result_cache = ResultCache(SQLiteCacheBackend()) if RESULT_CACHE_ENABLED else None
+http_cache = HTTPCache() if HTTP_CACHE_ENABLED else None
+page_cache = PageCache() if PAGE_CACHE_ENABLED else None
+
+
+def warm_up_backends(backends):
+    """Imports the given backends and creates their shared clients ahead of the first request."""
+    return warm_up(backends, initializers={
+        "website": get_session,
+        "s3": lambda: s3_uploader.client,
+        "adobe": get_pdf_services,
+        "apify": get_apify_client,
+    })
+
+
+@asynccontextmanager
+async def lifespan(app):
+    backends = parse_backends(WARMUP_BACKENDS)
+    if backends and WARMUP_BLOCKING:
+        await run_in_threadpool(warm_up_backends, backends)
+    elif backends:
+        # Accept requests right away; a request that beats the warm-up imports what it needs itself
+        threading.Thread(target=warm_up_backends, args=(backends,), name="warmup", daemon=True).start()
+    yield
+    job_queue.shutdown()
+    shutdown_process_pool()
+    s3_uploader.shutdown(wait=False)
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+async def save_upload(file):
+    """Streams an uploaded PDF to a temp file in chunks instead of reading it into memory at once,
+    hashing it on the way for the result cache. Returns (temp_path, sha256_hexdigest)."""
+    sha256 = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_pdf:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            sha256.update(chunk)
+            temp_pdf.write(chunk)
+    return temp_pdf.name, sha256.hexdigest()
+
+
+# Route for extracting content from PDFs
+@app.post("/extract/pdf/")
+async def extract_pdf(
+    file: UploadFile = File(...),
+    method: str = Form(...),
+    mode: str = Form("sync"),
+    timings: bool = Form(False),
+):
+    """Extract content from a PDF using Open-Source or Enterprise method.
+
+    method=auto samples a few pages and sends the PDF (or each of its page ranges) to the faster
+    engine that is adequate for it; the result then carries the routing decision as "route".
+    With mode=async the extraction runs in the background job queue and a job id is returned
+    immediately; poll GET /jobs/{job_id} for the result. With mode=stream the response is a
+    Server-Sent Events stream of Markdown chunks, one per page for the open-source method.
+    With timings=true the result also carries the per-stage timing breakdown of the extraction.
+    """
+    validate_method(method, PDF_EXTRACTION_METHODS)
+    validate_mode(mode)
+
+    temp_pdf_path, digest = await save_upload(file)
+
+    cached = result_cache.get(digest, method, EXTRACTOR_VERSION) if result_cache else None
+    if cached:
+        os.remove(temp_pdf_path)
+        if mode == "stream":
+            return stream_result({**cached, "cached": True})
+        return {**cached, "cached": True}
+
+    try:
+        if mode == "stream":
+            return stream_job(
+                "pdf", run_pdf_extraction, temp_pdf_path, method, digest, timings,
+                params={"filename": file.filename, "method": method},
+            )
+
+        if mode == "async":
+            return JSONResponse(status_code=202, content=submit_job(
+                "pdf", run_pdf_extraction, temp_pdf_path, method, digest, timings,
+                params={"filename": file.filename, "method": method},
+            ))
+    except Exception:
+        # Not queued (e.g. the queue is full), so no job will delete the upload
+        os.remove(temp_pdf_path)
+        raise
+
+    return await run_in_threadpool(run_pdf_extraction, temp_pdf_path, method, digest, timings)
+
+
+# Route for extracting many PDFs in one call
+@app.post("/extract/pdf/batch/")
+async def extract_pdf_batch(
+    files: Optional[List[UploadFile]] = File(None),
+    manifest: Optional[str] = Form(None),
+    method: str = Form("open-source"),
+    mode: str = Form("sync"),
+    max_in_flight: int = Form(BATCH_MAX_IN_FLIGHT),
+):
+    """Extract many PDFs (uploaded files and/or a JSON manifest of S3 keys) with bounded concurrency.
+
+    Each document goes to open-source, enterprise or auto-routed extraction (`method`, or the
+    manifest entry's own "method"); at most `max_in_flight` documents, and therefore Adobe jobs, run at once.
+    Returns a per-document result manifest plus throughput and latency figures.
+    """
+    validate_method(method, PDF_EXTRACTION_METHODS)
+    validate_mode(mode)
+    if mode == "stream":
+        raise HTTPException(status_code=400, detail="Batches are not streamed. Choose 'sync' or 'async'.")
+    documents = parse_batch_manifest(manifest, method) if manifest else []
+    if not files and not documents:
+        raise HTTPException(status_code=400, detail="Provide PDF files and/or a manifest of S3 keys.")
+    if len(documents) + len(files or []) > BATCH_MAX_DOCUMENTS:
+        raise HTTPException(status_code=400, detail=f"A batch holds at most {BATCH_MAX_DOCUMENTS} documents.")
+
+    try:
+        for file in files or []:
+            temp_pdf_path, digest = await save_upload(file)
+            documents.append({"name": file.filename, "path": temp_pdf_path, "digest": digest, "method": method})
+
+        if mode == "async":
+            return JSONResponse(status_code=202, content=submit_job(
+                "pdf-batch", run_pdf_batch, documents, max_in_flight,
+                params={"documents": len(documents), "method": method},
+            ))
+    except Exception:
+        # Not queued (e.g. the queue is full), so no job will delete the uploads
+        remove_uploads(documents)
+        raise
+
+    return await run_in_threadpool(run_pdf_batch, documents, max_in_flight)
+
+
 # Route for extracting content from websites
 @app.post("/extract/website/")
-async def extract_website(url: str = Form(...), method: str = Form(...)):
+async def extract_website(
+    url: str = Form(...),
+    method: str = Form(...),
+    mode: str = Form("sync"),
+    depth: int = Form(0),
+    scope: str = Form("domain"),
+    max_pages: int = Form(CRAWL_MAX_PAGES),
+    timings: bool = Form(False),
+):
+    """Extract content from a website using Open-Source or Enterprise method.
+
+    With the open-source method, depth > 0 or several whitespace/comma separated URLs turn on
+    crawler mode: pages within `scope` ('host', 'domain' or 'any') are fetched concurrently,
+    up to `max_pages` (clamped to 1..CRAWL_MAX_PAGES), and combined into one Markdown document.
+    With mode=stream the Markdown of every page is sent as Server-Sent Events while the crawl
+    goes on. With timings=true the result also carries the per-stage timing breakdown of the extraction.
+    """
     logging.info(f"Received URL: {url}")
     logging.info(f"Extraction Method: {method}")
+    validate_method(method)
+    validate_mode(mode)
+    if scope not in CRAWL_SCOPES:
+        raise HTTPException(status_code=400, detail=f"Invalid scope. Choose one of {', '.join(CRAWL_SCOPES)}.")
+    if method == "enterprise" and len(parse_seed_urls(url)) > 1:
+        raise HTTPException(status_code=400, detail="The enterprise method accepts a single URL.")
+
+    if mode == "async":
+        return JSONResponse(status_code=202, content=submit_job(
+            "website", run_website_extraction, url, method, depth, scope, max_pages, timings,
+            params={"url": url, "method": method, "depth": depth, "scope": scope},
+        ))
+    if mode == "stream":
+        return stream_job(
+            "website", run_website_extraction, url, method, depth, scope, max_pages, timings,
+            params={"url": url, "method": method, "depth": depth, "scope": scope},
+        )
+
     try:
-        if method == "open-source":
-            extracted_text, image_urls, extracted_links, extracted_tables = extract_website_content(url)
-            logging.info(f"Extracted Text: {extracted_text[:100]}")  # Log first 100 chars
-            md_s3_url = save_to_markdown(url, extracted_text, image_urls, extracted_links, extracted_tables)
-        elif method == "enterprise":
-            md_s3_url = enterprise_extract_website(url)
-        else:
-            raise HTTPException(status_code=400, detail="Invalid extraction method. Choose 'open-source' or 'enterprise'.")
-        logging.info(f"Markdown S3 URL: {md_s3_url}")
-        return {"markdown_url": md_s3_url}
+        return await run_in_threadpool(run_website_extraction, url, method, depth, scope, max_pages, timings)
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error in extract_website: {e}")
         raise HTTPException(status_code=500, detail=f"Error extracting website content: {e}")
 
 
+# Route for polling background extraction jobs
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    return job.to_dict()
+
+
+@app.get("/jobs/")
+async def get_job_stats():
+    return job_queue.stats()
+
+
+# Route for result cache hit/miss counters
+@app.get("/cache/stats")
+async def get_cache_stats():
+    http = {"enabled": True, **http_cache.stats()} if http_cache is not None else {"enabled": False}
+    pages = {"enabled": True, **page_cache.stats()} if page_cache is not None else {"enabled": False}
+    if result_cache is None:
+        return {"enabled": False, "images": s3_uploader.stats(), "http": http, "pages": pages}
+    return {"enabled": True, **result_cache.stats(), "images": s3_uploader.stats(), "http": http, "pages": pages}
+
+
+# Route for Prometheus scraping
+@app.get("/metrics")
+async def get_metrics():
+    """Stage duration histograms and extraction counters, plus job queue and cache gauges."""
+    queue_stats = job_queue.stats()
+    gauges = {
+        ("extraction_jobs", "Extraction jobs known to the job queue, by state"): {
+            (("state", state),): value for state, value in queue_stats["jobs"].items()
+        },
+        ("extraction_job_workers", "Job queue worker threads"): {(): queue_stats["workers"]},
+        ("extraction_image_uploads", "Image uploads by outcome (deduplicated uploads were skipped)"): {
+            (("outcome", outcome),): value for outcome, value in s3_uploader.stats().items() if outcome != "known_keys"
+        },
+    }
+    if result_cache is not None:
+        cache_stats = result_cache.stats()
+        gauges[("extraction_result_cache_lookups", "Result cache lookups, by outcome")] = {
+            (("outcome", "hit"),): cache_stats["hits"], (("outcome", "miss"),): cache_stats["misses"],
+        }
+        gauges[("extraction_result_cache_entries", "Entries in the result cache")] = {(): cache_stats["entries"]}
+    if http_cache is not None:
+        http_stats = http_cache.stats()
+        gauges[("extraction_http_cache_revalidations", "Website fetches, by outcome (hit = 304 Not Modified)")] = {
+            (("outcome", "hit"),): http_stats["hits"], (("outcome", "miss"),): http_stats["misses"],
+        }
+        gauges[("extraction_http_cache_bytes", "Bytes of stored responses in the HTTP cache")] = {(): http_stats["bytes"]}
+    if page_cache is not None:
+        page_stats = page_cache.stats()
+        gauges[("extraction_page_cache_lookups", "PDF page lookups in the page cache, by outcome")] = {
+            (("outcome", "hit"),): page_stats["hits"], (("outcome", "miss"),): page_stats["misses"],
+        }
+        gauges[("extraction_page_cache_entries", "Pages in the page cache")] = {(): page_stats["entries"]}
+    return PlainTextResponse(metrics.render(gauges), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+
+# Route receiving Apify run-finished webhooks (see APIFY_WEBHOOK_URL)
+@app.post("/webhooks/apify")
+async def apify_webhook(payload: dict, token: str = ""):
+    if not valid_webhook_token(token):
+        raise HTTPException(status_code=403, detail="Invalid webhook token.")
+    run = payload.get("resource") or {}
+    if not run.get("id"):
+        raise HTTPException(status_code=400, detail="Webhook payload has no run resource.")
+    # Only wakes the waiting extraction, which re-fetches the run from Apify
+    waiting = webhook_registry.notify(run["id"])
+    logging.info(f"Apify webhook {payload.get('eventType')} for run {run['id']} (waiting: {waiting})")
+    return {"ok": True, "waiting": waiting}
+
 
 # Root route to show available endpoints
 @app.get("/")
@@ -640,8 +1193,12 @@ async def root():
         "message": "PDF Processing API",
         "version": "1.0.0",
         "endpoints": {
-            "/extract/pdf/": "Extract content from PDF file using open-source or enterprise method",
+            "/extract/pdf/": "Extract content from PDF file using open-source, enterprise or auto-routed method",
+            "/extract/pdf/batch/": "Extract many PDFs (uploads or S3 manifest) with bounded concurrency and a result manifest",
             "/extract/website/": "Extract content from website using open-source or enterprise method",
+            "/jobs/{job_id}": "Poll the state, progress and result of an extraction submitted with mode=async",
+            "/cache/stats": "Hit/miss counters of the extraction result cache, HTTP cache, PDF page cache and image upload dedup",
+            "/metrics": "Per-stage timing histograms and extraction counters in the Prometheus text format",
         }
     }
 
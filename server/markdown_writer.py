@@ -0,0 +1,62 @@
+################################################################################
+#                         STREAMING MARKDOWN WRITER                            #
+################################################################################
+
+
+def escape_cell(value):
+    """Renders one table cell: None becomes empty, pipes are escaped and line breaks become <br>."""
+    if value is None:
+        return ""
+    text = value if isinstance(value, str) else str(value)
+    if "|" in text:
+        text = text.replace("|", "\\|")
+    if "\n" in text or "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n").replace("\n", "<br>")
+    return text
+
+
+def table_row(cells):
+    """Returns one Markdown table row (with trailing newline) for an iterable of cells."""
+    return "| " + " | ".join(escape_cell(cell) for cell in cells) + " |\n"
+
+
+class MarkdownWriter:
+    """Builds a Markdown document from appended fragments in linear time.
+
+    Without a sink, fragments are buffered in a list and joined once by getvalue(). With a
+    sink (any object with a text `write`, e.g. io.StringIO or an open file) every fragment is
+    written straight through, so the document never has to exist as one string.
+    """
+
+    def __init__(self, sink=None):
+        self._parts = []
+        self._sink = sink
+        self._write = sink.write if sink is not None else self._parts.append
+
+    def write(self, text):
+        self._write(text)
+
+    def table_row(self, cells):
+        self._write(table_row(cells))
+
+    def table(self, rows, header_separator=False):
+        """Writes every row of `rows` (any iterable, consumed lazily).
+
+        With header_separator, a `| --- |` line sized to the first row follows it.
+        Returns the number of rows written.
+        """
+        count = 0
+        for row in rows:
+            cells = [escape_cell(cell) for cell in row]
+            self._write("| " + " | ".join(cells) + " |\n")
+            if header_separator and count == 0:
+                self._write("| " + " | ".join(["---"] * len(cells)) + " |\n")
+            count += 1
+        return count
+
+    def getvalue(self):
+        if self._sink is not None:
+            return self._sink.getvalue()
+        if len(self._parts) > 1:
+            self._parts[:] = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
@@ -0,0 +1,200 @@
+import os
+import time
+import threading
+import contextvars
+from functools import wraps
+from contextlib import contextmanager
+
+
+################################################################################
+#                    STAGE TIMING AND PROMETHEUS METRICS                       #
+################################################################################
+
+# Upper bounds (seconds) of the stage duration histogram buckets
+METRICS_BUCKETS = tuple(float(bucket) for bucket in os.getenv(
+    "METRICS_BUCKETS", "0.005,0.01,0.05,0.1,0.25,0.5,1,2.5,5,10,30,60,120,300"
+).split(","))
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Counters exposed as extraction_<name>_total
+COUNTERS = {
+    "extractions": "Extractions run, by kind, method and status",
+    "pages": "PDF pages extracted",
+    "pages_reused": "PDF pages taken from the page cache instead of being extracted",
+    "images": "Images extracted (PDF images and Adobe figures)",
+    "image_bytes": "Bytes of extracted image data",
+    "image_bytes_saved": "Bytes of image data saved by transcoding and downsampling before upload",
+    "images_dropped": "Tiny decorative images left out instead of being uploaded",
+    "tables": "Tables converted to Markdown",
+    "input_bytes": "Bytes of input documents (PDF uploads, fetched HTML)",
+    "markdown_bytes": "Bytes of Markdown produced",
+    "web_pages": "Web pages parsed",
+    "s3_uploads": "Objects uploaded to S3",
+    "s3_upload_bytes": "Bytes uploaded to S3",
+    "s3_upload_failures": "Uploads to S3 that failed (the object is missing from the result)",
+    "routed_documents": "PDFs extracted with method=auto, by chosen engine (or split)",
+    "routed_pages": "Pages of PDFs extracted with method=auto, by the engine they went to",
+}
+
+# The per-request breakdown being collected (if any). A context variable rather than a
+# thread-local, so work handed to thread pools through in_caller_context still reports to it.
+_current = contextvars.ContextVar("breakdown", default=None)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """Process-wide counters and stage-duration histograms, rendered in the Prometheus text format."""
+
+    def __init__(self, buckets=METRICS_BUCKETS):
+        self.buckets = buckets
+        self._counters = {}
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = Histogram(self.buckets)
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram.counts[index] += 1
+            histogram.sum += seconds
+            histogram.count += 1
+
+    def render(self, gauges=None):
+        """Returns the metrics page. `gauges` maps (name, help) to {labels tuple: value} for
+        point-in-time values owned by other components (job queue, result cache)."""
+        lines = []
+        with self._lock:
+            lines.append("# HELP extraction_stage_seconds Time spent in each extraction stage per document")
+            lines.append("# TYPE extraction_stage_seconds histogram")
+            for stage, histogram in sorted(self._stages.items()):
+                for bound, count in zip(self.buckets, histogram.counts):
+                    lines.append(f'extraction_stage_seconds_bucket{{stage="{stage}",le="{bound:g}"}} {count}')
+                lines.append(f'extraction_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'extraction_stage_seconds_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+                lines.append(f'extraction_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+            names = sorted({name for name, _ in self._counters} | set(COUNTERS))
+            for name in names:
+                lines.append(f"# HELP extraction_{name}_total {COUNTERS.get(name, name)}")
+                lines.append(f"# TYPE extraction_{name}_total counter")
+                series = {labels: value for (key, labels), value in self._counters.items() if key == name}
+                for labels, value in sorted(series.items()) or [((), 0)]:
+                    lines.append(f"extraction_{name}_total{_format_labels(labels)} {value}")
+
+        for (name, help_text), series in (gauges or {}).items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+class Breakdown:
+    """Stage timings and counters of one extraction, returned in the response when requested."""
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.started = time.perf_counter()
+        self.finished = None
+        # Worker threads running in the request's context add to it concurrently
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage, seconds):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_count(self, name, value):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @property
+    def seconds(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "total_seconds": round(self.seconds, 4),
+                "stages": {stage: round(seconds, 4) for stage, seconds in self.stages.items()},
+                "counters": dict(self.counters),
+            }
+
+
+@contextmanager
+def collect():
+    """Collects the stages and counters recorded in this context (this thread and the tasks it
+    hands out through in_caller_context) into a Breakdown."""
+    breakdown = Breakdown()
+    token = _current.set(breakdown)
+    try:
+        yield breakdown
+    finally:
+        breakdown.finished = time.perf_counter()
+        _current.reset(token)
+
+
+def in_caller_context(fn):
+    """Wraps `fn` for a thread pool: every call runs in a copy of the context `fn` was wrapped in,
+    so the stages and counters it records reach the caller's breakdown."""
+    context = contextvars.copy_context()
+
+    @wraps(fn)
+    def run(*args, **kwargs):
+        # One copy per call: a context can only be entered by one thread at a time
+        return context.copy().run(fn, *args, **kwargs)
+    return run
+
+
+def record_stage(stage, seconds):
+    """Adds `seconds` to a stage (the histogram and, if collecting, this request's breakdown)."""
+    metrics.observe(stage, seconds)
+    breakdown = _current.get()
+    if breakdown is not None:
+        breakdown.add_stage(stage, seconds)
+
+
+@contextmanager
+def timed(stage):
+    """Times the enclosed block as one observation of `stage` (also when it raises)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def count(name, value=1, **labels):
+    """Increments the extraction_<name>_total counter (and this request's breakdown)."""
+    if not value:
+        return
+    metrics.inc(name, value, **labels)
+    breakdown = _current.get()
+    if breakdown is not None:
+        breakdown.add_count(name, value)
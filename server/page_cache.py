@@ -0,0 +1,49 @@
+import os
+import tempfile
+
+from result_cache import CacheStats, SQLiteCacheBackend
+
+
+################################################################################
+#                 PAGE FINGERPRINT STORE FOR REVISED PDFS                      #
+################################################################################
+
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "1") == "1"
+PAGE_CACHE_PATH = os.getenv("PAGE_CACHE_PATH", os.path.join(tempfile.gettempdir(), "pdf_pages.sqlite3"))
+# Stored pages; least recently used ones are evicted above it
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv("PAGE_CACHE_MAX_ENTRIES", "200000"))
+
+
+class PageCache(CacheStats):
+    """Maps (page fingerprint, extractor version) to the extracted page (text, tables and image URLs),
+    so resubmitting a revised document only re-extracts its changed pages (see
+    pdf_engine.incremental_pdf_markdown). Hits and misses are counted per page.
+    """
+
+    def __init__(self, path=PAGE_CACHE_PATH, max_entries=PAGE_CACHE_MAX_ENTRIES):
+        super().__init__(SQLiteCacheBackend(path, table="pdf_pages"))
+        self.path = path
+        self.max_entries = max_entries
+
+    @staticmethod
+    def make_key(fingerprint, version):
+        return f"{fingerprint}:{version}"
+
+    def get_many(self, fingerprints, version):
+        """Returns {fingerprint: record} for the stored pages among `fingerprints`."""
+        keys = {self.make_key(fingerprint, version): fingerprint for fingerprint in fingerprints}
+        entries = self.backend.get_many(keys)
+        records = {keys[key]: record for key, (record, _) in entries.items()}
+        found = sum(fingerprint in records for fingerprint in fingerprints)
+        self.record(hits=found, misses=len(fingerprints) - found)
+        return records
+
+    def set_many(self, records, version):
+        """Stores {fingerprint: record} pages, then evicts least recently used pages above max_entries."""
+        if not records:
+            return
+        self.backend.set_many({self.make_key(fingerprint, version): record for fingerprint, record in records.items()})
+        self.record(evictions=self.backend.evict(max_entries=self.max_entries))
+
+    def stats(self):
+        return {**super().stats(), "max_entries": self.max_entries}
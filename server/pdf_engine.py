@@ -0,0 +1,636 @@
+import gc
+import os
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+import multiprocessing
+from itertools import islice
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from jobs import report_progress
+from markdown_writer import MarkdownWriter
+from metrics import count, record_stage, timed
+
+
+################################################################################
+#                    SINGLE-PASS OPEN-SOURCE PDF ENGINE                        #
+################################################################################
+
+# Minimum number of horizontal and vertical ruling edges before a page is handed
+# to pdfplumber's table finder (its default "lines" strategy needs both).
+TABLE_MIN_EDGES = int(os.getenv("PDF_TABLE_MIN_EDGES", "2"))
+
+# Page-parallel mode: number of worker processes (<= 1 keeps extraction serial)
+# and how many consecutive pages each worker extracts per task.
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "1"))
+PDF_CHUNK_PAGES = int(os.getenv("PDF_CHUNK_PAGES", "25"))
+
+# Streaming mode: pages that may wait for their image uploads before the stream blocks on the oldest
+PDF_STREAM_MAX_LAG = int(os.getenv("PDF_STREAM_MAX_LAG", "4"))
+
+MB = 1024 * 1024
+
+# Memory-bounded mode for very large PDFs: "auto" uses it for files of at least
+# PDF_LOW_MEMORY_MIN_MB, "1" for every PDF and "0" never.
+PDF_LOW_MEMORY = os.getenv("PDF_LOW_MEMORY", "auto")
+PDF_LOW_MEMORY_MIN_MB = int(os.getenv("PDF_LOW_MEMORY_MIN_MB", "100"))
+# In memory-bounded mode each Markdown section stays in memory up to this size, then spills to disk
+PDF_SPOOL_MAX_MB = int(os.getenv("PDF_SPOOL_MAX_MB", "8"))
+# In memory-bounded mode, stop an extraction while the server's RSS is above this (0 disables it)
+PDF_MAX_RSS_MB = int(os.getenv("PDF_MAX_RSS_MB", "0"))
+# Pages between releases of PyMuPDF's shared object store in memory-bounded mode
+PDF_RELEASE_EVERY = 25
+
+# Everything extracted from one page. `images` holds (img_index, xref, image_bytes, image_ext);
+# image_bytes is None when the same xref was already extracted earlier in the page range.
+# `timings` holds the seconds spent on (opening the document, text, tables, images); the open
+# time is carried by the first page of each page range. Timings travel with the results because
+# pool workers cannot record metrics in the server process.
+PageResult = namedtuple("PageResult", ["page_num", "text", "tables", "images", "timings"], defaults=[(0.0, 0.0, 0.0, 0.0)])
+PAGE_STAGES = ("pdf_parse", "pdf_text", "pdf_tables", "pdf_images")
+
+
+class MemoryCeilingExceeded(RuntimeError):
+    """Raised when the process stays above PDF_MAX_RSS_MB while a PDF is being extracted."""
+
+
+def count_ruling_edges(page, limit=None):
+    """Counts the horizontal and vertical ruling edges drawn on a PyMuPDF page; returns
+    (horizontal, vertical), stopping early once both reach `limit`."""
+    horizontal = vertical = 0
+    for drawing in page.get_drawings():
+        for item in drawing["items"]:
+            if item[0] == "l":
+                p1, p2 = item[1], item[2]
+                if abs(p1.y - p2.y) < 1:
+                    horizontal += 1
+                elif abs(p1.x - p2.x) < 1:
+                    vertical += 1
+            elif item[0] == "re":
+                horizontal += 2
+                vertical += 2
+            if limit is not None and horizontal >= limit and vertical >= limit:
+                return horizontal, vertical
+    return horizontal, vertical
+
+
+def looks_like_table(page):
+    """Cheap PyMuPDF check for ruling lines, so pdfplumber only runs on pages that can hold a table."""
+    horizontal, vertical = count_ruling_edges(page, limit=TABLE_MIN_EDGES)
+    return horizontal >= TABLE_MIN_EDGES and vertical >= TABLE_MIN_EDGES
+
+
+def iter_page_range(pdf_path, start=0, stop=None, page_nums=None):
+    """Walks pages [start, stop) (or just `page_nums`, ascending) once, yielding a PageResult
+    as soon as each page is done.
+
+    Text and images come from PyMuPDF; pdfplumber is only opened (lazily) for
+    pages that look like they contain a table.
+    """
+    import fitz  # PyMuPDF (imported on first use to keep server start-up fast)
+
+    seen_xrefs = set()
+    opened = time.perf_counter()
+    doc = fitz.open(pdf_path)
+    plumber = None
+    try:
+        stop = len(doc) if stop is None else min(stop, len(doc))
+        page_nums = range(start, stop) if page_nums is None else [n for n in page_nums if n < len(doc)]
+        open_seconds = time.perf_counter() - opened
+        for position, page_num in enumerate(page_nums):
+            text_start = time.perf_counter()
+            page = doc[page_num]
+            text = page.get_text().rstrip()
+
+            images_start = time.perf_counter()
+            images = []
+            for img_index, img in enumerate(page.get_images(full=True)):
+                xref = img[0]
+                if xref in seen_xrefs:
+                    # Logos/watermarks repeat the same xref on many pages; extract it only once
+                    images.append((img_index, xref, None, None))
+                    continue
+                base_image = doc.extract_image(xref)
+                if not base_image:
+                    continue
+                seen_xrefs.add(xref)
+                images.append((img_index, xref, base_image["image"], base_image["ext"]))
+
+            tables_start = time.perf_counter()
+            tables = []
+            if looks_like_table(page):
+                if plumber is None:
+                    import pdfplumber
+
+                    # Only build pdfplumber page objects for this range
+                    plumber = pdfplumber.open(pdf_path, pages=[n + 1 for n in page_nums])
+                plumber_page = plumber.pages[position]
+                tables = plumber_page.extract_tables()
+                # Drop the page's cached layout objects; pdfplumber would keep them until close
+                plumber_page.close()
+            done = time.perf_counter()
+
+            timings = (open_seconds, images_start - text_start, done - tables_start, tables_start - images_start)
+            open_seconds = 0.0
+            yield PageResult(page_num, text, tables, images, timings)
+    finally:
+        if plumber is not None:
+            plumber.close()
+        doc.close()
+
+
+def extract_page_range(pdf_path, start=0, stop=None, page_nums=None):
+    """Returns the PageResults of pages [start, stop) or `page_nums` (the task run by pool workers)."""
+    return list(iter_page_range(pdf_path, start, stop, page_nums))
+
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def get_process_pool(workers):
+    """Returns the shared page-extraction process pool, (re)creating it for a new worker count."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn, not fork: the server process runs job threads that must not be forked mid-call
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_process_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def page_ranges(page_count, chunk_pages):
+    """Splits [0, page_count) into consecutive (start, stop) ranges of at most chunk_pages pages."""
+    chunk_pages = max(1, chunk_pages)
+    return [(start, min(start + chunk_pages, page_count)) for start in range(0, page_count, chunk_pages)]
+
+
+def iter_pages(pdf_path, workers=None, chunk_pages=None, page_nums=None):
+    """Yields every page's PageResult (or those of `page_nums`, ascending) in page order, serially
+    or from page ranges extracted across the process pool (where a whole range arrives at once)."""
+    workers = PDF_WORKERS if workers is None else workers
+    chunk_pages = PDF_CHUNK_PAGES if chunk_pages is None else chunk_pages
+
+    import fitz  # PyMuPDF
+
+    if page_nums is None:
+        with fitz.open(pdf_path) as doc:
+            page_count = len(doc)
+        ranges = [(start, stop, None) for start, stop in page_ranges(page_count, chunk_pages)]
+    else:
+        page_count = len(page_nums)
+        ranges = [(0, None, page_nums[start:stop]) for start, stop in page_ranges(page_count, chunk_pages)]
+    if workers <= 1 or len(ranges) <= 1:
+        yield from iter_page_range(pdf_path, page_nums=page_nums)
+        return
+
+    logging.info(f"Extracting {page_count} pages in {len(ranges)} chunks across {workers} processes")
+    pool = get_process_pool(workers)
+    # Keep two ranges per worker in flight, so finished ranges do not pile up in memory
+    remaining = iter(ranges)
+    futures = deque(pool.submit(extract_page_range, pdf_path, *task) for task in islice(remaining, 2 * workers))
+    try:
+        done = 0
+        while futures:
+            results = futures.popleft().result()
+            for task in islice(remaining, 1):
+                futures.append(pool.submit(extract_page_range, pdf_path, *task))
+            yield from results
+            done += 1
+            report_progress("pages", 0.1 + 0.5 * done / len(ranges))
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def extract_pages(pdf_path, workers=None, chunk_pages=None):
+    """Extracts every page, serially or split into page ranges across the process pool.
+
+    Results are always returned in page order, so both modes render identical Markdown.
+    """
+    return list(iter_pages(pdf_path, workers=workers, chunk_pages=chunk_pages))
+
+
+class PageStats:
+    """Adds up the page timings and counts of one document and records them once per document."""
+
+    def __init__(self):
+        self.seconds = [0.0] * len(PAGE_STAGES)
+        self.pages = self.tables = self.images = self.image_bytes = 0
+
+    def add(self, result):
+        for index, seconds in enumerate(result.timings):
+            self.seconds[index] += seconds
+        self.pages += 1
+        self.tables += len(result.tables)
+        for _, _, image_bytes, _ in result.images:
+            if image_bytes is not None:
+                self.images += 1
+                self.image_bytes += len(image_bytes)
+
+    def record(self):
+        for stage, seconds in zip(PAGE_STAGES, self.seconds):
+            record_stage(stage, seconds)
+        count("pages", self.pages)
+        count("tables", self.tables)
+        count("images", self.images)
+        count("image_bytes", self.image_bytes)
+
+
+class DocumentSections:
+    """The images, text and tables sections of the Markdown document, filled page by page.
+
+    By default the sections are buffered in memory. With `spool_mb`, each section is written
+    to a temp file that stays in memory up to that size and then spills to disk, and the
+    document is assembled into another such file, so it never exists as one string.
+    """
+
+    def __init__(self, spool_mb=None):
+        self.spool_bytes = spool_mb * MB if spool_mb else 0
+        if self.spool_bytes:
+            self._files = [tempfile.SpooledTemporaryFile(max_size=self.spool_bytes, mode="w+", encoding="utf-8")
+                           for _ in range(3)]
+            self.images, self.text, self.tables = (MarkdownWriter(sink) for sink in self._files)
+        else:
+            self._files = None
+            self.images, self.text, self.tables = MarkdownWriter(), MarkdownWriter(), MarkdownWriter()
+        self.image_count = 0
+
+    def add_page(self, result, image_urls):
+        """Appends one page; `image_urls` maps (page_num, img_index) to the uploaded image URL."""
+        for img_index, _, _, _ in result.images:
+            s3_url = image_urls.get((result.page_num, img_index))
+            if s3_url:
+                self.images.write(f"![Image page {result.page_num+1} - {img_index+1}]({s3_url})\n")
+                self.image_count += 1
+
+        self.text.write(f"\n### Page {result.page_num+1}\n```\n{result.text}\n```\n")
+
+        for table in result.tables:
+            self.tables.write(f"\n### Table (Page {result.page_num+1})\n")
+            self.tables.table(table)
+
+    def _headings(self, title):
+        if not self.image_count:
+            self.images.write("\n**No images found in this PDF.**\n")
+        return (
+            f"# Extracted Content from {title}\n\n## Extracted Images\n",
+            "\n## Extracted Text\n",
+            "\n## Extracted Tables\n",
+        )
+
+    def getvalue(self, title):
+        """Returns the whole document as a string (in-memory sections only)."""
+        sections = (self.images, self.text, self.tables)
+        return "".join(heading + section.getvalue() for heading, section in zip(self._headings(title), sections))
+
+    def to_file(self, title):
+        """Returns the whole document as a binary file positioned at its start (spooled sections only).
+        The sections are closed; the caller closes the returned file."""
+        document = tempfile.SpooledTemporaryFile(max_size=self.spool_bytes, mode="w+b")
+        for heading, section in zip(self._headings(title), self._files):
+            document.write(heading.encode("utf-8"))
+            section.seek(0)
+            while chunk := section.read(MB):
+                document.write(chunk.encode("utf-8"))
+            section.close()
+        document.seek(0)
+        return document
+
+    def close(self):
+        for section in self._files or ():
+            section.close()
+
+
+def render_markdown(title, results, image_urls):
+    """Builds the Markdown document from page results.
+
+    `image_urls` maps (page_num, img_index) to the uploaded image URL.
+    """
+    sections = DocumentSections()
+    for result in results:
+        sections.add_page(result, image_urls)
+    return sections.getvalue(title)
+
+
+def upload_page_images(results, upload_images):
+    """Uploads each distinct image xref once and returns the (page_num, img_index) -> URL map.
+
+    `upload_images` takes a list of (image_bytes, image_ext) and returns their URLs in order.
+    Results are walked in page order, so the first occurrence of an xref always carries its bytes.
+    """
+    slots, images = {}, []
+    for result in results:
+        for _, xref, image_bytes, image_ext in result.images:
+            if xref not in slots and image_bytes is not None:
+                slots[xref] = len(images)
+                images.append((image_bytes, image_ext))
+
+    with timed("s3_images"):
+        urls = upload_images(images) if images else []
+    image_urls = {}
+    for result in results:
+        for img_index, xref, _, _ in result.images:
+            if xref in slots:
+                image_urls[(result.page_num, img_index)] = urls[slots[xref]]
+    logging.info(f"Uploaded {len(images)} distinct images for {len(image_urls)} image occurrences")
+    return image_urls
+
+
+def extract_pdf_markdown(pdf_path, upload_images, title=None, workers=None, chunk_pages=None, pages=None):
+    """Single-pass extraction of text, tables and images; returns the Markdown string.
+
+    With `pages` (start, stop), only pages [start, stop) are extracted, serially.
+    """
+    title = title or os.path.basename(pdf_path)
+    report_progress("pages", 0.1)
+    if pages is None:
+        results = extract_pages(pdf_path, workers=workers, chunk_pages=chunk_pages)
+    else:
+        results = extract_page_range(pdf_path, *pages)
+    logging.info(f"Extracted {len(results)} pages from {title}")
+    stats = PageStats()
+    for result in results:
+        stats.add(result)
+    stats.record()
+
+    report_progress("images", 0.6)
+    image_urls = upload_page_images(results, upload_images)
+    with timed("render"):
+        return render_markdown(title, results, image_urls)
+
+
+def render_page_markdown(result, image_urls):
+    """Markdown preview of a single page (text, then its tables, then its images) for streaming."""
+    md = MarkdownWriter()
+    md.write(f"\n### Page {result.page_num+1}\n```\n{result.text}\n```\n")
+    for table in result.tables:
+        md.write(f"\n#### Table (Page {result.page_num+1})\n")
+        md.table(table)
+    for img_index, _, _, _ in result.images:
+        s3_url = image_urls.get((result.page_num, img_index))
+        if s3_url:
+            md.write(f"![Image page {result.page_num+1} - {img_index+1}]({s3_url})\n")
+    return md.getvalue()
+
+
+def iter_uploaded_pages(pdf_path, submit_images, stats, workers=None, chunk_pages=None, page_nums=None):
+    """Yields (result, image_urls) for every page (or those of `page_nums`), in page order, once the
+    page's images are uploaded.
+
+    `submit_images` takes a list of (image_bytes, image_ext) and returns one Future per image
+    resolving to its URL (None if the upload failed, a falsy SKIPPED if the image was left out),
+    so a page's images upload while the following pages are extracted;
+    at most PDF_STREAM_MAX_LAG pages wait for their uploads. Each distinct xref is uploaded
+    once. The yielded results no longer carry image bytes. Time spent blocked on uploads is
+    recorded as the s3_images stage.
+    """
+    waiting = deque()
+    xref_futures = {}
+    upload_wait = 0.0
+
+    def ready():
+        nonlocal upload_wait
+        result, futures = waiting.popleft()
+        wait_start = time.perf_counter()
+        image_urls = {key: future.result() for key, future in futures.items()}
+        upload_wait += time.perf_counter() - wait_start
+        return result, image_urls
+
+    for result in iter_pages(pdf_path, workers=workers, chunk_pages=chunk_pages, page_nums=page_nums):
+        stats.add(result)
+        new_images = [(xref, image_bytes, image_ext) for _, xref, image_bytes, image_ext in result.images
+                      if xref not in xref_futures and image_bytes is not None]
+        if new_images:
+            futures = submit_images([(image_bytes, image_ext) for _, image_bytes, image_ext in new_images])
+            xref_futures.update(zip((xref for xref, _, _ in new_images), futures))
+        page_futures = {(result.page_num, img_index): xref_futures[xref]
+                        for img_index, xref, _, _ in result.images if xref in xref_futures}
+        # The image bytes are with the uploads now; keep only what the Markdown needs
+        result = result._replace(images=[(img_index, xref, None, None) for img_index, xref, _, _ in result.images])
+        waiting.append((result, page_futures))
+        while waiting and (len(waiting) > PDF_STREAM_MAX_LAG or all(future.done() for future in waiting[0][1].values())):
+            yield ready()
+    while waiting:
+        yield ready()
+    record_stage("s3_images", upload_wait)
+
+
+def stream_pdf_markdown(pdf_path, submit_images, emit, title=None, workers=None, chunk_pages=None):
+    """Single-pass extraction that emits a Markdown preview of every page as soon as it is ready.
+
+    Pages are emitted in page order once their image uploads (see iter_uploaded_pages) have
+    finished. `emit(chunk)` receives each Markdown chunk.
+
+    Returns the complete document, rendered exactly like extract_pdf_markdown, so the stored
+    result does not depend on the response mode.
+    """
+    title = title or os.path.basename(pdf_path)
+    report_progress("pages", 0.1)
+    emit(f"# Extracted Content from {title}\n")
+
+    results, image_urls = [], {}
+    stats = PageStats()
+    for result, page_urls in iter_uploaded_pages(pdf_path, submit_images, stats, workers, chunk_pages):
+        emit(render_page_markdown(result, page_urls))
+        results.append(result)
+        image_urls.update(page_urls)
+    logging.info(f"Streamed {len(results)} pages from {title}")
+    stats.record()
+
+    report_progress("images", 0.6)
+    with timed("render"):
+        return render_markdown(title, results, image_urls)
+
+
+def page_fingerprints(pdf_path):
+    """SHA-256 fingerprint of every page: its geometry, decoded content stream and the resources
+    the content draws with (image and form streams by name, fonts by name and base font).
+
+    Fingerprints depend on what a page shows, not on where it sits in the file, so the pages of a
+    revised document that did not change keep theirs even when object numbers or positions move.
+    """
+    import fitz  # PyMuPDF
+
+    stream_digests = {}
+
+    def stream_digest(doc, xref):
+        if xref not in stream_digests:
+            data = doc.xref_stream_raw(xref) if doc.xref_is_stream(xref) else doc.xref_object(xref).encode()
+            stream_digests[xref] = hashlib.sha256(data or b"").hexdigest()
+        return stream_digests[xref]
+
+    fingerprints = []
+    with fitz.open(pdf_path) as doc:
+        for page in doc:
+            digest = hashlib.sha256(f"{page.rotation} {tuple(page.mediabox)}".encode())
+            digest.update(page.read_contents())
+            for xref, smask, *_, name, _, _ in page.get_images(full=True):
+                digest.update(f"image {name} {stream_digest(doc, xref)} {stream_digest(doc, smask) if smask else ''}".encode())
+            for xref, name, _, bbox in page.get_xobjects():
+                digest.update(f"form {name} {tuple(bbox)} {stream_digest(doc, xref)}".encode())
+            for _, ext, font_type, basefont, name, encoding, *_ in page.get_fonts(full=True):
+                digest.update(f"font {name} {basefont} {font_type} {ext} {encoding}".encode())
+            fingerprints.append(digest.hexdigest())
+    return fingerprints
+
+
+def page_record(result, image_urls):
+    """What the Markdown needs of an extracted page, kept in the page store (JSON-serialisable).
+    Images without a URL (left out on purpose) are not part of it."""
+    return {
+        "text": result.text,
+        "tables": result.tables,
+        "images": [[img_index, image_urls[(result.page_num, img_index)]]
+                   for img_index, _, _, _ in result.images if image_urls.get((result.page_num, img_index))],
+    }
+
+
+def stored_page(page_num, record):
+    """Turns a stored page record back into (result, image_urls) for page `page_num`."""
+    result = PageResult(page_num, record["text"], record["tables"],
+                        [(img_index, None, None, None) for img_index, _ in record["images"]])
+    return result, {(page_num, img_index): url for img_index, url in record["images"]}
+
+
+def incremental_pdf_markdown(pdf_path, submit_images, page_store, version, title=None, emit=None,
+                             workers=None, chunk_pages=None):
+    """Extracts only the pages `page_store` does not know yet and splices the stored ones back in.
+
+    Pages are looked up by fingerprint (see page_fingerprints) and extractor `version`, so a
+    revised document only costs its changed pages; the extracted ones are stored for next time.
+    `page_store` has get_many(fingerprints, version) -> {fingerprint: record} and
+    set_many({fingerprint: record}, version). Returns the same document as extract_pdf_markdown.
+    With `emit`, every page is also passed on as in stream_pdf_markdown.
+    """
+    title = title or os.path.basename(pdf_path)
+    report_progress("pages", 0.1)
+    with timed("pdf_fingerprint"):
+        fingerprints = page_fingerprints(pdf_path)
+    records = page_store.get_many(fingerprints, version)
+    changed = [page_num for page_num, fingerprint in enumerate(fingerprints) if fingerprint not in records]
+    logging.info(f"{len(fingerprints) - len(changed)} of {len(fingerprints)} pages of {title} are unchanged")
+    if emit is not None:
+        emit(f"# Extracted Content from {title}\n")
+
+    sections = DocumentSections()
+    stats = PageStats()
+    new_records = {}
+    failed_pages = 0
+    # Every page when nothing is stored, so a new document is extracted in page ranges as usual
+    extracted = iter_uploaded_pages(pdf_path, submit_images, stats, workers, chunk_pages,
+                                    page_nums=changed if records else None)
+    pending = set(changed)
+    for page_num, fingerprint in enumerate(fingerprints):
+        if page_num in pending:
+            result, page_urls = next(extracted)
+            if any(url is None for url in page_urls.values()):
+                # An image upload failed (None, unlike a skipped image's SKIPPED): extract the
+                # page again next time instead of storing it without the image
+                failed_pages += 1
+            else:
+                new_records[fingerprint] = page_record(result, page_urls)
+        else:
+            result, page_urls = stored_page(page_num, records[fingerprint])
+        sections.add_page(result, page_urls)
+        if emit is not None:
+            emit(render_page_markdown(result, page_urls))
+    for _ in extracted:  # finishes the generator, which records the upload wait
+        pass
+    stats.record()
+    count("pages_reused", len(fingerprints) - len(changed))
+    if failed_pages:
+        logging.warning(f"Not storing {failed_pages} pages of {title} whose image uploads failed")
+    page_store.set_many(new_records, version)
+
+    report_progress("images", 0.6)
+    with timed("render"):
+        return sections.getvalue(title)
+
+
+def current_rss_bytes():
+    """Resident set size of this process, or None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def release_memory():
+    """Empties PyMuPDF's shared object store (fonts, images, display lists) and collects garbage."""
+    import fitz  # PyMuPDF
+
+    fitz.TOOLS.store_shrink(100)
+    gc.collect()
+
+
+def check_rss(max_rss_mb):
+    """Raises MemoryCeilingExceeded when the RSS is above `max_rss_mb`, even after releasing caches."""
+    if not max_rss_mb:
+        return
+    rss = current_rss_bytes()
+    if rss is None or rss <= max_rss_mb * MB:
+        return
+    release_memory()
+    rss = current_rss_bytes()
+    if rss > max_rss_mb * MB:
+        raise MemoryCeilingExceeded(f"Server memory use ({rss / MB:.0f} MB) is above the {max_rss_mb} MB ceiling")
+
+
+def use_low_memory(pdf_path, setting=None):
+    """Whether the PDF goes through spool_pdf_markdown (see PDF_LOW_MEMORY)."""
+    setting = PDF_LOW_MEMORY if setting is None else setting
+    if setting == "auto":
+        return os.path.getsize(pdf_path) >= PDF_LOW_MEMORY_MIN_MB * MB
+    return setting == "1"
+
+
+def spool_pdf_markdown(pdf_path, submit_images, title=None, emit=None, workers=None, chunk_pages=None,
+                       spool_mb=None, max_rss_mb=None):
+    """Memory-bounded extraction for very large PDFs; returns the Markdown as a binary file.
+
+    Pages are written into spooled DocumentSections as soon as their images are uploaded (see
+    iter_uploaded_pages) and then dropped, PyMuPDF's object store is released every
+    PDF_RELEASE_EVERY pages, and the RSS is checked against `max_rss_mb` (PDF_MAX_RSS_MB)
+    after every page. The file holds the same document extract_pdf_markdown returns; the
+    caller closes it. With `emit`, every page is also passed on as in stream_pdf_markdown.
+    """
+    title = title or os.path.basename(pdf_path)
+    max_rss_mb = PDF_MAX_RSS_MB if max_rss_mb is None else max_rss_mb
+    report_progress("pages", 0.1)
+    if emit is not None:
+        emit(f"# Extracted Content from {title}\n")
+
+    sections = DocumentSections(spool_mb or PDF_SPOOL_MAX_MB)
+    stats = PageStats()
+    try:
+        for result, page_urls in iter_uploaded_pages(pdf_path, submit_images, stats, workers, chunk_pages):
+            sections.add_page(result, page_urls)
+            if emit is not None:
+                emit(render_page_markdown(result, page_urls))
+            if result.page_num % PDF_RELEASE_EVERY == PDF_RELEASE_EVERY - 1:
+                release_memory()
+            check_rss(max_rss_mb)
+        logging.info(f"Extracted {stats.pages} pages from {title} in memory-bounded mode")
+        stats.record()
+
+        report_progress("images", 0.6)
+        with timed("render"):
+            return sections.to_file(title)
+    finally:
+        sections.close()
@@ -0,0 +1,172 @@
+import os
+import time
+import logging
+from collections import namedtuple
+
+from pdf_engine import count_ruling_edges
+
+
+################################################################################
+#              AUTOMATIC OPEN-SOURCE / ENTERPRISE PDF ROUTING                  #
+################################################################################
+
+# Pages sampled per document, one from the middle of each of that many equal page ranges
+PDF_ROUTE_SAMPLE_PAGES = int(os.getenv("PDF_ROUTE_SAMPLE_PAGES", "5"))
+# A sampled page with less text than this that is mostly covered by images is a scan
+PDF_ROUTE_MIN_TEXT_CHARS = int(os.getenv("PDF_ROUTE_MIN_TEXT_CHARS", "100"))
+PDF_ROUTE_SCAN_COVERAGE = float(os.getenv("PDF_ROUTE_SCAN_COVERAGE", "0.5"))
+# A sampled page with at least this many horizontal and vertical ruling edges is table-dense
+PDF_ROUTE_TABLE_EDGES = int(os.getenv("PDF_ROUTE_TABLE_EDGES", "12"))
+# Share of sampled pages that must need the enterprise engine before a whole document goes to it
+PDF_ROUTE_ENTERPRISE_SHARE = float(os.getenv("PDF_ROUTE_ENTERPRISE_SHARE", "0.5"))
+# A mixed document is split into per-engine page ranges when every range has at least this
+# many pages (0 never splits: the whole document goes to one engine)
+PDF_ROUTE_MIN_RANGE_PAGES = int(os.getenv("PDF_ROUTE_MIN_RANGE_PAGES", "10"))
+
+# What a sampled page looked like and the engine it needs (`reason` is "text", "scan" or "tables")
+PageSample = namedtuple("PageSample", ["page_num", "text_chars", "image_coverage", "ruling_edges", "engine", "reason"])
+# Pages [start, stop) and the engine that extracts them
+PageRoute = namedtuple("PageRoute", ["start", "stop", "engine"])
+# The routing decision for one document. `engine` is "open-source", "enterprise" or "split"
+# (each of `ranges` goes to its own engine); `seconds` is the time spent sampling.
+Route = namedtuple("Route", ["engine", "ranges", "samples", "page_count", "reason", "seconds"])
+
+
+def sample_ranges(page_count, samples):
+    """Splits [0, page_count) into at most `samples` equal ranges; returns (sampled page, start, stop)
+    for each, sampling the page in the middle of its range."""
+    if not page_count:
+        return []
+    samples = max(1, min(samples, page_count))
+    bounds = [page_count * index // samples for index in range(samples + 1)]
+    return [((start + stop) // 2, start, stop) for start, stop in zip(bounds, bounds[1:])]
+
+
+def image_coverage(page):
+    """Share of the page area covered by images (overlaps counted twice, capped at 1)."""
+    import fitz  # PyMuPDF
+
+    area = abs(page.rect)
+    if not area:
+        return 0.0
+    covered = sum(abs(fitz.Rect(info["bbox"]) & page.rect) for info in page.get_image_info())
+    return min(1.0, covered / area)
+
+
+def classify_page(page):
+    """Samples one PyMuPDF page. Scans (no usable text layer) and table-dense pages need the
+    enterprise engine; everything else is extracted as well, and much faster, by the open-source one."""
+    text_chars = len(page.get_text().strip())
+    coverage = image_coverage(page)
+    horizontal, vertical = count_ruling_edges(page, limit=PDF_ROUTE_TABLE_EDGES)
+    edges = min(horizontal, vertical)
+    if text_chars < PDF_ROUTE_MIN_TEXT_CHARS and coverage >= PDF_ROUTE_SCAN_COVERAGE:
+        engine, reason = "enterprise", "scan"
+    elif edges >= PDF_ROUTE_TABLE_EDGES:
+        engine, reason = "enterprise", "tables"
+    else:
+        engine, reason = "open-source", "text"
+    return PageSample(page.number, text_chars, round(coverage, 3), edges, engine, reason)
+
+
+def locate_ranges(doc, sampled):
+    """PageRoutes for the sampled ranges, (sample, start, stop). Where two neighbouring samples
+    need different engines, the boundary is moved to the first page that needs the second one,
+    found by bisecting the pages between the samples (assuming the kind of page changes once)."""
+    ranges = [PageRoute(start, stop, sample.engine) for sample, start, stop in sampled]
+    for index in range(1, len(sampled)):
+        before, after = sampled[index - 1][0], sampled[index][0]
+        if before.engine == after.engine:
+            continue
+        low, high = before.page_num, after.page_num
+        while high - low > 1:
+            middle = (low + high) // 2
+            if classify_page(doc[middle]).engine == before.engine:
+                low = middle
+            else:
+                high = middle
+        ranges[index - 1] = ranges[index - 1]._replace(stop=high)
+        ranges[index] = ranges[index]._replace(start=high)
+    return merge_ranges(ranges)
+
+
+def merge_ranges(ranges):
+    """Joins adjacent PageRoutes that go to the same engine."""
+    merged = []
+    for page_range in ranges:
+        if merged and merged[-1].engine == page_range.engine:
+            merged[-1] = merged[-1]._replace(stop=page_range.stop)
+        else:
+            merged.append(page_range)
+    return merged
+
+
+def route_pdf(pdf_path, enterprise=True, samples=None, min_range_pages=None, enterprise_share=None):
+    """Samples a few pages of the PDF and decides which engine extracts it, or which engine extracts
+    each page range. With `enterprise` False (no Adobe credentials) everything goes to open-source."""
+    import fitz  # PyMuPDF
+
+    samples = PDF_ROUTE_SAMPLE_PAGES if samples is None else samples
+    min_range_pages = PDF_ROUTE_MIN_RANGE_PAGES if min_range_pages is None else min_range_pages
+    enterprise_share = PDF_ROUTE_ENTERPRISE_SHARE if enterprise_share is None else enterprise_share
+
+    start_time = time.perf_counter()
+    with fitz.open(pdf_path) as doc:
+        page_count = len(doc)
+        sampled = [(classify_page(doc[page_num]), start, stop) for page_num, start, stop in sample_ranges(page_count, samples)]
+        ranges = locate_ranges(doc, sampled) if enterprise else []
+    page_samples = [sample for sample, _, _ in sampled]
+
+    if not enterprise:
+        engine, reason = "open-source", "enterprise engine not configured"
+    elif not ranges:
+        engine, reason = "open-source", "no pages"
+    elif len(ranges) == 1:
+        engine = ranges[0].engine
+        reason = "all sampled pages " + ("are plain text" if engine == "open-source" else "are scans or table-dense")
+    elif min_range_pages and all(page_range.stop - page_range.start >= min_range_pages for page_range in ranges):
+        engine, reason = "split", f"{len(ranges)} page ranges"
+    else:
+        share = sum(sample.engine == "enterprise" for sample in page_samples) / len(page_samples)
+        engine = "enterprise" if share >= enterprise_share else "open-source"
+        reason = f"{share:.0%} of sampled pages are scans or table-dense"
+    if engine != "split":
+        ranges = [PageRoute(0, page_count, engine)] if page_count else []
+
+    route = Route(engine, ranges, page_samples, page_count, reason, time.perf_counter() - start_time)
+    logging.info(
+        f"Routed {os.path.basename(pdf_path)} ({page_count} pages) to {engine}: {reason}; "
+        f"samples {[(s.page_num + 1, s.reason) for s in page_samples]}, {route.seconds * 1000:.1f} ms"
+    )
+    return route
+
+
+def route_pages(route):
+    """Pages per engine in a Route."""
+    pages = {"open-source": 0, "enterprise": 0}
+    for page_range in route.ranges:
+        pages[page_range.engine] += page_range.stop - page_range.start
+    return pages
+
+
+def describe_route(route):
+    """The routing decision as returned to clients and logged with the extraction's outcome."""
+    return {
+        "engine": route.engine,
+        "reason": route.reason,
+        "pages": route_pages(route),
+        "ranges": [{"pages": [page_range.start + 1, page_range.stop], "engine": page_range.engine}
+                   for page_range in route.ranges],
+        "samples": [dict(sample._asdict(), page_num=sample.page_num + 1) for sample in route.samples],
+        "seconds": round(route.seconds, 4),
+    }
+
+
+def write_page_range(pdf_path, start, stop, output_path):
+    """Writes pages [start, stop) of the PDF to a new file (for extracting one range with Adobe)."""
+    import fitz  # PyMuPDF
+
+    with fitz.open(pdf_path) as doc, fitz.open() as subset:
+        subset.insert_pdf(doc, from_page=start, to_page=stop - 1)
+        subset.save(output_path, garbage=3, deflate=True)
+    return output_path
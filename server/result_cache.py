@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import logging
+import sqlite3
+import tempfile
+import threading
+
+
+################################################################################
+#                         EXTRACTION RESULT CACHE                              #
+################################################################################
+
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "1") == "1"
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", os.path.join(tempfile.gettempdir(), "extraction_results.sqlite3"))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "10000"))
+RESULT_CACHE_TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+
+# SQLite's default limit on host parameters per statement is 999
+_LOOKUP_BATCH = 500
+
+
+class CacheBackend:
+    """Storage interface for the caches (result, HTTP response and PDF page cache).
+
+    A backend only stores and evicts; hit/miss accounting lives in CacheStats so every
+    backend (SQLite today, S3 object metadata later) reports the same stats.
+    """
+
+    def get(self, key):
+        """Returns (value, created_at) or None."""
+        raise NotImplementedError
+
+    def get_many(self, keys):
+        """Returns {key: (value, created_at)} for the stored keys among `keys`."""
+        entries = {}
+        for key in keys:
+            entry = self.get(key)
+            if entry is not None:
+                entries[key] = entry
+        return entries
+
+    def set(self, key, value):
+        raise NotImplementedError
+
+    def set_many(self, items):
+        """Stores {key: value} items."""
+        for key, value in items.items():
+            self.set(key, value)
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def evict(self, max_entries=None, ttl=None, max_bytes=None):
+        """Drops entries older than `ttl` seconds, then least recently used ones above `max_entries`
+        entries or `max_bytes` of stored values (None disables a limit). Returns the number evicted."""
+        raise NotImplementedError
+
+    def total_bytes(self):
+        """Size of the stored values."""
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """Local single-file backend, shared by all worker threads of the process.
+
+    Values go through `encode`/`decode` (JSON by default) to the text or bytes stored in `table`.
+    """
+
+    def __init__(self, path=RESULT_CACHE_PATH, table="results", encode=json.dumps, decode=json.loads):
+        self.path = path
+        self.table = table
+        self.encode = encode
+        self.decode = decode
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+        if "size" not in columns:
+            # Result caches written before values were sized
+            self._conn.execute(f"ALTER TABLE {table} ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed_at ON {table} (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        unique = list(dict.fromkeys(keys))
+        rows = []
+        with self._lock:
+            for start in range(0, len(unique), _LOOKUP_BATCH):
+                batch = unique[start:start + _LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                found = self._conn.execute(
+                    f"SELECT key, value, created_at FROM {self.table} WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                if found:
+                    self._conn.execute(
+                        f"UPDATE {self.table} SET accessed_at = ? WHERE key IN ({placeholders})", (time.time(), *batch)
+                    )
+                rows.extend(found)
+            self._conn.commit()
+        return {key: (self.decode(value), created_at) for key, value, created_at in rows}
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def set_many(self, items):
+        now = time.time()
+        rows = []
+        for key, value in items.items():
+            encoded = self.encode(value)
+            rows.append((key, encoded, len(encoded), now, now))
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def evict(self, max_entries=None, ttl=None, max_bytes=None):
+        evicted = 0
+        with self._lock:
+            if ttl is not None:
+                evicted += self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE created_at < ?", (time.time() - ttl,)
+                ).rowcount
+            if max_entries is not None:
+                evicted += self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN ("
+                    f" SELECT key FROM {self.table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (max_entries,),
+                ).rowcount
+            if max_bytes is not None:
+                # Least recently used first out, until the values fit in max_bytes again
+                evicted += self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN ("
+                    f" SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC, key) AS total"
+                    f" FROM {self.table}) WHERE total > ?)",
+                    (max_bytes,),
+                ).rowcount
+            self._conn.commit()
+        return evicted
+
+    def total_bytes(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+class CacheStats:
+    """Hit, miss and eviction counters of a cache over `self.backend`, reported the same way by every cache."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._stats_lock = threading.Lock()
+
+    def record(self, hits=0, misses=0, evictions=0):
+        with self._stats_lock:
+            self.hits += hits
+            self.misses += misses
+            self.evictions += evictions
+
+    def stats(self):
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            counters = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+        return {"entries": len(self.backend), **counters}
+
+
+class ResultCache(CacheStats):
+    """Maps (content hash, method, extractor version) to a previous extraction result."""
+
+    def __init__(self, backend, max_entries=RESULT_CACHE_MAX_ENTRIES, ttl=RESULT_CACHE_TTL_SECONDS):
+        super().__init__(backend)
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+    @staticmethod
+    def make_key(digest, method, version):
+        return f"{digest}:{method}:{version}"
+
+    def get(self, digest, method, version):
+        key = self.make_key(digest, method, version)
+        entry = self.backend.get(key)
+        if entry is not None and time.time() - entry[1] > self.ttl:
+            self.backend.delete(key)
+            entry = None
+        if entry is None:
+            self.record(misses=1)
+            return None
+        self.record(hits=1)
+        logging.info(f"Result cache hit for {key}")
+        return entry[0]
+
+    def set(self, digest, method, version, value):
+        self.backend.set(self.make_key(digest, method, version), value)
+        self.record(evictions=self.backend.evict(self.max_entries, self.ttl))
+
+    def stats(self):
+        return {**super().stats(), "max_entries": self.max_entries, "ttl_seconds": self.ttl}
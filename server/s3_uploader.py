@@ -0,0 +1,250 @@
+import io
+import os
+import uuid
+import hashlib
+import logging
+import mimetypes
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import count, in_caller_context, timed
+
+
+################################################################################
+#                         POOLED S3 UPLOADER                                   #
+################################################################################
+
+MB = 1024 * 1024
+
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")  # e.g. a local MinIO or moto server
+S3_UPLOAD_WORKERS = int(os.getenv("S3_UPLOAD_WORKERS", "8"))
+S3_MULTIPART_THRESHOLD_MB = int(os.getenv("S3_MULTIPART_THRESHOLD_MB", "16"))
+S3_MULTIPART_CHUNKSIZE_MB = int(os.getenv("S3_MULTIPART_CHUNKSIZE_MB", "8"))
+S3_MULTIPART_CONCURRENCY = int(os.getenv("S3_MULTIPART_CONCURRENCY", "4"))
+S3_CONTENT_PREFIX = os.getenv("S3_CONTENT_PREFIX", "images/")
+S3_KNOWN_KEYS_MAX = int(os.getenv("S3_KNOWN_KEYS_MAX", "100000"))
+
+# What an item left out on purpose by a `prepare` hook resolves to (e.g. a decorative image).
+# Falsy like the None of a failed upload, so Markdown skips both, but it is not a failure.
+SKIPPED = ""
+
+
+class S3Uploader:
+    """Uploads files to one S3 bucket through a single reused client and a thread pool.
+
+    boto3 is imported and the client created on first use, then shared by all threads (boto3
+    clients are thread-safe); image sets go through `submit_content_addressed_batch` concurrently.
+    """
+
+    def __init__(self, bucket, region=None, access_key_id=None, secret_access_key=None,
+                 endpoint_url=S3_ENDPOINT_URL, workers=S3_UPLOAD_WORKERS):
+        self.bucket = bucket
+        self.region = region
+        self.endpoint_url = endpoint_url
+        self.workers = workers
+        self._credentials = {"aws_access_key_id": access_key_id, "aws_secret_access_key": secret_access_key}
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._transfer_config = None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="s3-upload")
+        # LRU of content-addressed keys known to exist in the bucket
+        self._known_keys = OrderedDict()
+        self._known_lock = threading.Lock()
+        self.uploaded = 0
+        self.deduplicated = 0
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import boto3
+                    from boto3.s3.transfer import TransferConfig
+                    from botocore.config import Config
+
+                    self._transfer_config = TransferConfig(
+                        multipart_threshold=S3_MULTIPART_THRESHOLD_MB * MB,
+                        multipart_chunksize=S3_MULTIPART_CHUNKSIZE_MB * MB,
+                        max_concurrency=S3_MULTIPART_CONCURRENCY,
+                        use_threads=S3_MULTIPART_CONCURRENCY > 1,
+                    )
+                    self._client = boto3.client(
+                        "s3",
+                        region_name=self.region,
+                        endpoint_url=self.endpoint_url,
+                        # Enough connections for every upload thread and its multipart parts
+                        config=Config(max_pool_connections=self.workers * max(1, S3_MULTIPART_CONCURRENCY)),
+                        **self._credentials,
+                    )
+        return self._client
+
+    @property
+    def transfer_config(self):
+        return self.client and self._transfer_config
+
+    def object_url(self, object_key):
+        if self.endpoint_url:
+            return f"{self.endpoint_url.rstrip('/')}/{self.bucket}/{object_key}"
+        return f"https://{self.bucket}.s3.{self.region}.amazonaws.com/{object_key}"
+
+    def upload_file(self, file_path, object_key=None):
+        """Uploads a file and returns its URL, or None if the upload failed."""
+        object_key = object_key or os.path.basename(file_path)
+        try:
+            with timed("s3_put"):
+                self.client.upload_file(file_path, self.bucket, object_key, Config=self.transfer_config)
+            count("s3_uploads")
+            count("s3_upload_bytes", os.path.getsize(file_path))
+            return self.object_url(object_key)
+        except Exception as e:
+            logging.error(f"Failed to upload {file_path} to S3: {e}")
+            count("s3_upload_failures")
+            return None
+
+    def upload_fileobj(self, fileobj, object_key, content_type=None):
+        """Streams a binary file-like object to S3 and returns its URL, or None if the upload failed."""
+        content_type = content_type or guess_content_type(object_key)
+        extra_args = {"ContentType": content_type} if content_type else None
+        try:
+            with timed("s3_put"):
+                self.client.upload_fileobj(fileobj, self.bucket, object_key, ExtraArgs=extra_args, Config=self.transfer_config)
+            count("s3_uploads")
+            return self.object_url(object_key)
+        except Exception as e:
+            logging.error(f"Failed to upload {object_key} to S3: {e}")
+            count("s3_upload_failures")
+            return None
+
+    def upload_bytes(self, data, object_key, content_type=None):
+        """Uploads in-memory bytes without touching the local disk."""
+        s3_url = self.upload_fileobj(io.BytesIO(data), object_key, content_type)
+        if s3_url:
+            count("s3_upload_bytes", len(data))
+        return s3_url
+
+    def download_file(self, object_key, file_path):
+        """Downloads an object of this bucket to a local file."""
+        self.client.download_file(self.bucket, object_key, file_path, Config=self.transfer_config)
+
+    def object_exists(self, object_key):
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=object_key)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def upload_content_addressed(self, data, suffix, content_type=None, thumbnail=None):
+        """Uploads `data` under a key derived from its SHA-256, unless that object already exists.
+
+        Identical content (within a document or across documents) therefore maps to one S3 object.
+        `thumbnail` (bytes, ext) is stored under thumbnail_key(object key, ext), checked on its own
+        so an image uploaded before thumbnails existed still gets one.
+        """
+        object_key = content_key(data, suffix)
+        s3_url, uploaded = self._ensure_object(data, object_key, content_type)
+        if s3_url is None:
+            return None
+        self._count(uploaded=int(uploaded), deduplicated=int(not uploaded))
+        if thumbnail is not None:
+            thumbnail_data, thumbnail_ext = thumbnail
+            self._ensure_object(thumbnail_data, thumbnail_key(object_key, thumbnail_ext))
+        return s3_url
+
+    def _ensure_object(self, data, object_key, content_type=None):
+        """Uploads `data` under `object_key` unless the key is known or found to exist already.
+        Returns (URL or None if the upload failed, whether it was uploaded)."""
+        if self._is_known(object_key):
+            return self.object_url(object_key), False
+        try:
+            exists = self.object_exists(object_key)
+        except Exception as e:
+            logging.warning(f"Could not check {object_key} in S3, uploading it again: {e}")
+            exists = False
+        if not exists and not self.upload_bytes(data, object_key, content_type):
+            return None, False
+        self._remember(object_key)
+        return self.object_url(object_key), not exists
+
+    def submit_content_addressed_batch(self, items, prepare=None):
+        """Starts content-addressed uploads of (data, suffix) or (data, suffix, thumbnail) items and
+        returns one Future per item.
+
+        With `prepare`, each item's upload task first calls prepare(data, suffix), which returns the
+        (data, suffix, thumbnail) to upload instead, or None to skip the item (its Future resolves
+        to SKIPPED); preparing one item then overlaps with uploading the others.
+        Duplicates inside the batch share a single Future, so no request is made twice.
+        """
+        pending, futures = {}, []
+        for data, suffix, *thumbnail in items:
+            object_key = content_key(data, suffix)
+            if object_key not in pending:
+                pending[object_key] = self._executor.submit(
+                    in_caller_context(self._prepare_and_upload), prepare, data, suffix,
+                    thumbnail[0] if thumbnail else None,
+                )
+            else:
+                self._count(deduplicated=1)
+            futures.append(pending[object_key])
+        return futures
+
+    def _prepare_and_upload(self, prepare, data, suffix, thumbnail):
+        if prepare is not None:
+            prepared = prepare(data, suffix)
+            if prepared is None:
+                return SKIPPED
+            data, suffix, thumbnail = prepared
+        return self.upload_content_addressed(data, suffix, None, thumbnail)
+
+    def stats(self):
+        with self._known_lock:
+            return {"uploaded": self.uploaded, "deduplicated": self.deduplicated, "known_keys": len(self._known_keys)}
+
+    def _is_known(self, object_key):
+        with self._known_lock:
+            if object_key in self._known_keys:
+                self._known_keys.move_to_end(object_key)
+                return True
+            return False
+
+    def _remember(self, object_key):
+        with self._known_lock:
+            self._known_keys[object_key] = True
+            self._known_keys.move_to_end(object_key)
+            while len(self._known_keys) > S3_KNOWN_KEYS_MAX:
+                self._known_keys.popitem(last=False)
+
+    def _count(self, uploaded=0, deduplicated=0):
+        with self._known_lock:
+            self.uploaded += uploaded
+            self.deduplicated += deduplicated
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+def new_object_key(suffix):
+    """Returns a unique object key with the given suffix (e.g. ".md")."""
+    return f"{uuid.uuid4().hex}{suffix}"
+
+
+def content_key(data, suffix):
+    """Returns the content-addressed object key for `data` (SHA-256 hex digest plus suffix)."""
+    return f"{S3_CONTENT_PREFIX}{hashlib.sha256(data).hexdigest()}{suffix}"
+
+
+def thumbnail_key(object_key, ext):
+    """Key of the thumbnail stored next to an image: images/<sha256>.thumb.<ext>."""
+    return f"{os.path.splitext(object_key)[0]}.thumb.{ext}"
+
+
+def guess_content_type(object_key):
+    if object_key.endswith(".md"):
+        return "text/markdown; charset=utf-8"
+    if object_key.endswith(".webp"):
+        return "image/webp"  # not in every platform's mimetypes table
+    return mimetypes.guess_type(object_key)[0]
@@ -0,0 +1,80 @@
+import os
+import json
+import queue
+import threading
+
+
+################################################################################
+#                    STREAMING MARKDOWN RESPONSES (SSE)                        #
+################################################################################
+
+# Seconds without a chunk after which a `progress` event is sent (also keeps proxies from
+# closing an idle connection while an enterprise backend is working)
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "10"))
+
+SSE_MEDIA_TYPE = "text/event-stream"
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+class StreamCancelled(Exception):
+    """Raised inside the extraction when the client of its stream has disconnected."""
+
+
+def sse_event(event, data):
+    """Formats one Server-Sent Event; `data` is sent as a single line of JSON."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class MarkdownStream:
+    """Carries Markdown chunks from an extraction running on a job worker to an HTTP response.
+
+    The extraction calls `emit(chunk)` as content becomes available; `events(job)` turns the
+    chunks into SSE `chunk` events, sends `progress` events while nothing arrives, and ends with
+    a `done` event carrying the job result (e.g. the markdown_url) or an `error` event.
+    """
+
+    def __init__(self, heartbeat=STREAM_HEARTBEAT_SECONDS):
+        self.heartbeat = heartbeat
+        self._queue = queue.Queue()
+        self._cancelled = threading.Event()
+
+    def emit(self, chunk):
+        if self._cancelled.is_set():
+            raise StreamCancelled("Stream client disconnected")
+        if chunk:
+            self._queue.put(("chunk", {"markdown": chunk}))
+
+    def run(self, fn, *args):
+        """Job function: runs `fn(*args, emit=self.emit)` and reports its outcome to the stream."""
+        try:
+            result = fn(*args, emit=self.emit)
+        except Exception as e:
+            self._queue.put(("error", {
+                "detail": getattr(e, "detail", None) or str(e),
+                "status_code": getattr(e, "status_code", 500),
+            }))
+            raise
+        self._queue.put(("done", result))
+        return result
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def events(self, job=None):
+        """Yields SSE strings until the extraction finishes. Iterating stops the extraction
+        (at its next emit) when the response is closed early."""
+        try:
+            if job is not None:
+                yield sse_event("job", {"job_id": job.id, "status_url": f"/jobs/{job.id}"})
+            while True:
+                try:
+                    event, data = self._queue.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    progress = {"stage": job.stage, "progress": round(job.progress, 3)} if job is not None else {}
+                    yield sse_event("progress", progress)
+                    continue
+                yield sse_event(event, data)
+                if event in ("done", "error"):
+                    return
+        finally:
+            self.cancel()
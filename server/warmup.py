@@ -0,0 +1,66 @@
+import os
+import time
+import logging
+import importlib
+
+
+################################################################################
+#                    LAZY BACKENDS AND START-UP WARM-UP                        #
+################################################################################
+
+# Heavy third-party modules behind each extraction backend. None of them is imported when
+# main.py loads; each is imported by the first request that needs it, or ahead of time by
+# warm_up() when the backend is listed in WARMUP_BACKENDS.
+BACKEND_MODULES = {
+    "pdf": ("fitz", "pdfplumber"),
+    "images": ("PIL.Image",),
+    "xlsx": ("openpyxl",),
+    "website": ("requests", "bs4", "lxml"),
+    "s3": ("boto3",),
+    "adobe": (
+        "adobe.pdfservices.operation.pdf_services",
+        "adobe.pdfservices.operation.pdfjobs.jobs.extract_pdf_job",
+        "adobe.pdfservices.operation.pdfjobs.result.extract_pdf_result",
+    ),
+    "apify": ("apify_client",),
+}
+
+# Comma-separated backend names, or "all"; empty keeps every backend lazy
+WARMUP_BACKENDS = os.getenv("WARMUP_BACKENDS", "")
+# "1" finishes the warm-up before the server accepts requests; otherwise it runs in the background
+WARMUP_BLOCKING = os.getenv("WARMUP_BLOCKING", "0") == "1"
+
+
+def parse_backends(value):
+    """Turns a WARMUP_BACKENDS value into a list of known backend names."""
+    names = [name.strip().lower() for name in value.split(",") if name.strip()]
+    if "all" in names:
+        return list(BACKEND_MODULES)
+    unknown = [name for name in names if name not in BACKEND_MODULES]
+    if unknown:
+        logging.warning(f"Ignoring unknown warm-up backends: {', '.join(unknown)}")
+    return [name for name in names if name in BACKEND_MODULES]
+
+
+def warm_up(backends, initializers=None):
+    """Imports each backend's modules and runs its initializer (e.g. creating a shared client).
+
+    A backend that fails to warm up is logged and skipped; it will be retried on first use.
+    Returns {backend: seconds} for the backends that warmed up.
+    """
+    initializers = initializers or {}
+    timings = {}
+    for name in backends:
+        start = time.perf_counter()
+        try:
+            for module in BACKEND_MODULES[name]:
+                importlib.import_module(module)
+            if name in initializers:
+                initializers[name]()
+        except Exception as e:
+            logging.warning(f"Warm-up of the {name} backend failed: {e}")
+            continue
+        timings[name] = round(time.perf_counter() - start, 3)
+    if timings:
+        logging.info(f"Warmed up backends: {timings}")
+    return timings
@@ -0,0 +1,71 @@
+import io
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from markdown_writer import MarkdownWriter
+
+
+################################################################################
+#                    STREAMING XLSX TABLE LOADER (ADOBE OUTPUT)                #
+################################################################################
+
+XLSX_TABLE_WORKERS = int(os.getenv("XLSX_TABLE_WORKERS", "4"))
+
+
+def table_file_names(result_zip):
+    """The `tables/*.xlsx` members of an Adobe result ZIP, in table order (fileoutpart2 before fileoutpart10)."""
+    return sorted(
+        (name for name in result_zip.namelist() if name.startswith("tables/") and name.endswith(".xlsx")),
+        key=lambda name: (len(name), name),
+    )
+
+
+def iter_xlsx_rows(data, read_only=True):
+    """Yields the cell values of the first sheet of an XLSX file, one tuple per row.
+
+    In read-only mode openpyxl parses the sheet XML as rows are requested instead of building
+    every Cell object up front, so memory stays flat however large the table is. The workbook
+    is closed once the rows are exhausted (or the generator is discarded).
+    """
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=read_only, data_only=True)
+    try:
+        sheet = workbook.active  # Assume data is in the first sheet
+        yield from sheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def xlsx_table_markdown(name, data, read_only=True):
+    """Renders one table file as a `## Table from <file>` section."""
+    logging.info(f"Processing table file: {name}")
+    writer = MarkdownWriter()
+    writer.write(f"## Table from {os.path.basename(name)}\n\n")
+    # Separator after the header row
+    writer.table(iter_xlsx_rows(data, read_only=read_only), header_separator=True)
+    writer.write("\n")
+    return writer.getvalue()
+
+
+def tables_to_markdown(result_zip, workers=XLSX_TABLE_WORKERS, read_only=True):
+    """Converts every table file in the result ZIP to Markdown, several files at a time.
+
+    Sections are returned in table order regardless of which file finishes first.
+    """
+    names = table_file_names(result_zip)
+    if not names:
+        logging.warning(" No tables/ folder found. No tables extracted.")
+        return ""
+
+    logging.info(f"Found {len(names)} table files in tables/ folder.")
+    # Member reads share the ZIP's file handle, so the (small, compressed) files are read
+    # up front and only the parsing runs concurrently
+    members = [(name, result_zip.read(name)) for name in names]
+    if workers <= 1 or len(members) == 1:
+        sections = [xlsx_table_markdown(name, data, read_only) for name, data in members]
+    else:
+        with ThreadPoolExecutor(max_workers=min(workers, len(members)), thread_name_prefix="xlsx") as executor:
+            sections = list(executor.map(lambda member: xlsx_table_markdown(*member, read_only), members))
+    return "".join(sections)